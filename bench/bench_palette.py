@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+# Benchmark of GIF colour quantization: a palette of its own for every frame
+# (Pillow's median cut per frame) against one palette built from a sample of
+# the frames and applied through the lookup table of gimpscript.palette,
+# with and without ordered dithering.
+#
+#   python bench/bench_palette.py --size 256 --rot-frames 72 --open-frames 20
+#
+# For the rotation, door and sonar frames it reports the encoding time, the
+# file size, the PSNR of the decoded frames (visible pixels only) and the
+# share of pixels that do not change in the rendered frames but change
+# colour in the GIF ("shimmer").  Needs numpy and Pillow.
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image, ImageSequence
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from gimpscript import canvas, effects, encoders, palette, resample
+
+
+def test_image(size):
+    # Smooth gradients and a few hard edges, so that colours run out.
+    y, x = np.mgrid[0:size, 0:size].astype(np.float64) / size
+    pixels = np.empty((size, size, 4), dtype=np.uint8)
+    pixels[:, :, 0] = 255 * x
+    pixels[:, :, 1] = 255 * (0.5 + 0.5 * np.sin(6 * y + 3 * x))
+    pixels[:, :, 2] = 255 * ((x - 0.5) ** 2 + (y - 0.5) ** 2 < 0.1)
+    pixels[:, :, 3] = 255
+    return pixels
+
+
+def effect_frames(name, size, options):
+    # Every frame of the effect, on the canvas.
+    source = test_image(size)
+    if name == "rotation":
+        frames = effects.rotated_frames(source, (0, 0), options.rot_frames,
+                                        resample.INTERPOLATION_CUBIC)
+    elif name == "doors":
+        frames = effects.cross_frames(source, (0, 0), source, options.rot_frames,
+                                      options.open_frames, resample.INTERPOLATION_CUBIC,
+                                      locked=True)
+    else:
+        background = test_image(size)[:, ::-1].copy()
+        frames = effects.sonar_frames(source, background, options.sonar_frames, 0, 1.0)
+    return [canvas.frame_on_canvas(resample.as_rgba(pixels), tuple(offsets), size, size)
+            for pixels, offsets in frames]
+
+
+def encode(path, frames, mode):
+    # Seconds to quantize and write the GIF, palette included.
+    started = time.time()
+    colors = None
+    if mode != "per frame":
+        colors = palette.build(frames[i] for i in palette.sample_indices(len(frames)))
+    height, width = frames[0].shape[:2]
+    with encoders.open_encoder(path, encoders.FORMAT_GIF, width, height, len(frames), 40, 0,
+                               True, colors, mode == "dithered") as encoder:
+        for frame in frames:
+            encoder.add_frame(frame)
+    return time.time() - started
+
+
+def compare(path, frames):
+    # PSNR over the visible pixels, and the share of still pixels that
+    # change colour between decoded frames.
+    error = 0.0
+    count = 0
+    still = 0
+    shimmer = 0
+    previous = None
+    for frame, decoded in zip(frames, ImageSequence.Iterator(Image.open(path))):
+        decoded = np.array(decoded.convert("RGBA"))
+        visible = frame[:, :, 3] >= 128
+        difference = frame[:, :, :3].astype(np.float64) - decoded[:, :, :3]
+        error += (difference[visible] ** 2).sum()
+        count += 3 * visible.sum()
+        if previous is not None:
+            unchanged = np.all(frame == previous[0], axis=2) & visible
+            still += unchanged.sum()
+            shimmer += (np.any(decoded != previous[1], axis=2) & unchanged).sum()
+        previous = frame, decoded
+    psnr = 10 * np.log10(255.0 ** 2 / max(error / max(count, 1), 1e-9))
+    return psnr, float(shimmer) / max(still, 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare GIF palettes per frame and global.")
+    parser.add_argument("--size", type=int, default=256)
+    parser.add_argument("--rot-frames", type=int, default=72)
+    parser.add_argument("--open-frames", type=int, default=20)
+    parser.add_argument("--sonar-frames", type=int, default=20)
+    options = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="gimpscript-palette-")
+    try:
+        print("%-9s %-10s %6s %9s %10s %9s %8s %8s"
+              % ("effect", "palette", "frames", "seconds", "ms/frame", "KB", "PSNR", "shimmer"))
+        for name in ("rotation", "doors", "sonar"):
+            frames = effect_frames(name, options.size, options)
+            for mode in ("per frame", "global", "dithered"):
+                path = os.path.join(directory, "%s-%s.gif" % (name, mode.replace(" ", "-")))
+                seconds = encode(path, frames, mode)
+                psnr, shimmer = compare(path, frames)
+                print("%-9s %-10s %6d %9.2f %10.1f %9.1f %8.2f %7.2f%%"
+                      % (name, mode, len(frames), seconds, 1000.0 * seconds / len(frames),
+                         os.path.getsize(path) / 1000.0, psnr, 100 * shimmer))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
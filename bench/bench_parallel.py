@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# Scaling of parallel frame rendering with the number of worker processes,
+# on the rotation of "Only Rotate".
+#
+#   python bench/bench_parallel.py --frames 300 --width 3840 --height 2160 \
+#       --workers 1 8 16 32
+#
+# Needs numpy only; GIMP is not involved.
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from gimpscript import effects, parallel, resample
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Time parallel rotation rendering for several worker counts.")
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--width", type=int, default=960)
+    parser.add_argument("--height", type=int, default=540)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 0],
+                        help="worker counts to time (0 = one per core)")
+    parser.add_argument("--chunk-frames", type=int, default=4)
+    parser.add_argument("--interpolation", type=int, default=resample.INTERPOLATION_CUBIC)
+    options = parser.parse_args(argv)
+
+    y, x = np.mgrid[0:options.height, 0:options.width]
+    source = np.empty((options.height, options.width, 4), dtype=np.uint8)
+    source[:, :, 0] = x % 256
+    source[:, :, 1] = y % 256
+    source[:, :, 2] = (x + y) % 256
+    source[:, :, 3] = 255
+    args = (source, (0, 0), options.frames, options.interpolation)
+    print("%d frames of %dx%d, %d frames per task, %d cores"
+          % (options.frames, options.width, options.height, options.chunk_frames,
+             parallel.worker_count(0)))
+    baseline = None
+    for workers in options.workers:
+        started = time.time()
+        for frame in parallel.render(effects.rotated_frames, args, options.frames, workers,
+                                     options.chunk_frames):
+            pass
+        seconds = time.time() - started
+        baseline = baseline or seconds
+        print("%3d workers %8.2f s %8.1f ms/frame  speed-up %.2fx"
+              % (parallel.worker_count(workers), seconds,
+                 1000.0 * seconds / options.frames, baseline / seconds))
+
+
+if __name__ == "__main__":
+    main()
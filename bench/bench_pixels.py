@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# Throughput of gimpscript.pixels, the bridge between drawables and NumPy
+# arrays, for 1080p and 4K layers: reading a layer, writing an existing one,
+# adding a new layer and adding a layer mask, in MB/s, next to writing the
+# whole layer in one PixelRgn call as the bridge did before.
+#
+#   python bench/bench_pixels.py --runs 5
+#
+# Outside GIMP the layers are those of the gimpfu stand-in (bench/standin),
+# which measures the bridge's own copies (the peak of "new layer" and "mask"
+# includes the stand-in's storage for the new drawable).  From GIMP's
+# Python-Fu console, exec() this file and call main([]) to time real PixelRgn
+# transfers.
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+try:
+    import gimpfu
+except ImportError:
+    sys.path.insert(0, os.path.join(BENCH_DIR, "standin"))
+    import gimpfu
+
+from gimpscript import pixels
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+SIZES = [("1080p", 1920, 1080), ("4K", 3840, 2160)]
+
+
+def write_whole(drawable, array):
+    # The former write: the whole layer as one string, in one call.
+    width = drawable.width
+    height = drawable.height
+    region = drawable.get_pixel_rgn(0, 0, width, height, True, False)
+    region[0:width, 0:height] = np.ascontiguousarray(array).tobytes()
+    drawable.flush()
+
+
+def measure(function, runs):
+    # Best time of `runs` calls, and the peak memory the calls allocated in
+    # Python (when tracemalloc is available).
+    best = None
+    for _ in range(runs):
+        started = time.time()
+        function()
+        seconds = time.time() - started
+        best = seconds if best is None else min(best, seconds)
+    peak = None
+    if tracemalloc is not None:
+        tracemalloc.start()
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return best, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time pixel transfers between layers and arrays.")
+    parser.add_argument("--runs", type=int, default=5)
+    options = parser.parse_args(argv)
+
+    gimp = gimpfu.gimp
+    pdb = gimpfu.pdb
+    print("%-6s %-14s %9s %10s %10s" % ("size", "transfer", "MB", "MB/s", "peak MB"))
+    for label, width, height in SIZES:
+        image = pdb.gimp_image_new(width, height, gimpfu.RGB)
+        layer = gimp.Layer(image, "bench", width, height, gimpfu.RGBA_IMAGE, 100.0,
+                           gimpfu.NORMAL_MODE)
+        pdb.gimp_image_insert_layer(image, layer, None, 0)
+        rgba = np.random.RandomState(0).randint(0, 256, (height, width, 4)).astype(np.uint8)
+        mask = rgba[:, :, 0].copy()
+        transfers = [
+            ("read", rgba.nbytes, lambda: pixels.read_drawable(layer)),
+            ("write", rgba.nbytes, lambda: pixels.write_drawable(layer, rgba)),
+            ("write, 1 call", rgba.nbytes, lambda: write_whole(layer, rgba)),
+            ("new layer", rgba.nbytes,
+             lambda: pixels.add_layer_from_array(image, rgba, "copy")),
+            ("mask", mask.nbytes, lambda: pixels.add_mask_from_array(layer, mask)),
+        ]
+        for name, size, function in transfers:
+            seconds, peak = measure(function, options.runs)
+            print("%-6s %-14s %9.1f %10.0f %10s"
+                  % (label, name, size / 1e6, size / 1e6 / max(seconds, 1e-9),
+                     "%.1f" % (peak / 1e6) if peak is not None else "-"))
+        pdb.gimp_image_delete(image)
+
+
+if __name__ == "__main__":
+    main()
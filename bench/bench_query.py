@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# Time GIMP's plug-in query: at startup GIMP runs every plug-in file in a
+# process of its own to collect the procedures it registers.
+#
+#   python bench/bench_query.py                          # the plug-in entry point
+#   python bench/bench_query.py old/rotate.py old/rotatecross.py ... --runs 20
+#
+# Each run starts one fresh interpreter per file, against the recording
+# gimpfu stand-in (bench/standin), and loads the file the way a query does.
+# It reports the time per query, the procedures registered (and any
+# registered twice) and the modules loaded, so that a heavy import such as
+# numpy shows up.
+from __future__ import print_function
+
+import argparse
+import collections
+import json
+import os
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCH_DIR, "..", "src")
+DEFAULT_SCRIPTS = [os.path.join(SRC_DIR, "gimpscript_effects.py")]
+
+# Run in the child: load the plug-in file and describe what it did.
+_CHILD = """
+import json, runpy, sys, time
+started = time.time()
+sys.path[:0] = %(path)r
+runpy.run_path(%(script)r, run_name="__main__")
+seconds = time.time() - started
+import gimpfu
+print(json.dumps({"seconds": seconds, "procedures": sorted(gimpfu.registered),
+                  "modules": sorted(m for m, module in sys.modules.items() if module is not None
+                                    and m.split(".")[0] in ("gimpscript", "numpy", "PIL"))}))
+"""
+
+
+def query(script):
+    # Wall time of one query process, and what it reported.
+    code = _CHILD % {"path": [os.path.join(BENCH_DIR, "standin"), SRC_DIR], "script": script}
+    started = time.time()
+    output = subprocess.check_output([sys.executable, "-c", code])
+    seconds = time.time() - started
+    return seconds, json.loads(output.decode("utf-8").strip().splitlines()[-1])
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the plug-in query of GIMP's startup.")
+    parser.add_argument("scripts", nargs="*", default=DEFAULT_SCRIPTS,
+                        help="plug-in files, each queried in a process of its own")
+    parser.add_argument("--runs", type=int, default=10)
+    options = parser.parse_args(argv)
+
+    totals = []
+    wall = collections.defaultdict(list)
+    load = collections.defaultdict(list)
+    reports = {}
+    for run in range(options.runs):
+        total = 0.0
+        for script in options.scripts:
+            seconds, report = query(script)
+            wall[script].append(seconds)
+            load[script].append(report["seconds"])
+            reports[script] = report
+            total += seconds
+        totals.append(total)
+
+    registered = collections.Counter()
+    for script in options.scripts:
+        report = reports[script]
+        registered.update(report["procedures"])
+        heavy = [m for m in report["modules"] if m.split(".")[0] != "gimpscript"]
+        print("%-28s %7.1f ms process %7.1f ms loading  %2d procedures  %2d gimpscript modules%s"
+              % (os.path.basename(script), 1000 * median(wall[script]), 1000 * median(load[script]),
+                 len(report["procedures"]), len(report["modules"]) - len(heavy),
+                 "  also " + ", ".join(m for m in heavy if "." not in m) if heavy else ""))
+    print("query of %d file(s): %.1f ms (median of %d runs)"
+          % (len(options.scripts), 1000 * median(totals), options.runs))
+    for name, count in sorted(registered.items()):
+        if count > 1:
+            print("registered %d times: %s" % (count, name))
+
+
+if __name__ == "__main__":
+    main()
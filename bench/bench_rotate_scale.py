@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# Benchmark of "Rotate x Scale" frame rendering: the former two-pass path
+# (rotate, then scale the rotated frame) against the frame plan, which
+# resamples every frame once with the composed matrix.
+#
+#   python bench/bench_rotate_scale.py --frames 300 --size 512
+#
+# Needs numpy only; GIMP is not involved.
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from gimpscript import effects, frameplan, resample
+
+
+def two_pass_frames(source, offsets, image_height, num_frames, interpolation):
+    # The frames as they were rendered before the frame plan.
+    height, width = source.shape[:2]
+    frames = effects.rotated_frames(source, offsets, num_frames, interpolation)
+    for i, (frame, frame_offsets) in enumerate(frames):
+        factor = frameplan.scale_factor(i, num_frames)
+        new_width = max(int(width * factor), 1)
+        new_height = max(int(height * factor), 1)
+        yield effects.scaled(frame, new_width, new_height,
+                             (0, image_height - new_height), interpolation)
+
+
+def test_image(size):
+    # A checkerboard with a gradient.
+    y, x = np.mgrid[0:size, 0:size]
+    checker = ((x // 8 + y // 8) % 2) * 160
+    pixels = np.empty((size, size, 4), dtype=np.uint8)
+    pixels[:, :, 0] = checker + x * 95 // size
+    pixels[:, :, 1] = checker + y * 95 // size
+    pixels[:, :, 2] = 255 - checker
+    pixels[:, :, 3] = 255
+    return pixels
+
+
+def run(name, frames, num_frames):
+    started = time.time()
+    for pixels, offsets in frames:
+        pass
+    seconds = time.time() - started
+    print("%-10s %8.2f s %8.1f ms/frame"
+          % (name, seconds, 1000.0 * seconds / num_frames))
+    return seconds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare two-pass and single-pass Rotate x Scale rendering.")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--size", type=int, default=256)
+    parser.add_argument("--interpolation", type=int, default=resample.INTERPOLATION_CUBIC,
+                        choices=[resample.INTERPOLATION_NONE, resample.INTERPOLATION_LINEAR,
+                                 resample.INTERPOLATION_CUBIC])
+    options = parser.parse_args(argv)
+
+    source = test_image(options.size)
+    image_height = options.size * 2
+    print("%d frames of %dx%d, interpolation %d"
+          % (options.frames, options.size, options.size, options.interpolation))
+    old = run("two-pass", two_pass_frames(source, (0, 0), image_height, options.frames,
+                                          options.interpolation), options.frames)
+    new = run("frame plan", effects.rotated_scaled_frames(source, (0, 0), image_height,
+                                                          options.frames, options.interpolation),
+              options.frames)
+    print("speed-up   %.2fx" % (old / new))
+
+
+if __name__ == "__main__":
+    main()
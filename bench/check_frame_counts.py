@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+# Consistency check of the frame counts of the cross effects.
+#
+#   python bench/check_frame_counts.py
+#
+# "Cross GIF" and "Crossopen" are built by several code paths that must
+# agree on how many frames there are: frameplan.cross_frame_count(), the
+# NumPy frames of effects.cross_frames(), the motion plan that thins them,
+# the frame cache keys, the layers of the new image (run on the recording
+# gimpfu stand-in) and the frames of an exported APNG, whose acTL chunk
+# announces their number before they are written.  Door and rotation counts
+# of 0 are checked too: without doors, "Crossopen" still ends with its
+# locked frame, made from the last rotation frame.  Exits with status 1 if
+# any path disagrees.
+from __future__ import print_function
+
+import os
+import shutil
+import struct
+import sys
+import tempfile
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+sys.path.insert(0, os.path.join(BENCH_DIR, "standin"))
+sys.path.insert(0, BENCH_DIR)
+
+import gimpfu
+import run_plugins
+
+from gimpscript import effects, export, frameplan, motion, resample
+
+CASES = [(8, 4), (8, 0), (0, 4), (1, 1), (0, 0)]
+
+_PROCEDURES = {False: "python_fu_cross_gif", True: "python_fu_cross_open_gif"}
+
+# Canvas, and a layer smaller than it away from the top left corner.
+_WIDTH, _HEIGHT = 48, 40
+_LAYER_RECT = (6, 5, 30, 20)
+
+
+def apng_frames(path):
+    # Frame count announced by the acTL chunk, and the fcTL chunks written.
+    with open(path, "rb") as handle:
+        data = handle.read()
+    announced = None
+    written = 0
+    position = 8
+    while position < len(data):
+        length, kind = struct.unpack(">I4s", data[position:position + 8])
+        if kind == b"acTL":
+            announced = struct.unpack(">I", data[position + 8:position + 12])[0]
+        elif kind == b"fcTL":
+            written += 1
+        position += 12 + length
+    return announced, written
+
+
+def run_plugin(locked, num_rot_frames, num_open_frames, *args):
+    # Runs the plug-in on the stand-in and returns the image it worked on.
+    function = run_plugins.load_procedure(_PROCEDURES[locked])
+    image = gimpfu.Image(_WIDTH, _HEIGHT)
+    background = gimpfu.Drawable(image, "Background", _WIDTH, _HEIGHT, 4)
+    background.pixels = run_plugins.test_pixels(_WIDTH, _HEIGHT)
+    gimpfu.pdb.gimp_image_insert_layer(image, background, None, 0)
+    layer = gimpfu.Drawable(image, "Layer", _LAYER_RECT[2], _LAYER_RECT[3], 4)
+    layer.pixels = run_plugins.test_pixels(_LAYER_RECT[2], _LAYER_RECT[3])
+    layer.set_offsets(*_LAYER_RECT[:2])
+    gimpfu.pdb.gimp_image_insert_layer(image, layer, None, 0)
+    gimpfu.reset()
+    function(image, layer, num_rot_frames, num_open_frames, *args)
+    return layer
+
+
+def layer_count():
+    # Layers of the new image, from the plug-in's closing message.
+    for message in gimpfu.messages:
+        if message.startswith("New animation image created with "):
+            return int(message.split()[5])
+    return None
+
+
+def counts(locked, num_rot_frames, num_open_frames, tmp):
+    source = run_plugins.test_pixels(_LAYER_RECT[2], _LAYER_RECT[3])
+    source_canvas = run_plugins.test_pixels(_WIDTH, _HEIGHT)
+    args = (source, _LAYER_RECT[:2], source_canvas, num_rot_frames, num_open_frames,
+            resample.INTERPOLATION_LINEAR)
+    path = os.path.join(tmp, "cross.png")
+    run_plugin(locked, num_rot_frames, num_open_frames, export.OUTPUT_APNG, path, 40, 0, False)
+    announced, written = apng_frames(path) if os.path.exists(path) else (None, None)
+    run_plugin(locked, num_rot_frames, num_open_frames)
+    return [
+        ("planned", frameplan.cross_frame_count(num_rot_frames, num_open_frames, locked)),
+        ("numpy frames", len(list(effects.cross_frames(*args, locked=locked)))),
+        ("motion", len(motion.cross(_LAYER_RECT, _WIDTH, _HEIGHT, num_rot_frames, num_open_frames,
+                                    locked))),
+        ("cache keys", len(effects.frame_keys(effects.cross_frames, args, {"locked": locked}))),
+        ("layers", layer_count()),
+        ("apng acTL", announced),
+        ("apng fcTL", written),
+    ]
+
+
+def main():
+    gimpfu.SIMULATE = True
+    tmp = tempfile.mkdtemp(prefix="gimpscript-counts-")
+    passed = True
+    try:
+        for locked in (False, True):
+            for num_rot_frames, num_open_frames in CASES:
+                found = counts(locked, num_rot_frames, num_open_frames, tmp)
+                expected = found[0][1]
+                ok = all(count == expected for name, count in found)
+                # Nothing to write: the plug-ins make no image and no file.
+                if expected == 0:
+                    ok = all(count in (0, None) for name, count in found)
+                passed = passed and ok
+                print("%-26s rot %2d open %2d: %s  %s" % (
+                    _PROCEDURES[locked], num_rot_frames, num_open_frames,
+                    ", ".join("%s %s" % (name, count) for name, count in found),
+                    "ok" if ok else "FAIL"))
+    finally:
+        shutil.rmtree(tmp)
+    print("frame counts: %s" % ("ok" if passed else "FAILED"))
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
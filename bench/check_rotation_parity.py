@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+# Parity check of the NumPy rotation engine (gimpscript.resample) against a
+# reference renderer, for arbitrary angles of "Only Rotate" rather than the
+# quarter turns, which are exact pixel moves.
+#
+#   python bench/check_rotation_parity.py --size 128 --frames 300
+#
+# Outside GIMP the linear reference is Pillow's bilinear affine transform,
+# given the same inverse matrix, and the cubic one a direct Catmull-Rom
+# convolution in double precision (Pillow's bicubic rounds between its two
+# passes and is up to 3 levels off an exact Catmull-Rom).
+# From GIMP's Python-Fu console, exec() this file and call main([]) to
+# compare against the PDB path instead: the same planned frame applied to a
+# layer with layers.transform_layer().  Only interior pixels are compared,
+# those whose interpolation taps all fall inside the source layer, since
+# edge pixels depend on how each renderer treats the outside.  Every frame
+# must be within TOLERANCE of the reference, and the last frame (360°) equal
+# to the first.
+#
+# The rotation phase of the cross effects is also checked against the call
+# of the original plug-ins, gimp_item_transform_rotate(layer, angle, True,
+# mid_x, mid_y): auto_center turns an offset layer smaller than the canvas
+# about its own centre and grows it to fit.  Both the PDB path
+# (layers.transform_layer) and the NumPy frames must give that call's
+# offsets and size, and interior pixels within TOLERANCE of it.  Outside
+# GIMP the call is made on the stand-in with simulated pixels.  Exits with
+# status 1 if any check fails.
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+try:
+    import gimpfu
+except ImportError:
+    sys.path.insert(0, os.path.join(BENCH_DIR, "standin"))
+    import gimpfu
+
+import math
+
+from gimpscript import effects, frameplan, resample
+
+# Largest difference allowed in any channel of an interior pixel.
+TOLERANCE = 1
+
+# Angles checked by default, none of them a quarter turn.
+ANGLES = [1.2, 7.5, 30.0, 45.0, 100.8, 179.0, 217.5, 333.3]
+
+# Interpolation taps reach this far from the sampled point.
+_REACH = {resample.INTERPOLATION_LINEAR: 1, resample.INTERPOLATION_CUBIC: 2}
+_NAMES = {resample.INTERPOLATION_LINEAR: "linear", resample.INTERPOLATION_CUBIC: "cubic"}
+
+
+def in_gimp():
+    # The stand-in has a SIMULATE switch; GIMP's gimpfu does not.
+    return not hasattr(gimpfu, "SIMULATE")
+
+
+def test_image(size):
+    # Smooth gradients under a soft pattern, opaque so that premultiplying
+    # does not matter.
+    y, x = np.mgrid[0:size, 0:size].astype(np.float64) / size
+    pixels = np.empty((size, size, 4), dtype=np.uint8)
+    pixels[:, :, 0] = 255 * x
+    pixels[:, :, 1] = 127.5 + 127.5 * np.sin(9 * x + 5 * y)
+    pixels[:, :, 2] = 127.5 + 127.5 * np.cos(14 * x * y)
+    pixels[:, :, 3] = 255
+    return pixels
+
+
+def source_coordinates(frame, offsets=(0, 0)):
+    # Source coordinates of the frame's pixel centres, integers falling on
+    # the centres of the pixels of a source layer at `offsets`.
+    x0, y0, out_width, out_height = frame.bounds
+    inverse = np.linalg.inv(np.array(frame.matrix))
+    py, px = np.mgrid[0:out_height, 0:out_width].astype(np.float64)
+    px += x0 + 0.5
+    py += y0 + 0.5
+    u = inverse[0, 0] * px + inverse[0, 1] * py + inverse[0, 2] - 0.5 - offsets[0]
+    v = inverse[1, 0] * px + inverse[1, 1] * py + inverse[1, 2] - 0.5 - offsets[1]
+    return u, v
+
+
+def interior(frame, width, height, reach, offsets=(0, 0)):
+    # Mask of the frame's pixels whose taps are all inside the source layer.
+    u, v = source_coordinates(frame, offsets)
+    return ((u >= reach) & (u <= width - 1 - reach)
+            & (v >= reach) & (v <= height - 1 - reach))
+
+
+def offline_reference(source, frame, interpolation):
+    if interpolation == resample.INTERPOLATION_LINEAR:
+        return pillow_bilinear(source, frame)
+    return direct_cubic(source, frame)
+
+
+def pillow_bilinear(source, frame):
+    from PIL import Image
+
+    x0, y0, out_width, out_height = frame.bounds
+    # Pillow maps output pixel coordinates, not image coordinates.
+    inverse = np.dot(np.linalg.inv(np.array(frame.matrix)), resample.translation_matrix(x0, y0))
+    image = Image.fromarray(source, "RGBA")
+    result = image.transform((out_width, out_height), Image.AFFINE,
+                             tuple(inverse[:2].ravel()), Image.BILINEAR)
+    return np.array(result)
+
+
+def direct_cubic(source, frame):
+    # Sixteen Catmull-Rom taps per pixel, in float64, written out here rather
+    # than shared with gimpscript.resample.
+    height, width = source.shape[:2]
+    u, v = source_coordinates(frame)
+    fx = np.floor(u)
+    fy = np.floor(v)
+    tx = (u - fx)[:, :, None]
+    ty = (v - fy)[:, :, None]
+    ix = fx.astype(np.intp)
+    iy = fy.astype(np.intp)
+    pixels = source.astype(np.float64)
+    result = 0.0
+    for j, wy in enumerate(_catmull_rom(ty)):
+        for i, wx in enumerate(_catmull_rom(tx)):
+            taps = pixels[np.clip(iy + j - 1, 0, height - 1), np.clip(ix + i - 1, 0, width - 1)]
+            result = result + taps * (wx * wy)
+    return np.rint(np.clip(result, 0.0, 255.0)).astype(np.uint8)
+
+
+def _catmull_rom(t):
+    return ((-t ** 3 + 2 * t ** 2 - t) / 2.0,
+            (3 * t ** 3 - 5 * t ** 2 + 2) / 2.0,
+            (-3 * t ** 3 + 4 * t ** 2 + t) / 2.0,
+            (t ** 3 - t ** 2) / 2.0)
+
+
+def pdb_reference(source, frame, interpolation):
+    from gimpscript import layers, pixels
+
+    pdb = gimpfu.pdb
+    height, width = source.shape[:2]
+    image = pdb.gimp_image_new(width, height, gimpfu.RGB)
+    try:
+        layer = pixels.add_layer_from_array(image, source, "parity")
+        pdb.gimp_context_push()
+        try:
+            pdb.gimp_context_set_interpolation(interpolation)
+            layer = layers.transform_layer(layer, frame)
+        finally:
+            pdb.gimp_context_pop()
+        return np.array(pixels.read_drawable(layer))
+    finally:
+        pdb.gimp_image_delete(image)
+
+
+def baseline_cross_rotation(canvas_size, source, offsets, angle, interpolation, planned=None):
+    # The layer at `offsets` in a canvas, rotated by the original call of the
+    # cross effects, or by layers.transform_layer() given the `planned` frame.
+    # Returns (pixels, offsets).
+    from gimpscript import layers, pixels
+
+    pdb = gimpfu.pdb
+    image = pdb.gimp_image_new(canvas_size[0], canvas_size[1], gimpfu.RGB)
+    try:
+        layer = pixels.add_layer_from_array(image, source, "cross parity", offsets)
+        pdb.gimp_context_push()
+        try:
+            pdb.gimp_context_set_interpolation(interpolation)
+            if planned is None:
+                layer = pdb.gimp_item_transform_rotate(layer, math.radians(angle), True,
+                                                       canvas_size[0] // 2, canvas_size[1] // 2)
+            else:
+                layer = layers.transform_layer(layer, planned)
+        finally:
+            pdb.gimp_context_pop()
+        return np.array(pixels.read_drawable(layer)), tuple(layer.offsets)
+    finally:
+        pdb.gimp_image_delete(image)
+
+
+def check_cross_rotation(size, num_rot_frames, interpolation):
+    # Every rotation frame of the cross effects, for a layer smaller than the
+    # canvas and away from its centre, against the original call.
+    canvas_size = (size + size // 2, size + size // 3)
+    source = test_image(size)[:, : size * 3 // 4].copy()
+    offsets = (size // 5, size // 7)
+    height, width = source.shape[:2]
+    angles = frameplan.cross_rotation_angles(num_rot_frames)
+    rect = offsets + (width, height)
+    plan = frameplan.rotation_plan(rect, angles, frameplan.layer_center(rect))
+    numpy_frames = effects.cross_rotation_frames(source, offsets, num_rot_frames, interpolation)
+    passed = True
+    for frame, numpy_frame in zip(plan, numpy_frames):
+        angle = angles[frame.index]
+        expected, expected_offsets = baseline_cross_rotation(canvas_size, source, offsets, angle,
+                                                             interpolation)
+        mask = interior(frame, width, height, _REACH[interpolation], offsets)
+        for path, (pixels, frame_offsets) in (
+                ("pdb", baseline_cross_rotation(canvas_size, source, offsets, angle, interpolation,
+                                                frame)),
+                ("numpy", numpy_frame)):
+            same_place = (frame_offsets == expected_offsets and pixels.shape == expected.shape)
+            worst = -1
+            if same_place:
+                difference = np.abs(pixels.astype(np.int16) - expected.astype(np.int16)).max(axis=2)
+                worst = int(difference[mask].max()) if mask.any() else 0
+            ok = same_place and worst <= TOLERANCE
+            passed = passed and ok
+            print("%-7s %8.2f %-6s %9s %9s %6s" % (
+                _NAMES[interpolation], angle, path, int(mask.sum()),
+                worst if same_place else "%s/%s" % (frame_offsets, expected_offsets),
+                "ok" if ok else "FAIL"))
+    return passed
+
+
+def check_angles(source, angles, interpolation, reference):
+    # Largest interior difference of each angle; True if all are within
+    # TOLERANCE.
+    height, width = source.shape[:2]
+    plan = frameplan.rotation_plan((0, 0, width, height), angles, (width / 2.0, height / 2.0))
+    frames = resample.render_plan(source, (0, 0), plan, interpolation)
+    passed = True
+    for frame, (pixels, offsets) in zip(plan, frames):
+        expected = reference(source, frame, interpolation)
+        mask = interior(frame, width, height, _REACH[interpolation])
+        difference = np.abs(pixels.astype(np.int16) - expected.astype(np.int16)).max(axis=2)
+        worst = int(difference[mask].max()) if mask.any() else 0
+        ok = expected.shape == pixels.shape and worst <= TOLERANCE
+        passed = passed and ok
+        print("%-7s %8.2f %9d %9d %6s" % (_NAMES[interpolation], angles[frame.index],
+                                          int(mask.sum()), worst, "ok" if ok else "FAIL"))
+    return passed
+
+
+def check_full_turn(source, num_frames, interpolation):
+    # The last frame of "Only Rotate" turns 360° and must match the first.
+    frames = list(effects.rotated_frames(source, (0, 0), num_frames, interpolation,
+                                         frames=[0, num_frames - 1]))
+    (first, first_offsets), (last, last_offsets) = frames
+    ok = first_offsets == last_offsets and np.array_equal(first, last)
+    print("%-7s frame %d equals frame 0: %s" % (_NAMES[interpolation], num_frames - 1,
+                                                "ok" if ok else "FAIL"))
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check NumPy rotations against a reference.")
+    parser.add_argument("--size", type=int, default=128)
+    parser.add_argument("--frames", type=int, default=300,
+                        help="frame count for the full-turn check and, with --all, the angles")
+    parser.add_argument("--all", action="store_true",
+                        help="check every angle of --frames instead of a sample")
+    parser.add_argument("--cross-frames", type=int, default=24,
+                        help="rotation frames of the cross effects checked against the original call")
+    options = parser.parse_args(argv)
+    if not in_gimp():
+        # The stand-in resamples for real so that its transforms have pixels.
+        gimpfu.SIMULATE = True
+        gimpfu.reset()
+
+    source = test_image(options.size)
+    if options.all:
+        angles = frameplan.rotation_angles(options.frames)
+    else:
+        angles = ANGLES
+    reference = pdb_reference if in_gimp() else offline_reference
+    print("reference: %s, tolerance %d"
+          % ("GIMP PDB" if in_gimp() else "Pillow (linear), float64 Catmull-Rom (cubic)", TOLERANCE))
+    print("%-7s %8s %9s %9s %6s" % ("interp", "angle", "interior", "max diff", ""))
+    passed = True
+    for interpolation in (resample.INTERPOLATION_LINEAR, resample.INTERPOLATION_CUBIC):
+        passed = check_angles(source, angles, interpolation, reference) and passed
+        passed = check_full_turn(source, options.frames, interpolation) and passed
+    print("cross rotation against gimp_item_transform_rotate(layer, angle, True, mid_x, mid_y)")
+    print("%-7s %8s %-6s %9s %9s %6s" % ("interp", "angle", "path", "interior", "max diff", ""))
+    for interpolation in (resample.INTERPOLATION_LINEAR, resample.INTERPOLATION_CUBIC):
+        passed = check_cross_rotation(options.size, options.cross_frames, interpolation) and passed
+    print("parity: %s" % ("ok" if passed else "FAILED"))
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+# Runs every plug-in against the recording gimpfu stand-in (bench/standin)
+# and compares the results with a JSON baseline.
+#
+#   python bench/run_plugins.py                      # run, compare with baseline.json
+#   python bench/run_plugins.py --update-baseline    # run, rewrite baseline.json
+#   python bench/run_plugins.py --simulate --size 512 --only rotate-pdb
+#
+# For each scenario it reports the wall time, frames per second, PDB calls
+# per frame and peak traced memory.  A scenario regresses when it makes more
+# PDB calls per frame than the baseline, or takes more than --tolerance times
+# its time or memory; the exit status is then 1, for CI.
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import runpy
+import shutil
+import sys
+import tempfile
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Frames loaded from the frame cache would hide the rendering cost.
+os.environ.setdefault("GIMPSCRIPT_CACHE_MB", "0")
+SRC_DIR = os.path.join(BENCH_DIR, "..", "src")
+sys.path[:0] = [os.path.join(BENCH_DIR, "standin"), SRC_DIR]
+
+import numpy as np
+
+import gimpfu
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+ENTRY_POINT = os.path.join(SRC_DIR, "gimpscript_effects.py")
+
+# Output choices of export.OUTPUT_PARAMS, preview choices of
+# draft.PREVIEW_PARAMS, undo choices of undo.UNDO_PARAMS and a target of
+# motion.MOTION_PARAMS.
+_OUTPUT_APNG = 2
+_OUTPUT_ATLAS = 4
+_PREVIEW_DRAFT = 1
+_UNDO_SNAPSHOT = 1
+_MOTION_PX = 4.0
+
+# Growth below these is timer or allocator noise, whatever the tolerance.
+_TIME_SLACK = 0.05
+_MEMORY_SLACK = 1000000
+
+# Procedures called on a timer rather than per frame (the progress text is
+# throttled), left out of the per-frame counts so that they stay exact.
+_TIMED_PROCEDURES = ("gimp_progress_set_text",)
+
+
+def single_layer(size):
+    image = gimpfu.Image(size, size)
+    layer = gimpfu.Drawable(image, "Source", size, size, 4)
+    layer.pixels = test_pixels(size, size)
+    gimpfu.pdb.gimp_image_insert_layer(image, layer, None, 0)
+    return image, layer
+
+
+def sonar_layers(size):
+    image = gimpfu.Image(size, size)
+    background = gimpfu.Drawable(image, "Background", size, size, 4)
+    background.pixels = test_pixels(size, size)[::-1].copy()
+    foreground = gimpfu.Drawable(image, "foreground", size, size, 4)
+    foreground.pixels = test_pixels(size, size)
+    gimpfu.pdb.gimp_image_insert_layer(image, background, None, 0)
+    gimpfu.pdb.gimp_image_insert_layer(image, foreground, None, 0)
+    return image, foreground
+
+
+def test_pixels(width, height):
+    y, x = np.mgrid[0:height, 0:width]
+    pixels = np.empty((height, width, 4), dtype=np.uint8)
+    pixels[:, :, 0] = x * 255 // max(width - 1, 1)
+    pixels[:, :, 1] = y * 255 // max(height - 1, 1)
+    pixels[:, :, 2] = ((x // 16 + y // 16) % 2) * 255
+    pixels[:, :, 3] = 255
+    return pixels
+
+
+# name, procedure, image factory, arguments after (image, drawable), number of
+# frames produced.  Frame counts are those used in production.
+SCENARIOS = [
+    ("rotate-pdb", "python_fu_create_rotated_layers", single_layer, [300], 300),
+    ("rotate-numpy", "python_fu_create_rotated_layers", single_layer, [300, 1], 300),
+    ("rotate-apng", "python_fu_create_rotated_layers", single_layer,
+     [300, 1, gimpfu.INTERPOLATION_CUBIC, _OUTPUT_APNG, "{tmp}/rotate.png", 40, 0, False], 300),
+    ("rotate-atlas", "python_fu_create_rotated_layers", single_layer,
+     [300, 1, gimpfu.INTERPOLATION_CUBIC, _OUTPUT_ATLAS, "{tmp}/rotate.png", 40, 0, False], 300),
+    ("rotate-scale", "python_fu_create_rotated_scaled_translated_layers", single_layer, [300], 300),
+    ("cross", "python_fu_cross_gif", single_layer, [200, 60], 260),
+    ("crossopen", "python_fu_cross_open_gif", single_layer, [200, 60], 261),
+    ("sonar", "python_fu_sonar_disappearance", sonar_layers, [20], 21),
+    ("sonar2", "python_fu_sonar_disappearance2", sonar_layers, [20], 20),
+    ("rotate-draft", "python_fu_create_rotated_layers", single_layer,
+     [300, 0, gimpfu.INTERPOLATION_CUBIC, 0, "", 40, 0, True, 1, 1, 4, 1024, _PREVIEW_DRAFT], 300),
+    ("crossopen-draft", "python_fu_cross_open_gif", single_layer,
+     [200, 60, 0, "", 40, 0, True, 1, 1, 4, 1024, _PREVIEW_DRAFT], 261),
+    ("rotate-snapshot", "python_fu_create_rotated_layers", single_layer,
+     [300, 0, gimpfu.INTERPOLATION_CUBIC, 0, "", 40, 0, True, 1, 1, 4, 1024, 0, _UNDO_SNAPSHOT], 300),
+    ("crossopen-motion", "python_fu_cross_open_gif", single_layer,
+     [200, 60, 0, "", 40, 0, True, 1, 1, 4, 1024, 0, _MOTION_PX], 261),
+]
+
+
+def load_procedure(procedure):
+    # Runs the plug-in entry point, which registers the procedures with the
+    # stand-in.
+    gimpfu.registered.clear()
+    runpy.run_path(ENTRY_POINT, run_name="plugin")
+    return gimpfu.registered[procedure]
+
+
+def run_scenario(scenario, size, tmp):
+    name, procedure, factory, args, num_frames = scenario
+    function = load_procedure(procedure)
+    image, drawable = factory(size)
+    args = [a.format(tmp=tmp) if isinstance(a, str) else a for a in args]
+    gimpfu.reset()
+    if tracemalloc is not None:
+        tracemalloc.start()
+    started = time.time()
+    function(image, drawable, *args)
+    seconds = time.time() - started
+    peak = None
+    if tracemalloc is not None:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    pdb_calls = dict((k, v) for k, v in gimpfu.calls.items()
+                     if not k.startswith("gimp.") and k not in _TIMED_PROCEDURES)
+    return {
+        "frames": num_frames,
+        "seconds": round(seconds, 3),
+        "frames_per_second": round(num_frames / max(seconds, 1e-9), 1),
+        "pdb_calls": sum(pdb_calls.values()),
+        "pdb_calls_per_frame": round(sum(pdb_calls.values()) / float(num_frames), 3),
+        "peak_memory_bytes": peak,
+        "calls": dict(gimpfu.calls),
+        "messages": list(gimpfu.messages),
+    }
+
+
+def regressions(results, baseline, tolerance):
+    found = []
+    for name, result in sorted(results.items()):
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result["pdb_calls_per_frame"] > before["pdb_calls_per_frame"]:
+            found.append("%s: %.3f PDB calls per frame, baseline %.3f"
+                         % (name, result["pdb_calls_per_frame"], before["pdb_calls_per_frame"]))
+        if result["seconds"] > tolerance * before["seconds"] + _TIME_SLACK:
+            found.append("%s: %.2f s, baseline %.2f s" % (name, result["seconds"], before["seconds"]))
+        if (result["peak_memory_bytes"] and before.get("peak_memory_bytes")
+                and result["peak_memory_bytes"]
+                > tolerance * before["peak_memory_bytes"] + _MEMORY_SLACK):
+            found.append("%s: peak memory %.1f MB, baseline %.1f MB"
+                         % (name, result["peak_memory_bytes"] / 1e6,
+                            before["peak_memory_bytes"] / 1e6))
+    return found
+
+
+def run_all(options, tmp):
+    results = {}
+    print("%-16s %7s %9s %8s %10s %10s" % ("scenario", "frames", "seconds", "fps",
+                                           "pdb/frame", "peak MB"))
+    for scenario in SCENARIOS:
+        if options.only and scenario[0] not in options.only:
+            continue
+        result = run_scenario(scenario, options.size, tmp)
+        results[scenario[0]] = result
+        print("%-16s %7d %9.2f %8.1f %10.2f %10s"
+              % (scenario[0], result["frames"], result["seconds"], result["frames_per_second"],
+                 result["pdb_calls_per_frame"],
+                 "-" if result["peak_memory_bytes"] is None
+                 else "%.1f" % (result["peak_memory_bytes"] / 1e6)))
+        for message in result["messages"]:
+            print("    message: %s" % message)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run the plug-ins without GIMP and compare with a baseline.")
+    parser.add_argument("--size", type=int, default=128, help="source image size in pixels")
+    parser.add_argument("--simulate", action="store_true",
+                        help="give layers pixels and resample them in the PDB transforms")
+    parser.add_argument("--only", nargs="+", default=None, metavar="SCENARIO",
+                        choices=[s[0] for s in SCENARIOS])
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=1.5,
+                        help="allowed time and memory growth factor (default 1.5)")
+    parser.add_argument("--output", default=None, help="also write the results to this file")
+    options = parser.parse_args(argv)
+
+    gimpfu.SIMULATE = options.simulate
+    tmp = tempfile.mkdtemp(prefix="gimpscript-bench-")
+    try:
+        results = run_all(options, tmp)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    document = {"size": options.size, "simulate": options.simulate, "results": results}
+    if options.output:
+        with open(options.output, "w") as handle:
+            json.dump(document, handle, indent=2, sort_keys=True)
+    if options.update_baseline or not os.path.exists(options.baseline):
+        with open(options.baseline, "w") as handle:
+            json.dump(document, handle, indent=2, sort_keys=True)
+        print("baseline written to %s" % options.baseline)
+        return 0
+
+    with open(options.baseline) as handle:
+        baseline = json.load(handle)
+    if (baseline.get("size"), baseline.get("simulate")) != (options.size, options.simulate):
+        print("baseline was recorded with --size %s%s; not comparing"
+              % (baseline.get("size"), " --simulate" if baseline.get("simulate") else ""))
+        return 0
+    found = regressions(results, baseline["results"], options.tolerance)
+    for line in found:
+        print("REGRESSION %s" % line)
+    if not found:
+        print("no regressions against %s" % options.baseline)
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,435 @@
+# -*- coding: utf-8 -*-
+# Stand-in for GIMP's gimpfu module, so that the plug-ins run without GIMP.
+#
+# `pdb` records every procedure call; the procedures the plug-ins rely on are
+# implemented on plain Image and Drawable objects, enough for the scripts to
+# run their whole course.  Layers only track their size and offsets unless
+# SIMULATE is set, in which case they carry NumPy pixels and the transforms
+# resample them (with gimpscript.resample), so that the timings include
+# pixel work comparable to GIMP's.
+import collections
+import itertools
+import math
+
+# Set to True to give layers pixels and make the transforms resample them.
+SIMULATE = False
+
+# Enum values, as in GIMP 2.10.
+RGB, GRAY, INDEXED = 0, 1, 2
+RGB_IMAGE, RGBA_IMAGE, GRAY_IMAGE, GRAYA_IMAGE = 0, 1, 2, 3
+NORMAL_MODE = 28
+INTERPOLATION_NONE, INTERPOLATION_LINEAR, INTERPOLATION_CUBIC = 0, 1, 2
+ROTATE_90, ROTATE_180, ROTATE_270 = 0, 1, 2
+TRANSFORM_RESIZE_ADJUST, TRANSFORM_RESIZE_CLIP = 0, 1
+CHANNEL_OP_ADD, CHANNEL_OP_SUBTRACT, CHANNEL_OP_REPLACE = 0, 1, 2
+ADD_WHITE_MASK, ADD_BLACK_MASK = 0, 1
+FOREGROUND_FILL, BACKGROUND_FILL = 0, 1
+EXPAND_AS_NECESSARY, CLIP_TO_IMAGE = 0, 1
+PF_INT, PF_FLOAT, PF_STRING, PF_TOGGLE, PF_OPTION = 0, 3, 4, 7, 21
+
+# Registered procedures: name -> function, filled by register().
+registered = {}
+
+# Number of calls of every PDB procedure, and of the libgimp functions under
+# a "gimp." prefix.
+calls = collections.Counter()
+messages = []
+
+# Item IDs, unique for the session as in GIMP.
+_ids = itertools.count(1)
+
+_BPP = {RGB_IMAGE: 3, RGBA_IMAGE: 4, GRAY_IMAGE: 1, GRAYA_IMAGE: 2}
+
+
+def reset():
+    calls.clear()
+    del messages[:]
+    del _context[1:]
+    _context[0].update(interpolation=INTERPOLATION_CUBIC,
+                       transform_resize=TRANSFORM_RESIZE_ADJUST)
+
+
+def register(proc_name, blurb, help, author, copyright, date, label, imagetypes,
+             params, results, function, **kwargs):
+    registered[proc_name] = function
+
+
+def main():
+    pass
+
+
+class Image(object):
+
+    def __init__(self, width, height, base_type=RGB):
+        self.width = width
+        self.height = height
+        self.base_type = base_type
+        self.layers = []
+        self.active_layer = None
+        self.selection = None
+        self.parasites = {}
+
+    def add_layer(self, layer, position=-1):
+        _insert(self, layer, position)
+
+    def attach_new_parasite(self, name, flags, data):
+        self.parasites[name] = Parasite(name, flags, data)
+
+    def parasite_find(self, name):
+        return self.parasites.get(name)
+
+    def parasite_detach(self, name):
+        del self.parasites[name]
+
+
+class Parasite(object):
+
+    def __init__(self, name, flags, data):
+        self.name = name
+        self.flags = flags
+        self.data = data
+
+
+class Drawable(object):
+
+    def __init__(self, image, name, width, height, bpp, opacity=100.0, mode=NORMAL_MODE):
+        self.ID = next(_ids)
+        self.image = image
+        self.name = name
+        self.width = width
+        self.height = height
+        self.bpp = bpp
+        self.opacity = opacity
+        self.mode = mode
+        self.offsets = (0, 0)
+        self.visible = True
+        self.mask = None
+        self._pixels = None
+
+    @property
+    def pixels(self):
+        if self._pixels is None or self._pixels.shape != (self.height, self.width, self.bpp):
+            import numpy as np
+
+            self._pixels = np.zeros((self.height, self.width, self.bpp), dtype=np.uint8)
+        return self._pixels
+
+    @pixels.setter
+    def pixels(self, pixels):
+        self._pixels = pixels
+        if pixels is not None:
+            self.height, self.width = pixels.shape[:2]
+
+    def copy(self, image=None):
+        layer = Drawable(image or self.image, self.name + " copy", self.width, self.height,
+                         self.bpp, self.opacity, self.mode)
+        layer.offsets = self.offsets
+        if SIMULATE or self._pixels is not None:
+            layer.pixels = self.pixels.copy()
+        return layer
+
+    def get_pixel_rgn(self, x, y, width, height, dirty=False, shadow=False):
+        calls["gimp.get_pixel_rgn"] += 1
+        return PixelRgn(self)
+
+    def set_offsets(self, x, y):
+        self.offsets = (x, y)
+
+    def add_mask(self, mask):
+        self.mask = mask
+
+    def flush(self):
+        pass
+
+    def update(self, x, y, width, height):
+        pass
+
+
+class PixelRgn(object):
+    # Rectangle reads and writes, region[x0:x1, y0:y1], as bytes.
+
+    def __init__(self, drawable):
+        self.drawable = drawable
+
+    def _rect(self, key):
+        columns, rows = key
+        return (slice(rows.start or 0, rows.stop or self.drawable.height),
+                slice(columns.start or 0, columns.stop or self.drawable.width))
+
+    def __getitem__(self, key):
+        calls["gimp.pixel_rgn_read"] += 1
+        rows, columns = self._rect(key)
+        return self.drawable.pixels[rows, columns].tobytes()
+
+    def __setitem__(self, key, data):
+        import numpy as np
+
+        calls["gimp.pixel_rgn_write"] += 1
+        rows, columns = self._rect(key)
+        target = self.drawable.pixels[rows, columns]
+        target[...] = np.frombuffer(data, dtype=np.uint8).reshape(target.shape)
+
+
+def _insert(image, layer, position):
+    # Position -1 puts the layer above the active one, as in GIMP.
+    layer.image = image
+    if position < 0:
+        active = image.active_layer
+        position = image.layers.index(active) if active in image.layers else 0
+    image.layers.insert(position, layer)
+    image.active_layer = layer
+
+
+def _remove(layer):
+    if layer in layer.image.layers:
+        layer.image.layers.remove(layer)
+
+
+class _Gimp(object):
+    # The parts of the `gimp` module the plug-ins use.
+
+    def Layer(self, image, name, width, height, layer_type, opacity=100.0, mode=NORMAL_MODE):
+        calls["gimp.Layer"] += 1
+        return Drawable(image, name, width, height, _BPP[layer_type], opacity, mode)
+
+    def progress_init(self, message=""):
+        calls["gimp.progress_init"] += 1
+
+    def progress_update(self, fraction):
+        calls["gimp.progress_update"] += 1
+
+    def displays_flush(self):
+        calls["gimp.displays_flush"] += 1
+
+    def tile_width(self):
+        return 64
+
+    def tile_height(self):
+        return 64
+
+
+gimp = _Gimp()
+
+_context = [{}]
+
+
+def _transform(layer, matrix, clip):
+    # Applies an image-space matrix to the layer like GIMP's transform tools.
+    from gimpscript import frameplan
+
+    x, y = layer.offsets
+    rect = (x, y, layer.width, layer.height)
+    bounds = rect if clip else frameplan.transformed_rect(matrix, rect)
+    if SIMULATE:
+        import numpy as np
+        from gimpscript import resample
+
+        local = np.dot(np.array(matrix), resample.translation_matrix(x, y))
+        pixels, offsets = resample.Resampler(layer.pixels).render(
+            local, _context[-1]["interpolation"], bounds)
+        layer.pixels = pixels
+        layer.bpp = pixels.shape[2]
+    layer.offsets = bounds[:2]
+    layer.width, layer.height = bounds[2:]
+    return layer
+
+
+def _resized(layer, width, height, offset_x, offset_y):
+    x, y = layer.offsets
+    if SIMULATE:
+        from gimpscript import canvas
+
+        layer.pixels = canvas.place(canvas.blank(width, height, layer.bpp), layer.pixels,
+                                    (offset_x, offset_y))
+    layer.width, layer.height = width, height
+    layer.offsets = (x - offset_x, y - offset_y)
+
+
+class _Procedures(object):
+    # Implementations of the procedures the plug-ins call; the rest only get
+    # recorded.
+
+    def gimp_message(self, message):
+        messages.append(message)
+
+    def gimp_context_push(self):
+        _context.append(dict(_context[-1]))
+
+    def gimp_context_pop(self):
+        _context.pop()
+
+    def gimp_context_set_interpolation(self, interpolation):
+        _context[-1]["interpolation"] = interpolation
+
+    def gimp_context_set_transform_resize(self, transform_resize):
+        _context[-1]["transform_resize"] = transform_resize
+
+    def gimp_drawable_is_indexed(self, drawable):
+        return False
+
+    def gimp_image_new(self, width, height, base_type):
+        return Image(width, height, base_type)
+
+    def gimp_image_duplicate(self, image):
+        duplicate = Image(image.width, image.height, image.base_type)
+        for layer in image.layers:
+            _insert(duplicate, layer.copy(duplicate), len(duplicate.layers))
+        if image.active_layer in image.layers:
+            duplicate.active_layer = duplicate.layers[image.layers.index(image.active_layer)]
+        return duplicate
+
+    def gimp_image_get_active_layer(self, image):
+        return image.active_layer
+
+    gimp_image_get_active_drawable = gimp_image_get_active_layer
+
+    def gimp_image_set_active_layer(self, image, layer):
+        image.active_layer = layer
+
+    def gimp_image_insert_layer(self, image, layer, parent, position):
+        _insert(image, layer, position)
+
+    def gimp_image_add_layer(self, image, layer, position):
+        _insert(image, layer, position)
+
+    def gimp_image_remove_layer(self, image, layer):
+        _remove(layer)
+        if image.active_layer is layer:
+            image.active_layer = image.layers[0] if image.layers else None
+
+    def gimp_image_select_rectangle(self, image, operation, x, y, width, height):
+        image.selection = (int(x), int(y), int(width), int(height))
+
+    def gimp_selection_none(self, image):
+        image.selection = None
+
+    def gimp_image_merge_down(self, image, layer, merge_type):
+        below = image.layers[image.layers.index(layer) + 1]
+        if SIMULATE:
+            from gimpscript import canvas, resample
+
+            x0 = min(below.offsets[0], layer.offsets[0])
+            y0 = min(below.offsets[1], layer.offsets[1])
+            x1 = max(below.offsets[0] + below.width, layer.offsets[0] + layer.width)
+            y1 = max(below.offsets[1] + below.height, layer.offsets[1] + layer.height)
+            merged = canvas.place(canvas.blank(x1 - x0, y1 - y0),
+                                  resample.as_rgba(below.pixels),
+                                  (below.offsets[0] - x0, below.offsets[1] - y0))
+            canvas.composite_over(merged, resample.as_rgba(layer.pixels),
+                                  (layer.offsets[0] - x0, layer.offsets[1] - y0))
+            below.pixels = merged
+            below.bpp = 4
+            below.offsets = (x0, y0)
+        _remove(layer)
+        return below
+
+    def gimp_image_delete(self, image):
+        del image.layers[:]
+
+    def gimp_layer_new(self, image, width, height, layer_type, name, opacity, mode):
+        return Drawable(image, name, width, height, _BPP[layer_type], opacity, mode)
+
+    def gimp_layer_copy(self, layer, add_alpha):
+        return layer.copy()
+
+    def gimp_layer_new_from_drawable(self, drawable, image):
+        return drawable.copy(image)
+
+    def gimp_layer_set_offsets(self, layer, x, y):
+        layer.offsets = (x, y)
+
+    def gimp_layer_translate(self, layer, dx, dy):
+        layer.offsets = (layer.offsets[0] + dx, layer.offsets[1] + dy)
+
+    def gimp_layer_resize(self, layer, width, height, offset_x, offset_y):
+        _resized(layer, width, height, offset_x, offset_y)
+
+    def gimp_layer_scale(self, layer, width, height, local_origin):
+        x, y = layer.offsets
+        scale_x = float(width) / layer.width
+        scale_y = float(height) / layer.height
+        center_x = x + layer.width / 2.0 if local_origin else 0.0
+        center_y = y + layer.height / 2.0 if local_origin else 0.0
+        matrix = ((scale_x, 0.0, center_x * (1 - scale_x)),
+                  (0.0, scale_y, center_y * (1 - scale_y)),
+                  (0.0, 0.0, 1.0))
+        _transform(layer, matrix, False)
+        layer.width, layer.height = width, height
+
+    def gimp_layer_create_mask(self, layer, mask_type):
+        mask = Drawable(layer.image, layer.name + " mask", layer.width, layer.height, 1)
+        if SIMULATE:
+            mask.pixels[...] = 255 if mask_type == ADD_WHITE_MASK else 0
+        return mask
+
+    def gimp_item_transform_rotate(self, item, angle, auto_center, center_x, center_y):
+        from gimpscript import frameplan
+
+        if auto_center:
+            center_x = item.offsets[0] + item.width / 2.0
+            center_y = item.offsets[1] + item.height / 2.0
+        matrix = frameplan.rotation(math.degrees(angle), center_x, center_y)
+        clip = _context[-1]["transform_resize"] == TRANSFORM_RESIZE_CLIP
+        return _transform(item, matrix, clip)
+
+    def gimp_item_transform_rotate_simple(self, item, rotate_type, auto_center, center_x,
+                                          center_y):
+        return self.gimp_item_transform_rotate(item, math.radians(90.0 * (rotate_type + 1)),
+                                               auto_center, center_x, center_y)
+
+    def gimp_item_transform_matrix(self, item, *coefficients):
+        matrix = (coefficients[0:3], coefficients[3:6], coefficients[6:9])
+        clip = _context[-1]["transform_resize"] == TRANSFORM_RESIZE_CLIP
+        return _transform(item, matrix, clip)
+
+    def gimp_edit_named_copy(self, drawable, name):
+        image = drawable.image
+        rect = image.selection or (0, 0, image.width, image.height)
+        buffer_layer = drawable.copy()
+        _resized(buffer_layer, rect[2], rect[3], drawable.offsets[0] - rect[0],
+                 drawable.offsets[1] - rect[1])
+        _buffers[name] = buffer_layer
+        return name
+
+    def gimp_edit_named_paste(self, drawable, name, paste_into):
+        floating = _buffers[name].copy(drawable.image)
+        floating.target = drawable
+        return floating
+
+    def gimp_floating_sel_anchor(self, floating):
+        if SIMULATE:
+            from gimpscript import canvas, resample
+
+            target = floating.target
+            target.pixels = canvas.composite_over(
+                resample.as_rgba(target.pixels), resample.as_rgba(floating.pixels),
+                (floating.offsets[0] - target.offsets[0],
+                 floating.offsets[1] - target.offsets[1]))
+            target.bpp = 4
+
+    def gimp_buffer_delete(self, name):
+        _buffers.pop(name, None)
+
+
+_buffers = {}
+
+
+class _Pdb(object):
+    # Records each call, then runs the procedure if it is implemented.
+
+    def __init__(self):
+        self._procedures = _Procedures()
+
+    def __getattr__(self, name):
+        procedure = getattr(self._procedures, name, None)
+
+        def call(*args):
+            calls[name] += 1
+            if procedure is not None:
+                return procedure(*args)
+
+        return call
+
+
+pdb = _Pdb()
+reset()
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+# Shared helpers for the animation plug-ins, and the plug-ins themselves
+# (gimpscript.plugins).
+#
+# Copy this package next to gimpscript_effects.py (into GIMP's plug-ins
+# folder); the entry point imports it from its own directory.
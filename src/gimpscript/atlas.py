@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+# Sprite atlas export: every frame of an animation packed into PNG pages,
+# with a JSON manifest for a game client.
+#
+# Each frame is trimmed to the bounding box of its visible (non-transparent)
+# pixels, and frames whose trimmed pixels are byte-identical share one sprite
+# (the repeated 0/360 degree frame of "Only Rotate", the held final frame of
+# "Crossopen").  Once all frames are in, the sprites are packed with the
+# MaxRects algorithm (best short side fit) into as few pages of at most
+# MAX_PAGE_SIZE pixels as they fit in.  Writing <stem>.json:
+#
+#   {"size": [canvas width, height], "loop_count": n,
+#    "pages": [{"image": "<stem>-0.png", "size": [w, h]}, ...],
+#    "frames": [{"frame": i, "sprite": s, "page": p, "rect": [x, y, w, h],
+#                "trim": [x, y], "duration": ms}, ...]}
+#
+# "rect" is the sprite in its page and "trim" where its top left corner goes
+# on the canvas.  Sprites wait for packing in a FrameStore, so a long
+# animation spills them to disk instead of filling the memory.
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from gimpscript import canvas, delta, encoders, framestore, resample
+
+# Pages never grow past this (a common GPU texture limit), unless a single
+# sprite is larger.
+MAX_PAGE_SIZE = 4096
+
+# Transparent pixels kept between sprites, so that texture filtering does not
+# bleed one into the next.
+PADDING = 1
+
+# Memory for the sprites held until packing; the rest wait on disk.
+_HOLD_BYTES = 512 * 1000000
+
+
+def atlas_paths(filename):
+    # The manifest path and the page path pattern for an output `filename`,
+    # whatever its extension.
+    stem = os.path.splitext(filename)[0]
+    return stem + ".json", stem + "-%d.png"
+
+
+class MaxRectsBin(object):
+    # One page: free space is kept as the maximal free rectangles, which may
+    # overlap; a sprite goes where it leaves the shortest leftover side.
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.free = [(0, 0, width, height)]
+        self.used_width = 0
+        self.used_height = 0
+
+    def insert(self, width, height):
+        # Places a width x height rectangle; returns its (x, y) or None.
+        best = None
+        for fx, fy, fw, fh in self.free:
+            if width <= fw and height <= fh:
+                leftover = (min(fw - width, fh - height), max(fw - width, fh - height))
+                if best is None or leftover < best[0]:
+                    best = (leftover, fx, fy)
+        if best is None:
+            return None
+        x, y = best[1], best[2]
+        self._split((x, y, width, height))
+        self.used_width = max(self.used_width, x + width)
+        self.used_height = max(self.used_height, y + height)
+        return x, y
+
+    def _split(self, used):
+        ux, uy, uw, uh = used
+        free = []
+        for rect in self.free:
+            fx, fy, fw, fh = rect
+            if ux >= fx + fw or ux + uw <= fx or uy >= fy + fh or uy + uh <= fy:
+                free.append(rect)
+                continue
+            # The parts of the free rectangle left, right, above and below
+            # the used one.
+            if ux > fx:
+                free.append((fx, fy, ux - fx, fh))
+            if ux + uw < fx + fw:
+                free.append((ux + uw, fy, fx + fw - ux - uw, fh))
+            if uy > fy:
+                free.append((fx, fy, fw, uy - fy))
+            if uy + uh < fy + fh:
+                free.append((fx, uy + uh, fw, fy + fh - uy - uh))
+        # Drop the rectangles contained in another one.
+        self.free = [a for i, a in enumerate(free)
+                     if not any(i != j and _contains(b, a) and (a != b or j < i)
+                                for j, b in enumerate(free))]
+
+
+def _contains(outer, inner):
+    return (inner[0] >= outer[0] and inner[1] >= outer[1]
+            and inner[0] + inner[2] <= outer[0] + outer[2]
+            and inner[1] + inner[3] <= outer[1] + outer[3])
+
+
+def _next_power_of_two(value):
+    size = 1
+    while size < value:
+        size *= 2
+    return size
+
+
+def _fill_page(sizes, order, width, height):
+    # Packs the sprites of `order` that fit in one width x height page;
+    # returns the bin and the {sprite: (x, y)} placed.
+    page = MaxRectsBin(width, height)
+    placed = {}
+    for index in order:
+        w, h = sizes[index]
+        position = page.insert(w, h)
+        if position is not None:
+            placed[index] = position
+    return page, placed
+
+
+def pack(sizes, max_size=MAX_PAGE_SIZE, padding=PADDING):
+    # Places sprites of the given (width, height) on pages.  Returns the
+    # (page, x, y) of every sprite and the (width, height) of every page.
+    padded = [(w + padding, h + padding) for w, h in sizes]
+    # Largest first: the big sprites decide the layout, small ones fill gaps.
+    remaining = sorted(range(len(sizes)),
+                       key=lambda i: (-max(padded[i]), -padded[i][0] * padded[i][1], i))
+    positions = [None] * len(sizes)
+    pages = []
+    while remaining:
+        widest = max(padded[i][0] for i in remaining)
+        tallest = max(padded[i][1] for i in remaining)
+        limit_width = max(max_size, widest)
+        limit_height = max(max_size, tallest)
+        area = sum(padded[i][0] * padded[i][1] for i in remaining)
+        # The smallest power-of-two page that could hold them all, grown one
+        # side at a time until they fit or the page is as large as allowed.
+        side = _next_power_of_two(int(area ** 0.5))
+        width = min(max(side, widest), limit_width)
+        height = min(max(side, tallest), limit_height)
+        while True:
+            page, placed = _fill_page(padded, remaining, width, height)
+            if len(placed) == len(remaining) or (width, height) == (limit_width, limit_height):
+                break
+            if (width <= height or height == limit_height) and width < limit_width:
+                width = min(width * 2, limit_width)
+            else:
+                height = min(height * 2, limit_height)
+        for index, (x, y) in placed.items():
+            positions[index] = (len(pages), x, y)
+        # The padding after the last column and row is not needed.
+        pages.append((max(page.used_width - padding, 1), max(page.used_height - padding, 1)))
+        remaining = [i for i in remaining if i not in placed]
+    return positions, pages
+
+
+class AtlasWriter(object):
+    # Collects frames like the encoders in gimpscript.encoders and writes the
+    # pages and the manifest when closed.
+
+    def __init__(self, path, width, height, duration_ms, loop_count):
+        self.manifest_path, self.page_pattern = atlas_paths(path)
+        self.width = width
+        self.height = height
+        self.duration_ms = duration_ms
+        self.loop_count = loop_count
+        self.frames = []
+        # Digest of the trimmed pixels -> sprite index, and (width, height)
+        # of every sprite.
+        self.sprite_index = {}
+        self.sprite_sizes = []
+        self.store = framestore.FrameStore(_HOLD_BYTES)
+        self.pages = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.store.close()
+
+    def add_frame(self, pixels, offsets=(0, 0), duration_ms=None):
+        frame = canvas.frame_on_canvas(resample.as_rgba(pixels), tuple(offsets),
+                                       self.width, self.height)
+        rect = delta.visible_rect(frame, (0, 0, self.width, self.height), 1)
+        if rect is None:
+            # Nothing visible: a single transparent pixel.
+            rect = (0, 0, 1, 1)
+            sprite = np.zeros((1, 1, 4), dtype=np.uint8)
+        else:
+            sprite = delta.crop(frame, rect)
+        digest = hashlib.sha1(repr(sprite.shape).encode("ascii"))
+        digest.update(sprite.data)
+        key = digest.hexdigest()
+        index = self.sprite_index.get(key)
+        if index is None:
+            index = self.sprite_index[key] = len(self.sprite_sizes)
+            self.sprite_sizes.append((rect[2], rect[3]))
+            self.store.put(index, sprite, None)
+        if duration_ms is None:
+            duration_ms = self.duration_ms
+        self.frames.append({"frame": len(self.frames), "sprite": index,
+                            "trim": [rect[0], rect[1]], "duration": int(duration_ms)})
+
+    def close(self):
+        try:
+            positions, page_sizes = pack(self.sprite_sizes)
+            # One page at a time: its sprites are read back, placed and the
+            # page written.
+            self.pages = []
+            for number, (width, height) in enumerate(page_sizes):
+                page = canvas.blank(width, height)
+                for index, (on_page, x, y) in enumerate(positions):
+                    if on_page == number:
+                        canvas.place(page, self.store.pop(index)[0], (x, y))
+                path = self.page_pattern % number
+                with open(path, "wb") as handle:
+                    handle.write(encoders.png_bytes(page))
+                self.pages.append({"image": os.path.basename(path), "size": [width, height]})
+        finally:
+            self.store.close()
+        for frame in self.frames:
+            page, x, y = positions[frame["sprite"]]
+            width, height = self.sprite_sizes[frame["sprite"]]
+            frame["page"] = page
+            frame["rect"] = [x, y, width, height]
+        with open(self.manifest_path, "w") as handle:
+            json.dump({"size": [self.width, self.height], "loop_count": self.loop_count,
+                       "pages": self.pages, "frames": self.frames}, handle, indent=1)
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+# Headless batch runner: applies one of the effects to many images.
+#
+# Run from the src directory, with the plug-ins installed in GIMP:
+#
+#   python -m gimpscript.batch python_fu_create_rotated_layers photos/*.png \
+#       --output-dir out --format gif --param num_frames=120
+#
+# Every input is processed by its own gimp-console process, and a pool of
+# worker processes (one per core by default) keeps several of them running.
+# The parameters of the effect and their defaults are read from the
+# register() calls of gimpscript_effects.py, in one more gimp-console run
+# before the jobs start, so they always match the plug-in.  Outputs are
+# written under a temporary name and renamed once complete, so an
+# interrupted run can simply be started again: finished outputs are skipped.
+from __future__ import print_function
+
+import argparse
+import ast
+import glob
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+# The plug-in entry point whose register() calls give the parameters.
+ENTRY_POINT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           "gimpscript_effects.py")
+
+# Effects that can run in a batch -> whether their layers can be saved as
+# XCF (effects that build a new image and display it cannot run as XCF in
+# gimp-console).  An effect can write an animation file if it has an
+# "output" parameter.
+EFFECTS = {
+    "python_fu_create_rotated_layers": {"xcf": True},
+    "python_fu_create_rotated_scaled_translated_layers": {"xcf": True},
+    "python_fu_cross_gif": {"xcf": False},
+    "python_fu_cross_open_gif": {"xcf": False},
+    "python_fu_sonar_disappearance": {"xcf": True},
+    "python_fu_sonar_disappearance2": {"xcf": True},
+}
+
+# Batch values of parameters whose registered default does not suit a
+# batch: a draft preview needs a display, and nobody undoes in a batch, so
+# it keeps no history.
+_BATCH_DEFAULTS = {"preview": 0, "undo_mode": 2}
+
+# Value of the "output" parameter for each animation format.
+_OUTPUT_CHOICES = {"gif": 1, "apng": 2, "webp": 3}
+_EXTENSIONS = {"gif": ".gif", "apng": ".png", "webp": ".webp", "xcf": ".xcf"}
+
+_IMAGE_EXTENSIONS = (".xcf", ".png", ".jpg", ".jpeg", ".tif", ".tiff", ".webp",
+                     ".bmp", ".gif", ".psd")
+
+# Python-Fu code run inside gimp-console for one input.  The effects that
+# work on the image itself are saved as XCF, and fail when they added no
+# layer (they give up with a message, e.g. on an image without the layers
+# they need); the others write their file.
+_GIMP_SCRIPT = """
+import sys, traceback
+try:
+    image = pdb.gimp_file_load(%(input)r, %(input)r)
+    drawable = pdb.gimp_image_get_active_drawable(image)
+    layers_before = len(image.layers)
+    getattr(pdb, %(effect)r)(image, drawable, *%(args)r)
+    if %(save_xcf)r:
+        if len(image.layers) <= layers_before:
+            raise RuntimeError("%(effect)s added no frames to the image")
+        pdb.gimp_xcf_save(0, image, pdb.gimp_image_get_active_drawable(image),
+                          %(output)r, %(output)r)
+    pdb.gimp_image_delete(image)
+except Exception:
+    traceback.print_exc()
+    sys.stderr.flush()
+    pdb.gimp_quit(1)
+pdb.gimp_quit(0)
+"""
+
+# Python-Fu code that runs the entry point with register() and main()
+# replaced, and prints the name and default of every parameter (after the
+# image and drawable) of every procedure, as JSON after _PARAMS_MARKER.
+_PARAMS_MARKER = "gimpscript-batch-params:"
+_PARAMS_SCRIPT = """
+import json, runpy, sys, traceback
+try:
+    import gimpfu
+    sys.path.insert(0, %(src)r)
+    found = {}
+    def register(proc_name, blurb, help, author, copyright, date, label, imagetypes,
+                 params, results, function, **kwargs):
+        found[proc_name] = [[param[1], param[3]] for param in params]
+    gimpfu.register = register
+    gimpfu.main = lambda: None
+    runpy.run_path(%(entry)r, run_name="gimpscript_batch_params")
+    sys.stdout.write(%(marker)r + json.dumps(found) + "\\n")
+    sys.stdout.flush()
+except Exception:
+    traceback.print_exc()
+    sys.stderr.flush()
+    pdb.gimp_quit(1)
+pdb.gimp_quit(0)
+"""
+
+
+def parse_value(text):
+    # Numbers and quoted strings are parsed as Python literals, anything else
+    # is kept as a string.
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+
+def registered_params(gimp):
+    # Procedure name -> [(parameter name, default)] from the register() calls
+    # of the entry point, read by `gimp` (gimp-console).
+    script = _PARAMS_SCRIPT % {"src": os.path.dirname(ENTRY_POINT), "entry": ENTRY_POINT,
+                               "marker": _PARAMS_MARKER}
+    command = [gimp, "-i", "-d", "-f", "--batch-interpreter=python-fu-eval", "-b", script]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    log = process.communicate()[0].decode("utf-8", "replace")
+    for line in log.splitlines():
+        if line.startswith(_PARAMS_MARKER):
+            found = json.loads(line[len(_PARAMS_MARKER):])
+            return dict((name, [tuple(param) for param in params])
+                        for name, params in found.items())
+    lines = log.strip().splitlines()
+    raise RuntimeError("could not read the effect parameters from %s: %s"
+                       % (gimp, lines[-1] if lines else
+                          "exited with status %d" % process.returncode))
+
+
+def can_export(params):
+    return any(name == "output" for name, default in params)
+
+
+def effect_args(effect, params, overrides, fmt, output_path):
+    # Positional arguments for the effect, from its registered `params`, the
+    # batch defaults and the overrides.
+    values = dict(params)
+    unknown = set(overrides) - set(values)
+    if unknown:
+        raise ValueError("unknown parameter(s) for %s: %s"
+                         % (effect, ", ".join(sorted(unknown))))
+    values.update((name, value) for name, value in _BATCH_DEFAULTS.items() if name in values)
+    values.update(overrides)
+    if fmt != "xcf":
+        values["output"] = _OUTPUT_CHOICES[fmt]
+        values["filename"] = output_path
+    return [values[name] for name, default in params]
+
+
+def expand_inputs(patterns):
+    # Files named directly, found by glob, or contained in a directory.
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for name in sorted(os.listdir(pattern)):
+                if name.lower().endswith(_IMAGE_EXTENSIONS):
+                    paths.append(os.path.join(pattern, name))
+        else:
+            paths.extend(sorted(glob.glob(pattern)) or [pattern])
+    seen = set()
+    return [p for p in paths if not (p in seen or seen.add(p))]
+
+
+def output_path(input_path, output_dir, fmt):
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(output_dir, stem + _EXTENSIONS[fmt])
+
+
+def run_job(job):
+    # Processes one input in its own gimp-console; returns a result record.
+    started = time.time()
+    result = {"input": job["input"], "output": job["output"]}
+    partial = job["output"] + ".part"
+    try:
+        args = effect_args(job["effect"], job["effect_params"], job["params"], job["format"],
+                           partial)
+        script = _GIMP_SCRIPT % {"input": os.path.abspath(job["input"]),
+                                 "effect": job["effect"], "args": args,
+                                 "save_xcf": job["format"] == "xcf",
+                                 "output": os.path.abspath(partial)}
+        command = [job["gimp"], "-i", "-d", "-f",
+                   "--batch-interpreter=python-fu-eval", "-b", script]
+        process = subprocess.Popen(command, stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT)
+        log = process.communicate()[0].decode("utf-8", "replace")
+        if process.returncode != 0 or not os.path.exists(partial):
+            result["status"] = "failed"
+            lines = log.strip().splitlines()
+            result["error"] = (lines[-1] if lines else
+                               "gimp exited with status %d" % process.returncode)
+        else:
+            os.rename(partial, job["output"])
+            if os.path.exists(partial + ".frames.json"):
+                os.rename(partial + ".frames.json", job["output"] + ".frames.json")
+            result["status"] = "ok"
+    except Exception as error:
+        result["status"] = "failed"
+        result["error"] = str(error)
+    finally:
+        for leftover in (partial, partial + ".frames.json"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    result["seconds"] = round(time.time() - started, 2)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Apply an animation effect to many images with gimp-console.")
+    parser.add_argument("effect", choices=sorted(EFFECTS))
+    parser.add_argument("inputs", nargs="+", help="image files, globs or directories")
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--format", choices=sorted(_EXTENSIONS), default=None,
+                        help="animation file format, or xcf to save the layers "
+                             "(default: gif, or xcf for effects that cannot "
+                             "write a file)")
+    parser.add_argument("--param", action="append", default=[],
+                        metavar="NAME=VALUE",
+                        help="effect parameter, may be repeated")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--gimp", default="gimp-console", help="gimp-console executable")
+    parser.add_argument("--force", action="store_true",
+                        help="redo inputs whose output already exists")
+    parser.add_argument("--report", default=None,
+                        help="JSON report path (default: batch-report.json in "
+                             "the output directory)")
+    options = parser.parse_args(argv)
+
+    try:
+        effect_params = registered_params(options.gimp)[options.effect]
+    except (RuntimeError, OSError, KeyError) as error:
+        parser.error("%s: %s" % (options.effect, error))
+    export = can_export(effect_params)
+    fmt = options.format or ("gif" if export else "xcf")
+    if fmt != "xcf" and not export:
+        parser.error("%s can only be saved as xcf" % options.effect)
+    if fmt == "xcf" and not EFFECTS[options.effect]["xcf"]:
+        parser.error("%s needs an animation file format" % options.effect)
+    params = {}
+    for item in options.param:
+        name, sep, value = item.partition("=")
+        if not sep:
+            parser.error("parameters are given as NAME=VALUE, not %r" % item)
+        params[name] = parse_value(value)
+    try:
+        effect_args(options.effect, effect_params, params, fmt, "")
+    except ValueError as error:
+        parser.error(str(error))
+
+    if not os.path.isdir(options.output_dir):
+        os.makedirs(options.output_dir)
+    results = []
+    jobs = []
+    for path in expand_inputs(options.inputs):
+        target = output_path(path, options.output_dir, fmt)
+        if os.path.exists(target) and not options.force:
+            results.append({"input": path, "output": target, "status": "skipped"})
+            print("skipped  %s (already done)" % path)
+            continue
+        jobs.append({"input": path, "output": target, "effect": options.effect,
+                     "effect_params": effect_params, "params": params, "format": fmt,
+                     "gimp": options.gimp})
+
+    if jobs:
+        pool = multiprocessing.Pool(max(1, min(options.workers, len(jobs))))
+        try:
+            for result in pool.imap_unordered(run_job, jobs):
+                results.append(result)
+                if result["status"] == "ok":
+                    print("ok       %s (%.1fs)" % (result["input"], result["seconds"]))
+                else:
+                    print("FAILED   %s: %s" % (result["input"], result["error"]))
+                sys.stdout.flush()
+        finally:
+            pool.close()
+            pool.join()
+
+    failed = [r for r in results if r["status"] == "failed"]
+    print("%d done, %d skipped, %d failed" % (
+        sum(r["status"] == "ok" for r in results),
+        sum(r["status"] == "skipped" for r in results), len(failed)))
+    report = options.report or os.path.join(options.output_dir,
+                                            "batch-report.json")
+    with open(report, "w") as handle:
+        json.dump({"effect": options.effect, "format": fmt, "params": params,
+                   "results": results}, handle, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+# Placing frames on an image-sized RGBA canvas.
+import numpy as np
+
+
+def blank(width, height, channels=4):
+    return np.zeros((height, width, channels), dtype=np.uint8)
+
+
+def _clip(canvas, pixels, x, y):
+    # Destination and source slices of `pixels` placed at (x, y), or None when
+    # nothing of it lands on the canvas.
+    height, width = pixels.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1 = min(x + width, canvas.shape[1])
+    y1 = min(y + height, canvas.shape[0])
+    if x0 >= x1 or y0 >= y1:
+        return None
+    return ((slice(y0, y1), slice(x0, x1)),
+            (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x)))
+
+
+def place(canvas, pixels, offsets):
+    # Copies `pixels` into the canvas at `offsets`, clipped to the canvas.
+    clipped = _clip(canvas, pixels, offsets[0], offsets[1])
+    if clipped is not None:
+        target, source = clipped
+        canvas[target] = pixels[source]
+    return canvas
+
+
+def composite_over(canvas, pixels, offsets):
+    # Alpha-composites RGBA `pixels` over the RGBA canvas (GIMP's normal mode).
+    clipped = _clip(canvas, pixels, offsets[0], offsets[1])
+    if clipped is None:
+        return canvas
+    target, source = clipped
+    top = pixels[source].astype(np.float32) / 255.0
+    bottom = canvas[target].astype(np.float32) / 255.0
+    top_alpha = top[:, :, 3:]
+    bottom_alpha = bottom[:, :, 3:] * (1.0 - top_alpha)
+    alpha = top_alpha + bottom_alpha
+    color = top[:, :, :3] * top_alpha + bottom[:, :, :3] * bottom_alpha
+    color = np.where(alpha > 0, color / np.maximum(alpha, 1e-6), 0.0)
+    result = np.concatenate((color, alpha), axis=2) * 255.0
+    canvas[target] = np.rint(result).astype(np.uint8)
+    return canvas
+
+
+def frame_on_canvas(pixels, offsets, width, height):
+    # A full-canvas RGBA copy of a frame that may be offset or oversized.
+    if offsets == (0, 0) and pixels.shape[:2] == (height, width):
+        return pixels
+    return place(blank(width, height, pixels.shape[2]), pixels, offsets)
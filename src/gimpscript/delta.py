@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+# Dirty rectangles between consecutive animation frames.
+#
+# Rectangles are (x, y, width, height) tuples in canvas coordinates.
+import numpy as np
+
+
+def bounding_rect(changed):
+    # Bounding rectangle of the True pixels of a 2D mask, or None.
+    rows = np.flatnonzero(changed.any(axis=1))
+    if not rows.size:
+        return None
+    columns = np.flatnonzero(changed.any(axis=0))
+    return (int(columns[0]), int(rows[0]), int(columns[-1] - columns[0] + 1),
+            int(rows[-1] - rows[0] + 1))
+
+
+def changed_rect(previous, current):
+    # Rectangle around every pixel that differs, or None for identical frames.
+    return bounding_rect(np.any(previous != current, axis=2))
+
+
+def cleared_rect(previous, current, threshold=128):
+    # Rectangle around the pixels that were visible and became transparent,
+    # which formats without per-frame alpha replacement (GIF) must erase.
+    return bounding_rect((previous[:, :, 3] >= threshold)
+                         & (current[:, :, 3] < threshold))
+
+
+def visible_rect(frame, rect, threshold=128):
+    # Rectangle around the pixels of `frame` inside `rect` that are at least
+    # `threshold` opaque, or None.
+    found = bounding_rect(crop(frame, rect)[:, :, 3] >= threshold)
+    if found is None:
+        return None
+    return found[0] + rect[0], found[1] + rect[1], found[2], found[3]
+
+
+def union(a, b):
+    x0 = min(a[0], b[0])
+    y0 = min(a[1], b[1])
+    x1 = max(a[0] + a[2], b[0] + b[2])
+    y1 = max(a[1] + a[3], b[1] + b[3])
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def align_even(rect):
+    # Moves the origin to even coordinates (WebP stores offsets halved),
+    # growing the rectangle so it still covers the same pixels.
+    x, y, width, height = rect
+    return x - x % 2, y - y % 2, width + x % 2, height + y % 2
+
+
+def crop(frame, rect):
+    x, y, width, height = rect
+    return np.ascontiguousarray(frame[y:y + height, x:x + width])
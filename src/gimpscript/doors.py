@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+# French-door ("cross") opening frames.
+#
+# The image is split into four quadrants around (mid_x, mid_y) and every
+# quadrant slides away from the centre by (dx, dy).
+
+
+def quadrants(width, height, mid_x, mid_y):
+    # Source rectangles (x, y, width, height) and the direction each quadrant
+    # moves in, as (sign_x, sign_y).
+    return [((0, 0, mid_x, mid_y), (-1, -1)),
+            ((mid_x, 0, width - mid_x, mid_y), (1, -1)),
+            ((0, mid_y, mid_x, height - mid_y), (-1, 1)),
+            ((mid_x, mid_y, width - mid_x, height - mid_y), (1, 1))]
+
+
+def door_steps(num_open_frames, mid_x, mid_y):
+    # (frame number, dx, dy) for frames 1..num_open_frames; the last frame has
+    # the quadrants moved by half the image size.
+    steps = []
+    for i in range(1, num_open_frames + 1):
+        factor = float(i) / num_open_frames
+        steps.append((i, int(factor * mid_x), int(factor * mid_y)))
+    return steps
+
+
+def quadrant_offsets(rect, direction, dx, dy):
+    # Where a quadrant lands for a door opening of (dx, dy).
+    return rect[0] + direction[0] * dx, rect[1] + direction[1] * dy
+
+
+class QuadrantCache(object):
+    # Cuts the four quadrants out of an RGBA canvas once; every door frame is
+    # then composed by blitting the cached buffers at their offsets.
+
+    def __init__(self, source, mid_x, mid_y):
+        self.height, self.width = source.shape[:2]
+        self.channels = source.shape[2]
+        self.tiles = []
+        for rect, direction in quadrants(self.width, self.height, mid_x, mid_y):
+            x, y, w, h = rect
+            self.tiles.append((rect, direction, source[y:y + h, x:x + w].copy()))
+
+    def compose(self, dx, dy):
+        from gimpscript import canvas
+
+        frame = canvas.blank(self.width, self.height, self.channels)
+        for rect, direction, tile in self.tiles:
+            # The quadrants never overlap, so no compositing is needed.
+            canvas.place(frame, tile, quadrant_offsets(rect, direction, dx, dy))
+        return frame
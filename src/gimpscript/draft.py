@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+# Draft previews: every frame of an effect, small and fast, in a new image.
+#
+# A draft runs the same NumPy effect generator with the same schedule
+# (angles, scale factors, door steps, sonar radii) on sources shrunk by a
+# power of two, without interpolation, so it costs a small fraction of a
+# full render.  "Draft, then full quality" shows the draft and goes on with
+# the normal render; the draft stays open to compare the two.
+from gimpfu import *
+
+from gimpscript import profiler
+
+# Choices of the "preview" parameter.
+PREVIEW_OFF = 0
+PREVIEW_DRAFT = 1
+PREVIEW_DRAFT_THEN_FULL = 2
+
+# Drafts are this many times smaller than the image, or less when that
+# would leave fewer than _MIN_DRAFT_SIZE pixels across.
+DRAFT_FACTOR = 4
+_MIN_DRAFT_SIZE = 32
+
+# Parameter appended to every plug-in.
+PREVIEW_PARAMS = [
+    (PF_OPTION, "preview", "Preview", PREVIEW_OFF,
+     ["Off (full quality)", "Draft only (1/4 size)", "Draft, then full quality"])
+]
+
+
+def draft_factor(width, height):
+    # A power of two, so that the sources shrink by exact 2x2 means.
+    factor = DRAFT_FACTOR
+    while factor > 1 and min(width, height) // factor < _MIN_DRAFT_SIZE:
+        factor //= 2
+    return factor
+
+
+def shrink(pixels, factor):
+    # `pixels`, with an alpha channel, `factor` times smaller.
+    from gimpscript import resample
+
+    pixels = resample.with_alpha(pixels)
+    while factor > 1:
+        pixels = resample.halved(pixels)
+        factor //= 2
+    return pixels
+
+
+def shrink_length(length, factor):
+    # Sizes round up, as the shrunk sources do.
+    return (length + factor - 1) // factor
+
+
+def shrink_offsets(offsets, factor):
+    return (int(round(float(offsets[0]) / factor)),
+            int(round(float(offsets[1]) / factor)))
+
+
+def show_draft(name, image, factor, frames, num_frames):
+    # Adds the (pixels, offsets) `frames` of procedure `name`, rendered for
+    # `image` shrunk by `factor`, as layers of a new image and displays it.
+    from gimpscript import pixels, resample
+
+    with profiler.Run(name, num_frames, "draft"):
+        draft_image = pdb.gimp_image_new(shrink_length(image.width, factor),
+                                         shrink_length(image.height, factor), RGB)
+        pdb.gimp_image_undo_disable(draft_image)
+        for i, (frame, offsets) in enumerate(frames):
+            pixels.add_layer_from_array(draft_image, resample.as_rgba(frame),
+                                        "Draft frame %d" % i, offsets, 0)
+            profiler.frame_done()
+        pdb.gimp_image_undo_enable(draft_image)
+        pdb.gimp_display_new(draft_image)
+        gimp.displays_flush()
+    return draft_image
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+# Easing curves for the radius schedule of the sonar effect.
+import math
+
+# Choices of the "easing" parameter, in PF_OPTION order.
+EASING_NAMES = ["Linear", "Ease in", "Ease out", "Ease in-out"]
+
+EASINGS = [
+    lambda t: t,
+    lambda t: t * t,
+    lambda t: 1.0 - (1.0 - t) * (1.0 - t),
+    lambda t: 0.5 - 0.5 * math.cos(math.pi * t),
+]
+
+
+def radius_schedule(num_frames, max_radius, easing=0):
+    # Integer radius of the hidden circle for each frame, growing from 0
+    # towards max_radius (reached by the frame after the last one).
+    curve = EASINGS[easing]
+    return [int(curve(i / float(num_frames)) * max_radius)
+            for i in range(num_frames)]
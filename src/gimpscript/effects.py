@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+# The animation effects as NumPy frame generators.
+#
+# Every generator yields (pixels, (x, y)) pairs: a frame with an alpha channel
+# and its offsets in the image, matching the layers the PDB code paths create.
+# Given `frames`, a range of frame numbers, a generator yields only those, so
+# that gimpscript.parallel can split an effect between processes.
+from gimpscript import canvas, doors, easing, frameplan, resample, sonar
+
+
+def _selected(items, frames):
+    # The entries of `items` for the frame numbers in `frames` (all of them
+    # when None).
+    if frames is None:
+        return items
+    return [items[i] for i in frames]
+
+
+def _layer_rect(source, offsets):
+    return (offsets[0], offsets[1], source.shape[1], source.shape[0])
+
+
+def rotated_frames(source, offsets, num_frames, interpolation, frames=None):
+    # python_fu_create_rotated_layers: rotation about the layer centre given in
+    # image coordinates, expanded to fit.
+    center = (source.shape[1] / 2.0, source.shape[0] / 2.0)
+    plan = frameplan.rotation_plan(_layer_rect(source, offsets),
+                                   frameplan.rotation_angles(num_frames), center)
+    return resample.render_plan(source, offsets, _selected(plan, frames),
+                                interpolation)
+
+
+def scaled(source, width, height, offsets, interpolation):
+    # `source` stretched to (width, height) and placed at `offsets`.
+    resampler = resample.Pyramid(source)
+    matrix = resample.scale_matrix(float(width) / source.shape[1],
+                                   float(height) / source.shape[0])
+    matrix = resample.translation_matrix(offsets[0], offsets[1]).dot(matrix)
+    bounds = (offsets[0], offsets[1], width, height)
+    return resampler.render(matrix, interpolation, bounds)
+
+
+def rotated_scaled_frames(source, offsets, image_height, num_frames,
+                          interpolation, frames=None):
+    # python_fu_create_rotated_scaled_translated_layers: every frame is the
+    # layer rotated, scaled to a fraction of its size and moved to the bottom
+    # left, resampled in a single pass.
+    plan = frameplan.rotated_scaled_plan(_layer_rect(source, offsets),
+                                         image_height, num_frames)
+    return resample.render_plan(source, offsets, _selected(plan, frames),
+                                interpolation)
+
+
+def cross_rotation_frames(source, offsets, num_rot_frames, interpolation,
+                          frames=None):
+    # Phase 1 of the cross effects: rotation about the layer's own centre,
+    # expanded to fit.
+    source = resample.as_rgba(source)
+    rect = _layer_rect(source, offsets)
+    plan = frameplan.rotation_plan(rect, frameplan.cross_rotation_angles(num_rot_frames),
+                                   frameplan.layer_center(rect))
+    return resample.render_plan(source, offsets, _selected(plan, frames),
+                                interpolation)
+
+
+def door_frames(source_canvas, num_open_frames, frames=None):
+    # Phase 2 of the cross effects, from the image-sized RGBA source.
+    height, width = source_canvas.shape[:2]
+    mid_x, mid_y = width // 2, height // 2
+    cache = doors.QuadrantCache(source_canvas, mid_x, mid_y)
+    steps = doors.door_steps(num_open_frames, mid_x, mid_y)
+    for i, dx, dy in _selected(steps, frames):
+        yield cache.compose(dx, dy), (0, 0)
+
+
+def locked_frame(last, last_offsets, source, width, height, interpolation):
+    # Phase 3 of the "Crossopen" effect: the frame before it (the last door,
+    # or the last rotation frame without doors) shifted right by half the
+    # image, with a FINAL_SCALE copy of the layer at the bottom left.
+    frame = canvas.place(canvas.blank(width, height), resample.as_rgba(last),
+                         (last_offsets[0] + width // 2, last_offsets[1]))
+    new_width = int(width * frameplan.FINAL_SCALE)
+    new_height = int(height * frameplan.FINAL_SCALE)
+    if new_width and new_height:
+        mini, offsets = scaled(resample.as_rgba(source), new_width, new_height,
+                               (0, height - new_height), interpolation)
+        canvas.composite_over(frame, mini, offsets)
+    return frame, (0, 0)
+
+
+def cross_frames(source, offsets, source_canvas, num_rot_frames,
+                 num_open_frames, interpolation, locked=False, frames=None):
+    # Every frame of the cross effects: the rotation of the layer, then the
+    # doors opening on the image-sized source canvas and, for "Crossopen"
+    # (python_fu_cross_open_gif), the final locked frame.
+    height, width = source_canvas.shape[:2]
+    num_frames = frameplan.cross_frame_count(num_rot_frames, num_open_frames, locked)
+    if frames is None:
+        frames = range(num_frames)
+    rotation = [i for i in frames if i < num_rot_frames]
+    opening = [i - num_rot_frames for i in frames
+               if num_rot_frames <= i < num_rot_frames + num_open_frames]
+    if rotation:
+        for frame in cross_rotation_frames(source, offsets, num_rot_frames,
+                                           interpolation, rotation):
+            yield frame
+    if opening:
+        for frame in door_frames(source_canvas, num_open_frames, opening):
+            yield frame
+    if num_frames - 1 in frames and num_frames > num_rot_frames + num_open_frames:
+        if num_open_frames:
+            last = next(door_frames(source_canvas, num_open_frames, [num_open_frames - 1]))
+        else:
+            last = next(cross_rotation_frames(source, offsets, num_rot_frames, interpolation,
+                                              [num_rot_frames - 1]))
+        yield locked_frame(last[0], last[1], source, width, height, interpolation)
+
+
+def sonar_frames(foreground, background, num_frames, easing_index=0,
+                 softness=0.0, keep_background=False, frames=None):
+    # The sonar effects, from image-sized RGBA canvases of the two layers.
+    # python_fu_sonar_disappearance ends with a frame of the background alone;
+    # python_fu_sonar_disappearance2 shows the background under every frame instead.
+    height, width = foreground.shape[:2]
+    center, max_radius = sonar.center_and_max_radius(width, height)
+    distance = sonar.distance_field(width, height, center)
+    radii = easing.radius_schedule(num_frames, max_radius, easing_index)
+    if not keep_background:
+        radii.append(None)
+    for radius in _selected(radii, frames):
+        if radius is None:
+            yield background, (0, 0)
+            continue
+        frame = sonar.apply_mask(foreground, sonar.mask(distance, radius, softness))
+        if keep_background:
+            frame = canvas.composite_over(background.copy(), frame, (0, 0))
+        yield frame, (0, 0)
+
+
+def _plan_keys(kind, plan, offsets, interpolation):
+    return [(kind, frame.matrix, frame.bounds, tuple(offsets), interpolation)
+            for frame in plan]
+
+
+def frame_keys(function, args, kwargs):
+    # What each frame of function(*args, **kwargs) depends on besides the
+    # source arrays, one tuple per frame: its kind and its own parameters
+    # (matrix, door step, radius, ...) but not the frame count, so frames
+    # shared by two runs have equal keys.  Used by gimpscript.framecache.
+    return _FRAME_KEYS[function.__name__](*args, **kwargs)
+
+
+def _rotated_keys(source, offsets, num_frames, interpolation):
+    plan = frameplan.rotation_plan(_layer_rect(source, offsets),
+                                   frameplan.rotation_angles(num_frames),
+                                   (source.shape[1] / 2.0, source.shape[0] / 2.0))
+    return _plan_keys("rotated", plan, offsets, interpolation)
+
+
+def _rotated_scaled_keys(source, offsets, image_height, num_frames,
+                         interpolation):
+    plan = frameplan.rotated_scaled_plan(_layer_rect(source, offsets),
+                                         image_height, num_frames)
+    return _plan_keys("rotated scaled", plan, offsets, interpolation)
+
+
+def _cross_keys(source, offsets, source_canvas, num_rot_frames,
+                num_open_frames, interpolation, locked=False):
+    height, width = source_canvas.shape[:2]
+    rect = _layer_rect(source, offsets)
+    plan = frameplan.rotation_plan(rect, frameplan.cross_rotation_angles(num_rot_frames),
+                                   frameplan.layer_center(rect))
+    keys = _plan_keys("cross rotation", plan, offsets, interpolation)
+    steps = doors.door_steps(num_open_frames, width // 2, height // 2)
+    keys.extend(("door", dx, dy) for i, dx, dy in steps)
+    if locked and steps:
+        keys.append(("locked", steps[-1][1:], interpolation, frameplan.FINAL_SCALE))
+    elif locked and keys:
+        keys.append(("locked", keys[-1], frameplan.FINAL_SCALE))
+    return keys
+
+
+def _sonar_keys(foreground, background, num_frames, easing_index=0,
+                softness=0.0, keep_background=False):
+    height, width = foreground.shape[:2]
+    max_radius = sonar.center_and_max_radius(width, height)[1]
+    keys = [("sonar", radius, softness, keep_background)
+            for radius in easing.radius_schedule(num_frames, max_radius, easing_index)]
+    if not keep_background:
+        keys.append(("background",))
+    return keys
+
+
+_FRAME_KEYS = {
+    "rotated_frames": _rotated_keys,
+    "rotated_scaled_frames": _rotated_scaled_keys,
+    "cross_frames": _cross_keys,
+    "sonar_frames": _sonar_keys,
+}
@@ -0,0 +1,392 @@
+# -*- coding: utf-8 -*-
+# Streaming animated GIF, APNG and WebP writers.
+#
+# Frames are encoded and written as soon as they are added, so only one frame
+# is held in memory however long the animation is.  APNG is written with zlib
+# alone; GIF and WebP use Pillow to compress each frame and this module
+# assembles the animation container around it.
+#
+# With `optimize`, each frame after the first only stores the rectangle that
+# changed since the previous one (with the disposal/blend settings that keep
+# the result exact), and `frame_stats` records what every frame cost.
+import io
+import struct
+import zlib
+
+import numpy as np
+
+from gimpscript import canvas, delta, resample
+
+FORMAT_GIF = "gif"
+FORMAT_APNG = "apng"
+FORMAT_WEBP = "webp"
+
+
+def open_encoder(path, fmt, width, height, num_frames, duration_ms, loop_count,
+                 optimize=False, palette=None, dither=False):
+    # Returns an encoder for `fmt`.  `loop_count` is the number of times the
+    # animation plays, 0 meaning forever.  A GIF given a `palette` (see
+    # gimpscript.palette) uses it for every frame, dithered if asked.
+    classes = {FORMAT_GIF: GifEncoder, FORMAT_APNG: ApngEncoder,
+               FORMAT_WEBP: WebpEncoder}
+    return classes[fmt](path, width, height, num_frames, duration_ms, loop_count,
+                        optimize, palette, dither)
+
+
+class _Encoder(object):
+
+    def __init__(self, path, width, height, num_frames, duration_ms, loop_count,
+                 optimize=False, palette=None, dither=False):
+        self.width = width
+        self.height = height
+        self.num_frames = num_frames
+        self.duration_ms = duration_ms
+        self.loop_count = loop_count
+        self.optimize = optimize
+        self.palette = palette
+        self.dither = dither
+        self.previous = None
+        self.frames_written = 0
+        self.frame_stats = []
+        self.file = open(path, "wb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add_frame(self, pixels, offsets=(0, 0), duration_ms=None):
+        # Adds a frame, given with its offsets in the image like a layer.
+        frame = canvas.frame_on_canvas(resample.as_rgba(pixels), tuple(offsets),
+                                       self.width, self.height)
+        frame = np.ascontiguousarray(frame)
+        if duration_ms is None:
+            duration_ms = self.duration_ms
+        rect = None
+        if self.optimize and self.previous is not None:
+            # An unchanged frame still needs a (1x1) frame to hold its time.
+            rect = delta.changed_rect(self.previous, frame) or (0, 0, 1, 1)
+        self._add(frame, rect, duration_ms)
+        if self.optimize:
+            self.previous = frame
+        self.frames_written += 1
+
+    def _add(self, frame, rect, duration_ms):
+        # Writes the frame, or only `rect` of it when given.
+        self._write_rect(frame, rect or (0, 0, self.width, self.height),
+                         duration_ms)
+
+    def _write_rect(self, frame, rect, duration_ms, *options):
+        start = self.file.tell()
+        self._write_frame(delta.crop(frame, rect), duration_ms, rect, *options)
+        x, y, width, height = rect
+        self.frame_stats.append({
+            "frame": len(self.frame_stats), "rect": [x, y, width, height],
+            "bytes": self.file.tell() - start,
+            # RGBA bytes outside `rect`, before compression: not the size a
+            # full frame would have taken in the file.
+            "raw_pixel_bytes_skipped": 4 * (self.width * self.height - width * height)})
+
+    def close(self):
+        if self.file.closed:
+            return
+        try:
+            self._finish()
+        finally:
+            self.file.close()
+
+
+def _png_chunk(tag, data):
+    crc = zlib.crc32(tag + data) & 0xffffffff
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", crc)
+
+
+def _png_scanlines(pixels):
+    # PNG "Up" filter on every row, computed for the whole frame at once.
+    height, width, channels = pixels.shape
+    rows = pixels.reshape(height, width * channels)
+    filtered = np.empty((height, width * channels + 1), dtype=np.uint8)
+    filtered[:, 0] = 2
+    filtered[0, 1:] = rows[0]
+    filtered[1:, 1:] = rows[1:] - rows[:-1]
+    return filtered.tobytes()
+
+
+def png_bytes(pixels):
+    # A plain RGBA PNG image.
+    pixels = np.ascontiguousarray(resample.as_rgba(pixels))
+    height, width = pixels.shape[:2]
+    return (b"\x89PNG\r\n\x1a\n"
+            + _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+            + _png_chunk(b"IDAT", zlib.compress(_png_scanlines(pixels), 6))
+            + _png_chunk(b"IEND", b""))
+
+
+class ApngEncoder(_Encoder):
+
+    def __init__(self, *args):
+        _Encoder.__init__(self, *args)
+        self.sequence = 0
+        self.file.write(b"\x89PNG\r\n\x1a\n")
+        self.file.write(_png_chunk(b"IHDR", struct.pack(
+            ">IIBBBBB", self.width, self.height, 8, 6, 0, 0, 0)))
+        # The frame count is patched in close() if fewer frames were added.
+        self.actl_position = self.file.tell()
+        self.file.write(self._actl(self.num_frames))
+
+    def _actl(self, num_frames):
+        return _png_chunk(b"acTL", struct.pack(">II", num_frames, self.loop_count))
+
+    def _next_sequence(self):
+        self.sequence += 1
+        return self.sequence - 1
+
+    def _write_frame(self, pixels, duration_ms, rect=None, blend=False):
+        # Frames are never disposed and replace (do not blend with) what is
+        # under their rectangle, so a changed rectangle alone is exact.
+        if rect is None:
+            rect = (0, 0, self.width, self.height)
+        x, y, width, height = rect
+        fctl = struct.pack(">IIIIIHHBB", self._next_sequence(), width, height, x, y,
+                           int(duration_ms), 1000, 0, 1 if blend else 0)
+        self.file.write(_png_chunk(b"fcTL", fctl))
+        data = zlib.compress(_png_scanlines(pixels), 6)
+        if self.frames_written == 0:
+            # The first frame doubles as the default image.
+            self.file.write(_png_chunk(b"IDAT", data))
+        else:
+            self.file.write(_png_chunk(
+                b"fdAT", struct.pack(">I", self._next_sequence()) + data))
+
+    def _finish(self):
+        self.file.write(_png_chunk(b"IEND", b""))
+        if self.frames_written != self.num_frames:
+            self.file.seek(self.actl_position)
+            self.file.write(self._actl(self.frames_written))
+
+
+def _gif_sub_blocks(data, position):
+    # Skips the data sub-blocks starting at `position`; returns their payload
+    # and the position after the terminator.
+    payload = []
+    while data[position]:
+        size = data[position]
+        payload.append(bytes(data[position + 1:position + 1 + size]))
+        position += size + 1
+    return b"".join(payload), position + 1
+
+
+def _split_gif(data):
+    # Pulls the colour table, transparent index and LZW image data out of a
+    # single-frame GIF written by Pillow.
+    data = bytearray(data)
+    flags = data[10]
+    position = 13
+    table = b""
+    table_bits = 0
+    if flags & 0x80:
+        table_bits = flags & 7
+        size = 3 * (2 << table_bits)
+        table = bytes(data[position:position + size])
+        position += size
+    transparent = None
+    while True:
+        marker = data[position]
+        if marker == 0x21:
+            label = data[position + 1]
+            payload, position = _gif_sub_blocks(data, position + 2)
+            if label == 0xF9 and bytearray(payload)[0] & 1:
+                transparent = bytearray(payload)[3]
+        elif marker == 0x2C:
+            image_flags = data[position + 9]
+            position += 10
+            if image_flags & 0x80:
+                table_bits = image_flags & 7
+                size = 3 * (2 << table_bits)
+                table = bytes(data[position:position + size])
+                position += size
+            start = position
+            _, end = _gif_sub_blocks(data, position + 1)
+            return table, table_bits, transparent, bytes(data[start:end])
+        else:
+            raise ValueError("unexpected GIF block 0x%02x" % marker)
+
+
+class GifEncoder(_Encoder):
+    # Every frame gets its own colour table, unless one palette is given for
+    # all of them (written once, as the global table); pixels less than half
+    # opaque become transparent.  GIF frames cannot make pixels transparent
+    # again, so each frame is held back until the next one is known: if the
+    # next frame erases visible pixels, the held frame is disposed to the
+    # background over a rectangle covering them and the next frame repaints
+    # that rectangle.
+
+    def __init__(self, *args):
+        from PIL import Image
+
+        self.Image = Image
+        _Encoder.__init__(self, *args)
+        self.pending = None
+        self.first_transparent = False
+        self.file.write(b"GIF89a")
+        if self.palette is None:
+            # No global colour table; each frame carries a local one.
+            self.file.write(struct.pack("<HHBBB", self.width, self.height, 0x70, 0, 0))
+        else:
+            self.file.write(struct.pack("<HHBBB", self.width, self.height, 0xF7, 0, 0))
+            self.file.write(self.palette.rgb_bytes())
+        if self.loop_count != 1:
+            # NETSCAPE2.0 counts repeats after the first play; 0 is forever.
+            repeats = max(self.loop_count - 1, 0)
+            self.file.write(b"\x21\xff\x0bNETSCAPE2.0\x03\x01"
+                            + struct.pack("<H", repeats) + b"\x00")
+
+    def _add(self, frame, rect, duration_ms):
+        full = (0, 0, self.width, self.height)
+        if self.pending is None:
+            self.first_transparent = bool(np.any(frame[:, :, 3] < 128))
+            if self.optimize:
+                # The canvas starts out transparent.
+                rect = delta.visible_rect(frame, full) or (0, 0, 1, 1)
+        else:
+            held, held_rect, held_duration = self.pending
+            # Disposal 2 clears the held frame's rectangle; 1 keeps it.
+            disposal = 2
+            if rect is not None:
+                cleared = delta.cleared_rect(self.previous, frame)
+                if cleared is None:
+                    disposal = 1
+                else:
+                    held_rect = delta.union(held_rect, cleared)
+                    # Repaint what the disposal clears and should still show.
+                    repaint = delta.visible_rect(frame, held_rect)
+                    if repaint is not None:
+                        rect = delta.union(rect, repaint)
+            self._write_rect(held, held_rect, held_duration, disposal)
+        self.pending = (frame, rect or full, duration_ms)
+
+    def _indexed(self, pixels):
+        # Quantizes to 255 colours and reserves index 255 for transparency.
+        image = self.Image.fromarray(pixels[:, :, :3], "RGB")
+        indexed = image.quantize(colors=255)
+        indices = np.array(indexed, dtype=np.uint8)
+        indices[pixels[:, :, 3] < 128] = 255
+        palette = (indexed.getpalette() or [])[:255 * 3]
+        palette += [0] * (768 - len(palette))
+        return indices, palette
+
+    def _encode(self, indices, palette, transparent):
+        image = self.Image.fromarray(indices, "P")
+        image.putpalette(palette)
+        stream = io.BytesIO()
+        image.save(stream, "GIF", transparency=transparent, optimize=False,
+                   interlace=False)
+        return _split_gif(stream.getvalue())
+
+    def _write_frame(self, pixels, duration_ms, rect=None, disposal=2):
+        # Disposal 2 clears the frame before the next one, so transparent
+        # pixels do not show the previous frame through.
+        if rect is None:
+            rect = (0, 0, self.width, self.height)
+        if self.palette is None:
+            indices, palette = self._indexed(pixels)
+        else:
+            indices = self.palette.index(pixels, self.dither, rect[:2])
+            indices[pixels[:, :, 3] < 128] = 255
+            palette = bytearray(self.palette.rgb_bytes())
+        self._write_indexed(indices, palette, 255, rect, duration_ms, disposal)
+
+    def _write_indexed(self, indices, palette, transparent, rect, duration_ms,
+                       disposal):
+        table, table_bits, transparent, lzw = self._encode(indices, palette,
+                                                           transparent)
+        if self.palette is not None:
+            # The global table applies.
+            table = b""
+        packed = disposal << 2
+        if transparent is not None:
+            packed |= 1
+        delay = int(round(duration_ms / 10.0))
+        self.file.write(struct.pack("<BBBBHBB", 0x21, 0xF9, 4, packed, delay,
+                                    transparent or 0, 0))
+        x, y, width, height = rect
+        flags = 0x80 | table_bits if table else 0
+        self.file.write(struct.pack("<BHHHHB", 0x2C, x, y, width, height, flags))
+        self.file.write(table)
+        self.file.write(lzw)
+
+    def _finish(self):
+        if self.pending is not None:
+            held, held_rect, held_duration = self.pending
+            if self.optimize and self.first_transparent:
+                # Start the next loop from a clear canvas.
+                held_rect = (0, 0, self.width, self.height)
+            self._write_rect(held, held_rect, held_duration, 2)
+        self.file.write(b"\x3b")
+
+
+def _riff_chunk(tag, data):
+    chunk = tag + struct.pack("<I", len(data)) + data
+    if len(data) % 2:
+        chunk += b"\x00"
+    return chunk
+
+
+def _uint24(value):
+    return struct.pack("<I", value)[:3]
+
+
+def _webp_frame_chunks(data):
+    # The ALPH/VP8/VP8L chunks of a still WebP image, without its header.
+    chunks = []
+    position = 12
+    while position + 8 <= len(data):
+        tag = data[position:position + 4]
+        size = struct.unpack("<I", data[position + 4:position + 8])[0]
+        if tag in (b"ALPH", b"VP8 ", b"VP8L"):
+            chunks.append(data[position:position + 8 + size + size % 2])
+        position += 8 + size + size % 2
+    return b"".join(chunks)
+
+
+class WebpEncoder(_Encoder):
+    # Lossless frames, assembled into the extended (VP8X) animated format.
+
+    def __init__(self, *args):
+        from PIL import Image
+
+        self.Image = Image
+        _Encoder.__init__(self, *args)
+        self.file.write(b"RIFF\x00\x00\x00\x00WEBP")
+        # Animation and alpha flags, then the canvas size.
+        self.file.write(_riff_chunk(b"VP8X", b"\x12\x00\x00\x00"
+                                    + _uint24(self.width - 1)
+                                    + _uint24(self.height - 1)))
+        # Transparent background; WebP counts loops with 0 meaning forever.
+        self.file.write(_riff_chunk(b"ANIM", b"\x00\x00\x00\x00"
+                                    + struct.pack("<H", self.loop_count)))
+
+    def _add(self, frame, rect, duration_ms):
+        if rect is not None:
+            rect = delta.align_even(rect)
+        _Encoder._add(self, frame, rect, duration_ms)
+
+    def _write_frame(self, pixels, duration_ms, rect=None, blend=False,
+                     dispose=False):
+        if rect is None:
+            rect = (0, 0, self.width, self.height)
+        stream = io.BytesIO()
+        self.Image.fromarray(pixels, "RGBA").save(stream, "WEBP", lossless=True)
+        x, y, width, height = rect
+        # Frame offsets are stored halved, so they must be even.
+        header = (_uint24(x // 2) + _uint24(y // 2) + _uint24(width - 1)
+                  + _uint24(height - 1) + _uint24(int(duration_ms))
+                  + struct.pack("<B", (0 if blend else 2) | (1 if dispose else 0)))
+        self.file.write(_riff_chunk(b"ANMF", header
+                                    + _webp_frame_chunks(stream.getvalue())))
+
+    def _finish(self):
+        size = self.file.tell() - 8
+        self.file.seek(4)
+        self.file.write(struct.pack("<I", size))
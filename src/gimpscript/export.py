@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+# Writing generated frames straight to an animation file instead of layers.
+import json
+
+from gimpfu import *
+
+from gimpscript import profiler
+
+# Choices of the "output" parameter.
+OUTPUT_LAYERS = 0
+OUTPUT_GIF = 1
+OUTPUT_APNG = 2
+OUTPUT_WEBP = 3
+OUTPUT_ATLAS = 4
+
+_FORMATS = {OUTPUT_GIF: "gif", OUTPUT_APNG: "apng", OUTPUT_WEBP: "webp"}
+
+# Choices of the "gif_palette" parameter.
+PALETTE_FRAME = 0
+PALETTE_GLOBAL = 1
+PALETTE_DITHERED = 2
+
+# Parameters appended to the plug-ins that can export; "Layers" keeps the
+# frames as layers of an image, as before.
+OUTPUT_PARAMS = [
+    (PF_OPTION, "output", "Output", OUTPUT_LAYERS,
+     ["Layers", "Animated GIF file", "APNG file", "Animated WebP file",
+      "Sprite atlas (PNG pages + JSON)"]),
+    (PF_STRING, "filename", "Output file", ""),
+    (PF_INT, "frame_duration", "Frame duration (ms)", 40),
+    (PF_INT, "loop_count", "Plays (0 = loop forever)", 0),
+    (PF_TOGGLE, "delta_frames", "Store only changed regions", True),
+    (PF_OPTION, "gif_palette", "GIF colours", PALETTE_GLOBAL,
+     ["Own palette per frame", "One palette for all frames", "One palette, dithered"])
+]
+
+
+def check_output(output, filename):
+    # Returns True if the export can go ahead, otherwise tells the user why not.
+    if not filename:
+        pdb.gimp_message("Please choose an output file for the animation.")
+        return False
+    if output not in (OUTPUT_APNG, OUTPUT_ATLAS):
+        try:
+            import PIL
+        except ImportError:
+            pdb.gimp_message("GIF and WebP export require the Pillow module; APNG and atlases work without it.")
+            return False
+    return True
+
+
+def write_animation(output, filename, width, height, render, num_frames,
+                    frame_duration, loop_count, delta_frames=True, phases=None,
+                    gif_palette=PALETTE_GLOBAL, timing=None):
+    # Encodes every (pixels, offsets) frame of render(), which yields them all,
+    # or those numbered in its `frames` argument, as soon as it is produced; no
+    # frame is kept once it has been written.  With `delta_frames`, the
+    # per-frame rectangles and sizes are saved next to the file as
+    # <filename>.frames.json.  `phases` lists the (profiler phase, number of
+    # frames) of the effect in order, as the frames are rendered while they
+    # are written.  `timing`, from gimpscript.motion.thin(), keeps only some
+    # frames, each lasting for the frames it stands for.  A GIF with one
+    # palette first renders a sample of frames to build it (see
+    # gimpscript.palette); with the frame cache on, those are not rendered
+    # again.  An atlas (see gimpscript.atlas) is packed and written once all
+    # frames are in.
+    from gimpscript import atlas, canvas, encoders, palette, resample
+
+    if timing is None:
+        timing = [(i, 1) for i in range(num_frames)]
+        selected = None
+    else:
+        selected = [frame for frame, span in timing]
+    boundaries = {}
+    first = 0
+    for name, count in phases or [("export", num_frames)]:
+        boundaries.setdefault(first, name)
+        first += count
+    starts = sorted(start for start in boundaries if 0 < start < num_frames)
+    colors = None
+    if output == OUTPUT_GIF and gif_palette != PALETTE_FRAME:
+        profiler.phase("palette")
+        colors = palette.build(
+            canvas.frame_on_canvas(resample.as_rgba(pixels), tuple(offsets), width, height)
+            for pixels, offsets in render(frames=[timing[i][0] for i in
+                                                  palette.sample_indices(len(timing))]))
+    if output == OUTPUT_ATLAS:
+        encoder = atlas.AtlasWriter(filename, width, height, frame_duration, loop_count)
+    else:
+        encoder = encoders.open_encoder(filename, _FORMATS[output], width, height,
+                                        len(timing), frame_duration, loop_count,
+                                        delta_frames, colors,
+                                        gif_palette == PALETTE_DITHERED)
+    profiler.phase(boundaries[0])
+    with encoder:
+        for i, (pixels, offsets) in enumerate(render(frames=selected)):
+            encoder.add_frame(pixels, offsets, timing[i][1] * frame_duration)
+            profiler.frame_done()
+            # The next frame to render is in a new phase.
+            following = timing[i + 1][0] if i + 1 < len(timing) else num_frames
+            while starts and following >= starts[0]:
+                profiler.phase(boundaries[starts.pop(0)])
+    if output == OUTPUT_ATLAS:
+        pdb.gimp_message("%d frames, %d distinct sprites, on %d atlas page(s); manifest %s."
+                         % (len(encoder.frames), len(encoder.sprite_sizes), len(encoder.pages),
+                            encoder.manifest_path))
+    elif delta_frames:
+        write_frame_stats(filename, encoder.frame_stats)
+
+
+def write_frame_stats(filename, frame_stats):
+    with open(filename + ".frames.json", "w") as handle:
+        json.dump(frame_stats, handle, indent=1)
+    # Raw RGBA bytes left out of the partial frames, not a file size saving.
+    full = len(frame_stats) - sum(1 for s in frame_stats if s["raw_pixel_bytes_skipped"])
+    skipped = sum(s["raw_pixel_bytes_skipped"] for s in frame_stats)
+    written = sum(s["bytes"] for s in frame_stats)
+    pdb.gimp_message("%d frames, %d stored whole; %.1f MB of raw pixels left out, %.1f MB written."
+                     % (len(frame_stats), full, skipped / 1e6, written / 1e6))
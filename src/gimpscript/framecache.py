@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+# Content-addressed frame cache on disk, shared by the plug-ins.
+#
+# Every frame rendered by an effects generator is stored under a hash of the
+# source pixels, the effect, the frame's own parameters (its matrix, door
+# step or radius, from effects.frame_keys) and CACHE_VERSION.  Running an
+# effect again on the same artwork loads the frames it already has and
+# renders only the others: changing num_open_frames keeps all the rotation
+# frames, for instance.  The cache is trimmed to its size cap by dropping the
+# least recently used frames, and frames too big for the cap to hold many of
+# them are not stored at all, so a run on a large canvas does not write
+# frames only to evict them before they are used again.
+#
+# The cache is off unless GIMPSCRIPT_CACHE_MB sets its cap (0 also turns it
+# off); GIMPSCRIPT_CACHE_DIR moves it (~/.cache/gimpscript/frames by
+# default).
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from gimpscript import effects, parallel
+
+# Bump when a change to the rendering code alters frames, so that frames
+# cached by an earlier version are never used.
+CACHE_VERSION = 1
+
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "gimpscript", "frames")
+DEFAULT_MAX_MB = 2048
+
+# Eviction trims the cache to this part of its cap, so that it does not run
+# again for every frame stored.
+_TRIM_TO = 0.9
+
+# Frames bigger than this part of the cap are not stored.
+_MAX_FRAME_SHARE = 0.01
+
+_STATS_FILE = "stats.json"
+
+
+def array_digest(array):
+    digest = hashlib.sha1()
+    digest.update(repr((array.shape, array.dtype.str)).encode("ascii"))
+    digest.update(np.ascontiguousarray(array).data)
+    return digest.hexdigest()
+
+
+class FrameCache(object):
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_bytes=DEFAULT_MAX_MB * 1000000):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0, "too_big": 0,
+                      "bytes_read": 0, "bytes_written": 0}
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        # Path -> (last use, size) of every cached frame.
+        self.entries = {}
+        for name in os.listdir(directory):
+            if name.endswith(".npz"):
+                path = os.path.join(directory, name)
+                info = os.stat(path)
+                self.entries[path] = (info.st_mtime, info.st_size)
+        self.total_bytes = sum(size for used, size in self.entries.values())
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def __contains__(self, key):
+        return self.path(key) in self.entries
+
+    def load(self, key):
+        # The cached (pixels, offsets) frame, or None.
+        path = self.path(key)
+        if path not in self.entries:
+            self.stats["misses"] += 1
+            return None
+        try:
+            with open(path, "rb") as handle:
+                data = np.load(handle)
+                frame = data["pixels"], tuple(int(v) for v in data["offsets"])
+                data.close()
+            # The modification time is the last use, for eviction.
+            os.utime(path, None)
+        except (IOError, OSError, ValueError, KeyError):
+            # Removed or damaged meanwhile: render it again.
+            self._forget(path)
+            self.stats["misses"] += 1
+            return None
+        size = self.entries[path][1]
+        self.entries[path] = (os.stat(path).st_mtime, size)
+        self.stats["hits"] += 1
+        self.stats["bytes_read"] += size
+        return frame
+
+    def store(self, key, frame):
+        pixels, offsets = frame
+        path = self.path(key)
+        if path in self.entries:
+            return
+        if pixels.nbytes > self.max_bytes * _MAX_FRAME_SHARE:
+            self.stats["too_big"] += 1
+            return
+        # Written under a temporary name so that a frame is never half there.
+        handle, temporary = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(handle, "wb") as stream:
+                np.savez(stream, pixels=pixels, offsets=np.array(offsets))
+            os.rename(temporary, path)
+        except (IOError, OSError):
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            return
+        size = os.stat(path).st_size
+        if path in self.entries:
+            self.total_bytes -= self.entries[path][1]
+        self.entries[path] = (os.stat(path).st_mtime, size)
+        self.total_bytes += size
+        self.stats["stored"] += 1
+        self.stats["bytes_written"] += size
+        if self.total_bytes > self.max_bytes:
+            self.evict(int(self.max_bytes * _TRIM_TO))
+
+    def evict(self, target_bytes):
+        # Removes the least recently used frames until at most `target_bytes`
+        # are cached.
+        for path in sorted(self.entries, key=lambda p: self.entries[p][0]):
+            if self.total_bytes <= target_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self._forget(path)
+            self.stats["evicted"] += 1
+
+    def _forget(self, path):
+        used, size = self.entries.pop(path, (0, 0))
+        self.total_bytes -= size
+
+    def save_stats(self):
+        # Adds this run's counts to the totals kept next to the frames and
+        # returns the totals.
+        path = os.path.join(self.directory, _STATS_FILE)
+        totals = {}
+        try:
+            with open(path) as handle:
+                totals = json.load(handle)
+        except (IOError, OSError, ValueError):
+            pass
+        for name, count in self.stats.items():
+            totals[name] = totals.get(name, 0) + count
+        totals["cached_frames"] = len(self.entries)
+        totals["cached_bytes"] = self.total_bytes
+        with open(path, "w") as handle:
+            json.dump(totals, handle, indent=1, sort_keys=True)
+        return totals
+
+
+def open_cache():
+    # The cache configured by the environment, or None when it is not turned
+    # on or cannot be created.
+    max_mb = int(os.environ.get("GIMPSCRIPT_CACHE_MB", 0))
+    if max_mb <= 0:
+        return None
+    try:
+        return FrameCache(os.environ.get("GIMPSCRIPT_CACHE_DIR", DEFAULT_DIRECTORY),
+                          max_mb * 1000000)
+    except (IOError, OSError):
+        return None
+
+
+def frame_key(name, source_digests, params):
+    text = repr((CACHE_VERSION, name, tuple(source_digests), params))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def render(function, args, num_frames, workers=0, chunk_frames=4, cache=None, readahead_mb=0,
+           frames=None, **kwargs):
+    # Yields the frames of function(*args, **kwargs) like parallel.render,
+    # taking those already in `cache` from it and storing the others.  Given
+    # `frames`, a list of frame numbers, only those are yielded, in order.
+    if cache is None:
+        for frame in parallel.render(function, args, num_frames, workers, chunk_frames,
+                                     frames=frames, readahead_mb=readahead_mb, **kwargs):
+            yield frame
+        return
+
+    digests = [array_digest(arg) for arg in args if isinstance(arg, np.ndarray)]
+    keys = [frame_key(function.__name__, digests, params)
+            for params in effects.frame_keys(function, args, kwargs)]
+    # Cached frames are loaded one at a time, when their turn comes, so that
+    # memory use stays that of a single frame.
+    if frames is None:
+        frames = range(num_frames)
+    missing = [i for i in frames if keys[i] not in cache]
+    rendered = parallel.render(function, args, num_frames, workers, chunk_frames,
+                               frames=missing, readahead_mb=readahead_mb, **kwargs)
+    missing = set(missing)
+    try:
+        for i in frames:
+            key = keys[i]
+            if i in missing:
+                frame = next(rendered)
+                cache.stats["misses"] += 1
+                cache.store(key, frame)
+            else:
+                frame = cache.load(key)
+                if frame is None:
+                    # Gone since the lookup: render this one frame here.
+                    frame = next(function(*args, frames=[i], **kwargs))
+                    cache.store(key, frame)
+            yield frame
+    finally:
+        rendered.close()
+        cache.save_stats()
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+# Frame plans: every frame of a transform effect as a single affine matrix.
+#
+# A plan is worked out before any pixel is touched.  Each frame folds its
+# rotation, scale and translation into one 3x3 matrix, so the frame is
+# resampled once, by gimp_item_transform_matrix or by the NumPy resampler,
+# instead of once per step.  Matrices map image coordinates of the source
+# layer to image coordinates of the frame, the convention of GIMP's
+# transform procedures; rectangles are (x, y, width, height).
+#
+# Plain Python only, so the PDB code paths can use it without numpy.
+import math
+
+from gimpscript import keyframes
+
+# Size of the last frame of "Rotate x Scale" and of the mini overlay.
+FINAL_SCALE = 0.2
+
+
+def rotation_angles(num_frames):
+    # Equal increments ending with a full turn, as in "Only Rotate".
+    increment = 360.0 / (num_frames - 1)
+    return [increment * i for i in range(num_frames)]
+
+
+def cross_rotation_angles(num_rot_frames):
+    # Equal increments stopping one step short of a full turn.
+    return [i * (360.0 / num_rot_frames) for i in range(num_rot_frames)]
+
+
+def cross_frame_count(num_rot_frames, num_open_frames, locked=False):
+    # Frames of the cross effects: the rotation, the doors and, for
+    # "Crossopen" (`locked`), the final locked frame, made from the last door
+    # or, without doors, from the last rotation frame.
+    num_frames = num_rot_frames + num_open_frames
+    if locked and num_frames:
+        num_frames += 1
+    return num_frames
+
+
+def scale_factor(i, num_frames):
+    # Linear from 100% for the first frame to FINAL_SCALE for the last.
+    return 1.0 - (float(i) / (num_frames - 1)) * (1.0 - FINAL_SCALE)
+
+
+def multiply(a, b):
+    return tuple(tuple(sum(a[i][k] * b[k][j] for k in range(3))
+                       for j in range(3)) for i in range(3))
+
+
+def translation(tx, ty):
+    return ((1.0, 0.0, float(tx)),
+            (0.0, 1.0, float(ty)),
+            (0.0, 0.0, 1.0))
+
+
+def scaling(scale_x, scale_y):
+    return ((float(scale_x), 0.0, 0.0),
+            (0.0, float(scale_y), 0.0),
+            (0.0, 0.0, 1.0))
+
+
+def rotation(angle_degrees, center_x, center_y):
+    # Same orientation as gimp_item_transform_rotate (clockwise on screen,
+    # since the y axis points down).  Quarter turns get exact coefficients
+    # so that they are recognised as pixel moves.
+    turns = keyframes.quarter_turns(angle_degrees)
+    if turns is None:
+        c = math.cos(math.radians(angle_degrees))
+        s = math.sin(math.radians(angle_degrees))
+    else:
+        c, s = ((1.0, 0.0), (0.0, 1.0), (-1.0, 0.0), (0.0, -1.0))[turns]
+    rotate = ((c, -s, 0.0),
+              (s, c, 0.0),
+              (0.0, 0.0, 1.0))
+    return multiply(translation(center_x, center_y),
+                    multiply(rotate, translation(-center_x, -center_y)))
+
+
+def coefficients(matrix):
+    # The nine values in the order gimp_item_transform_matrix takes them.
+    return [float(matrix[i][j]) for i in range(3) for j in range(3)]
+
+
+def stretch(matrix):
+    # The most the matrix stretches any direction: the larger singular value
+    # of its linear part.
+    a, b = matrix[0][0], matrix[0][1]
+    c, d = matrix[1][0], matrix[1][1]
+    half_sum = (a * a + b * b + c * c + d * d) / 2.0
+    determinant = a * d - b * c
+    spread = math.sqrt(max(half_sum * half_sum - determinant * determinant, 0.0))
+    return math.sqrt(half_sum + spread)
+
+
+def pyramid_depth(width, height):
+    # Number of levels of an image pyramid (the source, then 1/2, 1/4, ...)
+    # down to the last level at least a pixel wide and high.
+    depth = 1
+    while width > 1 and height > 1:
+        width = (width + 1) // 2
+        height = (height + 1) // 2
+        depth += 1
+    return depth
+
+
+def pyramid_level(matrix, depth):
+    # The smallest pyramid level that still has a source pixel for every
+    # frame pixel in every direction, so nothing is magnified from it.
+    scale = stretch(matrix)
+    level = 0
+    while level + 1 < depth and scale * 2 ** (level + 1) <= 1.0:
+        level += 1
+    return level
+
+
+def from_level(matrix, origin, factor_x, factor_y):
+    # `matrix` for a copy of the source `factor_x` by `factor_y` times smaller,
+    # with the same top left corner `origin`.
+    return multiply(matrix, multiply(translation(origin[0], origin[1]),
+                                     multiply(scaling(factor_x, factor_y),
+                                              translation(-origin[0], -origin[1]))))
+
+
+def transformed_rect(matrix, rect):
+    # Bounding box of the transformed rectangle, rounded outwards the way
+    # GIMP does when the transform result is not clipped.
+    x, y, width, height = rect
+    xs = []
+    ys = []
+    for px, py in ((x, y), (x + width, y), (x, y + height),
+                   (x + width, y + height)):
+        tx, ty, tw = [row[0] * px + row[1] * py + row[2] for row in matrix]
+        # Absorb floating point noise before rounding (cos(90deg) is not 0).
+        xs.append(round(tx / tw, 6))
+        ys.append(round(ty / tw, 6))
+    x0 = int(math.floor(min(xs)))
+    y0 = int(math.floor(min(ys)))
+    x1 = int(math.ceil(max(xs)))
+    y1 = int(math.ceil(max(ys)))
+    return x0, y0, max(x1 - x0, 1), max(y1 - y0, 1)
+
+
+class PlannedFrame(object):
+    # `matrix` takes the source layer onto the frame, which covers `bounds`.
+    # `source` is the index of an earlier frame with the same result (its own
+    # index otherwise).  Exact quarter turns keep their `turns` and `center`
+    # so the PDB path can use the lossless rotate-simple transform.
+
+    def __init__(self, index, matrix, bounds, source, turns=None, center=None):
+        self.index = index
+        self.matrix = matrix
+        self.bounds = bounds
+        self.source = source
+        self.turns = turns
+        self.center = center
+
+
+def layer_center(layer_rect):
+    # The pivot gimp_item_transform_rotate uses with auto_center: the centre
+    # of the layer, in image coordinates.
+    x, y, width, height = layer_rect
+    return x + width / 2.0, y + height / 2.0
+
+
+def rotation_plan(layer_rect, angles, center):
+    # Rotation about the image point `center` for every angle (degrees), like
+    # gimp_item_transform_rotate with the default TRANSFORM_RESIZE_ADJUST:
+    # each frame grows to fit the rotated layer.
+    sources = keyframes.reuse_sources(angles)
+    plan = []
+    for i, angle in enumerate(angles):
+        matrix = rotation(angle, center[0], center[1])
+        bounds = transformed_rect(matrix, layer_rect)
+        turns = keyframes.quarter_turns(angle)
+        if turns is not None and not keyframes.is_grid_aligned(turns, *center):
+            turns = None
+        plan.append(PlannedFrame(i, matrix, bounds, sources[i], turns, tuple(center)))
+    return plan
+
+
+def rotated_scaled_plan(layer_rect, image_height, num_frames):
+    # "Rotate x Scale": each rotated frame (expanded to fit) is stretched to
+    # scale_factor() of the layer size and moved to the bottom left of the
+    # image, all in the one matrix.
+    x, y, width, height = layer_rect
+    plan = []
+    for i, angle in enumerate(rotation_angles(num_frames)):
+        rotate = rotation(angle, x + width / 2.0, y + height / 2.0)
+        bx, by, bw, bh = transformed_rect(rotate, layer_rect)
+        factor = scale_factor(i, num_frames)
+        new_width = max(int(width * factor), 1)
+        new_height = max(int(height * factor), 1)
+        matrix = multiply(translation(0, image_height - new_height),
+                          multiply(scaling(float(new_width) / bw,
+                                           float(new_height) / bh),
+                                   multiply(translation(-bx, -by), rotate)))
+        plan.append(PlannedFrame(i, matrix,
+                                 (0, image_height - new_height, new_width,
+                                  new_height), i))
+    return plan
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# Finished frames waiting for their turn, under a memory budget.
+#
+# Frames rendered ahead of the one being written (by gimpscript.parallel)
+# are put in a FrameStore.  It keeps them in memory while they fit in the
+# budget; beyond it, the frames needed last are spilled to a temporary file
+# and mapped back with numpy.memmap when their turn comes.  Big canvases then
+# slow down to disk speed instead of running out of memory.
+#
+# The store only holds frames on their way out of the plug-in.  Frames added
+# as layers end up in GIMP's layer stack, which GIMP's tile cache and swap
+# file manage: 300 frames of a 4000x4000 layer still take about 19 GB there,
+# and layers.check_layer_memory() warns before such a run.  Only file output
+# keeps memory down for those, by encoding each frame as soon as it is ready.
+import tempfile
+import threading
+
+import numpy as np
+
+
+class FrameStore(object):
+
+    def __init__(self, budget_bytes, directory=None):
+        self.budget_bytes = budget_bytes
+        self.directory = directory
+        self.lock = threading.Lock()
+        # Frame number -> (pixels, offsets) held in memory, and -> (file
+        # offset, shape, offsets) of the spilled ones.
+        self.memory = {}
+        self.spilled = {}
+        self.memory_bytes = 0
+        self.peak_memory_bytes = 0
+        self.spilled_frames = 0
+        self.spill_file = None
+        self.file_size = 0
+        # Free (offset, size) regions of the spill file, reused first-fit.
+        self.free = []
+
+    def __len__(self):
+        return len(self.memory) + len(self.spilled)
+
+    def __contains__(self, index):
+        return index in self.memory or index in self.spilled
+
+    def put(self, index, pixels, offsets):
+        with self.lock:
+            self.memory[index] = (pixels, offsets)
+            self.memory_bytes += pixels.nbytes
+            # The frames wanted last go to disk first.
+            while self.memory_bytes > self.budget_bytes and self.memory:
+                self._spill(max(self.memory))
+            self.peak_memory_bytes = max(self.peak_memory_bytes, self.memory_bytes)
+
+    def pop(self, index):
+        # Takes frame `index` out of the store, reading it back if spilled.
+        with self.lock:
+            if index in self.memory:
+                pixels, offsets = self.memory.pop(index)
+                self.memory_bytes -= pixels.nbytes
+                return pixels, offsets
+            start, shape, offsets = self.spilled.pop(index)
+            view = np.memmap(self.spill_file, dtype=np.uint8, mode="r",
+                             offset=start, shape=shape)
+            pixels = np.array(view)
+            del view
+            self._release(start, pixels.nbytes)
+            return pixels, offsets
+
+    def _spill(self, index):
+        pixels, offsets = self.memory.pop(index)
+        self.memory_bytes -= pixels.nbytes
+        size = max(pixels.nbytes, 1)
+        start = self._allocate(size)
+        view = np.memmap(self.spill_file, dtype=np.uint8, mode="r+",
+                         offset=start, shape=pixels.shape)
+        view[...] = pixels
+        view.flush()
+        del view
+        self.spilled[index] = (start, pixels.shape, offsets)
+        self.spilled_frames += 1
+
+    def _allocate(self, size):
+        for i, (start, free_size) in enumerate(self.free):
+            if free_size >= size:
+                if free_size == size:
+                    del self.free[i]
+                else:
+                    self.free[i] = (start + size, free_size - size)
+                return start
+        if self.spill_file is None:
+            self.spill_file = tempfile.TemporaryFile(prefix="gimpscript-frames-",
+                                                     dir=self.directory)
+        start = self.file_size
+        self.file_size += size
+        self.spill_file.truncate(self.file_size)
+        return start
+
+    def _release(self, start, size):
+        self.free.append((start, max(size, 1)))
+        self.free.sort()
+        # Merge neighbouring regions so that big frames fit again.
+        merged = []
+        for region in self.free:
+            if merged and merged[-1][0] + merged[-1][1] == region[0]:
+                merged[-1] = (merged[-1][0], merged[-1][1] + region[1])
+            else:
+                merged.append(region)
+        self.free = merged
+
+    def close(self):
+        with self.lock:
+            self.memory.clear()
+            self.spilled.clear()
+            self.memory_bytes = 0
+            if self.spill_file is not None:
+                self.spill_file.close()
+                self.spill_file = None
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+# Spotting rotation frames that need no interpolation.
+#
+# Angles that are multiples of 90 degrees can be produced with exact pixel
+# flips/transposes, and frames whose angle repeats (0 and 360 degrees in
+# "Only Rotate") can reuse the frame already rendered.
+
+# Tolerance, in degrees, for treating an angle as an exact keyframe.
+_ANGLE_EPSILON = 1e-7
+
+
+def angle_key(angle_degrees):
+    # Identifies equivalent angles: 0 and 360 degrees share a key.
+    key = round(angle_degrees % 360.0, 6)
+    return 0.0 if key == 360.0 else key
+
+
+def quarter_turns(angle_degrees):
+    # Number of clockwise quarter turns (0-3) if the angle is a multiple of
+    # 90 degrees, otherwise None.
+    turns = angle_degrees / 90.0
+    nearest = round(turns)
+    if abs(turns - nearest) * 90.0 > _ANGLE_EPSILON:
+        return None
+    return int(nearest) % 4
+
+
+def is_grid_aligned(turns, center_x, center_y):
+    # A quarter turn about (center_x, center_y) maps pixel edges onto pixel
+    # edges only for some pivots; otherwise the result still needs resampling.
+    def integral(value):
+        return abs(value - round(value)) < 1e-9
+
+    if turns == 0:
+        return True
+    if turns == 2:
+        return integral(2 * center_x) and integral(2 * center_y)
+    return integral(center_x + center_y) and integral(center_x - center_y)
+
+
+def reuse_sources(angles_degrees):
+    # For every frame, the index of the first frame with the same angle (its
+    # own index when the angle has not been seen before).
+    first = {}
+    sources = []
+    for i, angle in enumerate(angles_degrees):
+        sources.append(first.setdefault(angle_key(angle), i))
+    return sources
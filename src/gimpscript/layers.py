@@ -0,0 +1,538 @@
+# -*- coding: utf-8 -*-
+# PDB helpers shared by the plug-ins.
+from gimpfu import *
+import functools
+import math
+
+from gimpscript import doors, draft, easing, export, frameplan, keyframes, motion, profiler, undo
+
+# gimp_item_transform_rotate_simple rotation types, indexed by quarter turns.
+_ROTATE_TYPES = {1: ROTATE_90, 2: ROTATE_180, 3: ROTATE_270}
+
+# Parameters of the plug-ins whose NumPy frames can be rendered by several
+# processes (see gimpscript.parallel); 1 worker renders in the plug-in itself.
+# The read-ahead limit only bounds the frames that workers finish before
+# their turn: a single process renders one frame at a time anyway, and the
+# layers added to the image are held by GIMP's own tile cache.
+PARALLEL_PARAMS = [
+    (PF_INT, "workers", "Worker processes (0 = one per core)", 1),
+    (PF_INT, "chunk_frames", "Frames per worker task", 4),
+    (PF_INT, "readahead_mb", "Memory for frames workers render ahead (MB, 0 = no limit)", 1024)
+]
+
+
+class Context(object):
+    # Pushes GIMP's context for the block and pops it whatever happens, so
+    # that interpolation and other settings made inside never reach the
+    # user's context.
+
+    def __enter__(self):
+        pdb.gimp_context_push()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pdb.gimp_context_pop()
+        return False
+
+
+def check_numpy_source(drawable):
+    # The NumPy code paths need numpy and work on RGB or grayscale pixels.
+    try:
+        import numpy
+    except ImportError:
+        pdb.gimp_message("The NumPy engine requires the numpy module; use the PDB engine instead.")
+        return False
+    if pdb.gimp_drawable_is_indexed(drawable):
+        pdb.gimp_message("The NumPy engine does not support indexed images; use the PDB engine instead.")
+        return False
+    return True
+
+
+def check_layer_memory(plan, bpp):
+    # Warns when the planned frames, added as layers with an alpha channel,
+    # take more memory than GIMP's tile cache (Preferences > System
+    # Resources).  GIMP then swaps them to its own swap file, slowly, or runs
+    # out of memory; the plug-in cannot hold frames that GIMP owns anywhere
+    # else.  File output streams the frames instead.  The run goes on.
+    if bpp in (1, 3):
+        bpp += 1
+    layer_bytes = sum(frame.bounds[2] * frame.bounds[3] * bpp for frame in plan)
+    cache_bytes = _gimprc_bytes("tile-cache-size")
+    if cache_bytes and layer_bytes > cache_bytes:
+        pdb.gimp_message("These frames take about %d MB as layers, more than GIMP's tile cache "
+                         "(%d MB, Preferences > System Resources), so GIMP will swap them to disk. "
+                         "Choose a file in \"Output\" to stream the frames instead."
+                         % (layer_bytes // 1000000, cache_bytes // 1000000))
+
+
+def _gimprc_bytes(name):
+    # A memory size from gimprc ("2048M", "4g", "1073741824"), or None.
+    try:
+        text = pdb.gimp_gimprc_query(name)
+    except RuntimeError:
+        return None
+    if not text:
+        return None
+    text = text.strip().lower()
+    factor = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}.get(text.rstrip("b")[-1:], 1)
+    try:
+        return int(float(text.rstrip("kmgb")) * factor)
+    except ValueError:
+        return None
+
+
+def rotate_layer(layer, angle_degrees, auto_center, center_x, center_y):
+    # Rotates like gimp_item_transform_rotate, but keyframes are done without
+    # interpolation: 0 degrees is left alone and quarter turns use the exact
+    # rotate-simple transform.  With `auto_center` the pivot is the centre of
+    # the layer and (center_x, center_y) is ignored.  Returns the (possibly
+    # new) layer.
+    turns = keyframes.quarter_turns(angle_degrees)
+    if turns == 0:
+        return layer
+    if auto_center:
+        center_x, center_y = frameplan.layer_center(layer.offsets + (layer.width, layer.height))
+    if turns is None or not keyframes.is_grid_aligned(turns, center_x, center_y):
+        return pdb.gimp_item_transform_rotate(layer, math.radians(angle_degrees),
+                                              False, center_x, center_y)
+    return pdb.gimp_item_transform_rotate_simple(layer, _ROTATE_TYPES[turns],
+                                                 False, center_x, center_y)
+
+
+def transform_layer(layer, frame):
+    # Applies a frameplan frame to `layer` with a single transform and returns
+    # the (possibly new) layer.  Exact quarter turns go through rotate_layer;
+    # anything else is one gimp_item_transform_matrix call, so rotation and
+    # scaling are interpolated once.  The caller pushes the context.
+    if frame.turns is not None:
+        return rotate_layer(layer, 90.0 * frame.turns, False, frame.center[0], frame.center[1])
+    pdb.gimp_context_set_transform_resize(TRANSFORM_RESIZE_ADJUST)
+    layer = pdb.gimp_item_transform_matrix(layer, *frameplan.coefficients(frame.matrix))
+    x, y, width, height = frame.bounds
+    if (layer.offsets, layer.width, layer.height) != ((x, y), width, height):
+        # Rounding in GIMP can leave a pixel more or less than planned.
+        pdb.gimp_layer_resize(layer, width, height, layer.offsets[0] - x, layer.offsets[1] - y)
+    return layer
+
+
+class LayerPyramid(object):
+    # Copies of `drawable` at 1/2, 1/4, 1/8, ... of its size, kept in a
+    # scratch image and each scaled once from the level above it the first
+    # time a frame needs it.  Strongly shrunk frames are then copied and
+    # transformed from a small level rather than from the whole drawable,
+    # which is less work and aliases less.  delete() drops the scratch image.
+
+    def __init__(self, drawable):
+        self.drawable = drawable
+        self.levels = [drawable]
+        self.depth = frameplan.pyramid_depth(drawable.width, drawable.height)
+        self.image = None
+
+    def level(self, index):
+        while len(self.levels) <= index:
+            if self.image is None:
+                self.image = pdb.gimp_image_new(self.drawable.width, self.drawable.height,
+                                                self.drawable.image.base_type)
+            previous = self.levels[-1]
+            layer = pdb.gimp_layer_new_from_drawable(previous, self.image)
+            pdb.gimp_image_insert_layer(self.image, layer, None, 0)
+            pdb.gimp_layer_add_alpha(layer)
+            pdb.gimp_layer_scale(layer, (previous.width + 1) // 2, (previous.height + 1) // 2, True)
+            # Keep the top left corner where the drawable's is.
+            pdb.gimp_layer_set_offsets(layer, *self.drawable.offsets)
+            self.levels.append(layer)
+        return self.levels[index]
+
+    def frame_layer(self, image, frame, position=0):
+        # Adds a copy of the level `frame` is best rendered from to `image` and
+        # returns it with the frame, its matrix changed to start from that level.
+        index = frameplan.pyramid_level(frame.matrix, self.depth)
+        if index == 0:
+            layer = pdb.gimp_layer_copy(self.drawable, True)
+            pdb.gimp_image_insert_layer(image, layer, None, position)
+            return layer, frame
+        level = self.level(index)
+        layer = pdb.gimp_layer_new_from_drawable(level, image)
+        pdb.gimp_image_insert_layer(image, layer, None, position)
+        matrix = frameplan.from_level(frame.matrix, self.drawable.offsets,
+                                      float(self.drawable.width) / level.width,
+                                      float(self.drawable.height) / level.height)
+        return layer, frameplan.PlannedFrame(frame.index, matrix, frame.bounds, frame.source)
+
+    def scaled_layer(self, image, width, height, position=-1):
+        # Adds the drawable scaled to `width` x `height` to `image`, scaled from
+        # the smallest level that is still at least that large.
+        index = frameplan.pyramid_level(
+            frameplan.scaling(float(width) / self.drawable.width,
+                              float(height) / self.drawable.height), self.depth)
+        layer = pdb.gimp_layer_new_from_drawable(self.level(index), image)
+        pdb.gimp_image_insert_layer(image, layer, None, position)
+        pdb.gimp_layer_scale(layer, width, height, True)
+        return layer
+
+    def delete(self):
+        if self.image is not None:
+            pdb.gimp_image_delete(self.image)
+            self.image = None
+        del self.levels[1:]
+
+
+def copy_rendered_layer(image, rendered, position=0):
+    # Duplicates an already transformed frame instead of transforming again.
+    layer = pdb.gimp_layer_copy(rendered, True)
+    pdb.gimp_image_insert_layer(image, layer, None, position)
+    return layer
+
+
+def add_door_frames(anim_img, img, num_open_frames, steps=None):
+    # Adds the French-door opening frames of `img`'s active layer to
+    # `anim_img` and returns them; `steps` lists the frame numbers (1 to
+    # num_open_frames) to add, or None for all.  The four source quadrants
+    # are extracted once; the global clipboard is never used.
+    source_layer = pdb.gimp_image_get_active_layer(img)
+    try:
+        from gimpscript import pixels
+    except ImportError:
+        return _add_door_frames_buffers(anim_img, img, num_open_frames, steps)
+
+    width, height = img.width, img.height
+    mid_x, mid_y = width // 2, height // 2
+    canvas = pixels.read_canvas(source_layer, width, height)
+    cache = doors.QuadrantCache(canvas, mid_x, mid_y)
+    frames = []
+    for i, dx, dy in _door_steps(num_open_frames, mid_x, mid_y, steps):
+        frames.append(pixels.add_layer_from_array(anim_img, cache.compose(dx, dy),
+                                                  "Door Frame %d" % i, (0, 0), -1))
+        profiler.frame_done()
+    return frames
+
+
+def _door_steps(num_open_frames, mid_x, mid_y, steps):
+    all_steps = doors.door_steps(num_open_frames, mid_x, mid_y)
+    if steps is None:
+        return all_steps
+    steps = set(steps)
+    return [step for step in all_steps if step[0] in steps]
+
+
+def _add_door_frames_buffers(anim_img, img, num_open_frames, steps=None):
+    # Without NumPy the quadrants are cached in named buffers instead, so each
+    # frame costs four paste/offset/anchor calls and no selection or copy.
+    width, height = img.width, img.height
+    mid_x, mid_y = width // 2, height // 2
+
+    # Work on a duplicate so that our selections do not disturb the user's image.
+    source_img = pdb.gimp_image_duplicate(img)
+    source_layer = pdb.gimp_image_get_active_layer(source_img)
+    buffers = []
+    try:
+        for rect, direction in doors.quadrants(width, height, mid_x, mid_y):
+            pdb.gimp_image_select_rectangle(source_img, CHANNEL_OP_REPLACE, *rect)
+            name = pdb.gimp_edit_named_copy(source_layer, "Door quadrant")
+            buffers.append((name, rect, direction))
+        pdb.gimp_selection_none(source_img)
+
+        frames = []
+        for i, dx, dy in _door_steps(num_open_frames, mid_x, mid_y, steps):
+            door_layer = pdb.gimp_layer_new(anim_img, width, height, RGBA_IMAGE,
+                                            "Door Frame %d" % i, 100, NORMAL_MODE)
+            pdb.gimp_image_insert_layer(anim_img, door_layer, None, -1)
+            for name, rect, direction in buffers:
+                floating_sel = pdb.gimp_edit_named_paste(door_layer, name, False)
+                x, y = doors.quadrant_offsets(rect, direction, dx, dy)
+                pdb.gimp_layer_set_offsets(floating_sel, x, y)
+                pdb.gimp_floating_sel_anchor(floating_sel)
+            frames.append(door_layer)
+            profiler.frame_done()
+        return frames
+    finally:
+        for name, rect, direction in buffers:
+            pdb.gimp_buffer_delete(name)
+        pdb.gimp_image_delete(source_img)
+
+
+def cross_effect(proc_name, img, drawable, num_rot_frames, num_open_frames, output, filename,
+                 frame_duration, loop_count, delta_frames, gif_palette, workers, chunk_frames, readahead_mb,
+                 preview, motion_px, locked=False):
+    # Body of both cross plug-ins: the layer turns a full circle, then the
+    # image opens like French doors into a cross.  With `locked` ("Crossopen")
+    # a final frame shows the open doors shifted right by half the image with
+    # a small copy of the layer at the bottom left.  The frames go to a new
+    # image, or straight to a file.
+    num_frames = frameplan.cross_frame_count(num_rot_frames, num_open_frames, locked)
+    if preview != draft.PREVIEW_OFF:
+        # Every frame small and unfiltered first, in an image of its own.
+        if not check_numpy_source(drawable):
+            return
+        from gimpscript import effects, pixels
+        factor = draft.draft_factor(img.width, img.height)
+        source_canvas = pixels.read_canvas(pdb.gimp_image_get_active_layer(img), img.width, img.height)
+        frames = effects.cross_frames(draft.shrink(pixels.read_drawable(drawable), factor),
+                                      draft.shrink_offsets(drawable.offsets, factor),
+                                      draft.shrink(source_canvas, factor), num_rot_frames, num_open_frames,
+                                      INTERPOLATION_NONE, locked=locked)
+        draft.show_draft(proc_name, img, factor, frames, num_frames)
+        if preview == draft.PREVIEW_DRAFT:
+            return
+
+    timing = None
+    if motion_px > 0:
+        # With a motion target, only the frames that move far enough are made.
+        timing = motion.thin(motion.cross(drawable.offsets + (drawable.width, drawable.height), img.width,
+                                          img.height, num_rot_frames, num_open_frames, locked), motion_px)
+    phases = [("rotation", num_rot_frames), ("doors", num_open_frames)]
+    if num_frames > num_rot_frames + num_open_frames:
+        phases.append(("final composite", 1))
+
+    if output != export.OUTPUT_LAYERS:
+        # Frames go straight to the file; no animation image is created.  They
+        # are rendered in NumPy (on `workers` processes if asked) and encoded
+        # one at a time.
+        if export.check_output(output, filename) and check_numpy_source(drawable):
+            from gimpscript import effects, framecache, pixels
+            with profiler.Run(proc_name, motion.frame_count(timing, num_frames), "rotation"):
+                if timing is not None:
+                    motion.report(timing, num_frames, motion_px)
+                source_canvas = pixels.read_canvas(pdb.gimp_image_get_active_layer(img), img.width, img.height)
+                cache = framecache.open_cache()
+                render = functools.partial(framecache.render, effects.cross_frames,
+                                           (pixels.read_drawable(drawable), drawable.offsets, source_canvas,
+                                            num_rot_frames, num_open_frames, INTERPOLATION_CUBIC), num_frames,
+                                           workers, chunk_frames, locked=locked, cache=cache,
+                                           readahead_mb=readahead_mb)
+                export.write_animation(output, filename, img.width, img.height, render, num_frames,
+                                       frame_duration, loop_count, delta_frames, phases, gif_palette, timing)
+        return
+
+    # The profile is written and `pdb` restored even if a frame fails.
+    with profiler.Run(proc_name, motion.frame_count(timing, num_frames), "rotation"):
+        if timing is not None:
+            motion.report(timing, num_frames, motion_px)
+        width, height = img.width, img.height
+        selected = motion.selected(timing)
+
+        # Create a new image to hold all animation frames.
+        anim_img = pdb.gimp_image_new(width, height, RGB)
+
+        # The new image needs no history: its frames are built with undo off,
+        # turned back on even if a frame fails.  The source image is only read.
+        with undo.Transaction(anim_img, undo.UNDO_NONE):
+            #### Phase 1: Rotation frames ####
+            frames = add_cross_rotation_frames(anim_img, drawable, num_rot_frames, selected)
+
+            #### Phase 2: French-door (cross) opening frames ####
+            # The four quadrants of the source image are placed with offsets so
+            # that the effect mimics doors opening; they are cached once and
+            # blitted into every frame.
+            profiler.phase("doors")
+            steps = None
+            if selected is not None:
+                steps = [i - num_rot_frames + 1 for i in selected
+                         if num_rot_frames <= i < num_rot_frames + num_open_frames]
+            frames.extend(add_door_frames(anim_img, img, num_open_frames, steps))
+
+            #### Phase 3: the final "locked" frame with the mini overlay ####
+            if num_frames > num_rot_frames + num_open_frames:
+                profiler.phase("final composite")
+                frames.append(_add_locked_frame(anim_img, drawable, frames[-1]))
+                profiler.frame_done()
+            if timing is not None:
+                motion.name_durations(frames, timing, frame_duration)
+            if frames:
+                pdb.gimp_image_set_active_layer(anim_img, frames[-1] if locked else frames[0])
+
+        # Instead of saving to disk, display the new image with all frames as layers.
+        pdb.gimp_display_new(anim_img)
+        pdb.gimp_message("New animation image created with %d layers." % len(frames))
+
+
+def add_cross_rotation_frames(anim_img, drawable, num_rot_frames, selected=None):
+    # Adds phase 1 of the cross effects to the bottom of `anim_img`'s stack and
+    # returns the layers: copies of `drawable` turned about their own centre
+    # and expanded to fit, as gimp_item_transform_rotate(layer, angle, True,
+    # ...) rotates with auto_center.  Only the frame numbers in `selected` are
+    # made if given.  Quarter turns are exact, and a frame repeating an
+    # earlier angle is a copy of it.
+    layer_rect = drawable.offsets + (drawable.width, drawable.height)
+    plan = frameplan.rotation_plan(layer_rect, frameplan.cross_rotation_angles(num_rot_frames),
+                                   frameplan.layer_center(layer_rect))
+    if selected is not None:
+        plan = [frame for frame in plan if frame.index in selected]
+    added = []
+    by_index = {}
+    with Context():
+        for frame in plan:
+            if frame.source != frame.index and frame.source in by_index:
+                added.append(copy_rendered_layer(anim_img, by_index[frame.source], -1))
+                profiler.frame_done()
+                continue
+            layer = pdb.gimp_layer_new_from_drawable(drawable, anim_img)
+            pdb.gimp_image_insert_layer(anim_img, layer, None, -1)
+            layer = transform_layer(layer, frame)
+            added.append(layer)
+            by_index[frame.index] = layer
+            profiler.frame_done()
+    return added
+
+
+def _add_locked_frame(anim_img, drawable, last_frame):
+    # A copy of `last_frame` shifted right by half the image, merged with a
+    # FINAL_SCALE copy of `drawable` at the bottom left of the canvas, scaled
+    # from a copy already shrunk by a power of two.
+    width, height = anim_img.width, anim_img.height
+    locked_layer = pdb.gimp_layer_copy(last_frame, True)
+    pdb.gimp_image_insert_layer(anim_img, locked_layer, None, -1)
+    pdb.gimp_layer_translate(locked_layer, width // 2, 0)
+    new_width = int(width * frameplan.FINAL_SCALE)
+    new_height = int(height * frameplan.FINAL_SCALE)
+    pyramid = LayerPyramid(drawable)
+    try:
+        mini_layer = pyramid.scaled_layer(anim_img, new_width, new_height)
+    finally:
+        pyramid.delete()
+    pdb.gimp_layer_set_offsets(mini_layer, 0, height - new_height)
+    # The mini layer is above the locked layer in the stack.
+    return pdb.gimp_image_merge_down(anim_img, mini_layer, EXPAND_AS_NECESSARY)
+
+
+def add_sonar_frames(image, foreground_layer, num_frames, easing_index=0, softness=0.0, frames=None):
+    # Adds `num_frames` copies of the foreground on top of the stack, or those
+    # numbered in `frames`, each one with the growing sonar circle hidden by
+    # its layer mask.  The masks come from one distance field and are written
+    # in bulk, without selections or changing the context's foreground colour.
+    try:
+        from gimpscript import pixels, sonar
+    except ImportError:
+        return _add_sonar_frames_selection(image, foreground_layer, num_frames, easing_index, softness, frames)
+
+    center, max_radius = sonar.center_and_max_radius(image.width, image.height)
+    distance = sonar.distance_field(foreground_layer.width, foreground_layer.height, center,
+                                    foreground_layer.offsets)
+    added = []
+    masks = sonar.sonar_masks(distance, max_radius, num_frames, easing_index, softness, frames)
+    for frame_mask in masks:
+        new_layer = pdb.gimp_layer_copy(foreground_layer, True)
+        image.add_layer(new_layer, 0)
+        pixels.add_mask_from_array(new_layer, frame_mask)
+        added.append(new_layer)
+        profiler.frame_done()
+    return added
+
+
+def _add_sonar_frames_selection(image, foreground_layer, num_frames, easing_index, softness=0.0,
+                                frames=None):
+    # Without NumPy each mask is filled through an ellipse selection; the
+    # context is pushed so the user's foreground colour and selection options
+    # are left alone.  A positive softness feathers the selection by that many
+    # pixels, GIMP's Gaussian counterpart of the linear edge of sonar.mask().
+    center_x = image.width // 2
+    center_y = image.height // 2
+    max_radius = math.sqrt(center_x ** 2 + center_y ** 2)
+    radii = easing.radius_schedule(num_frames, max_radius, easing_index)
+    if frames is not None:
+        radii = [radii[i] for i in frames]
+    added = []
+    pdb.gimp_context_push()
+    try:
+        pdb.gimp_context_set_foreground((0, 0, 0))
+        pdb.gimp_context_set_feather(softness > 0)
+        if softness > 0:
+            pdb.gimp_context_set_feather_radius(softness, softness)
+        for radius in radii:
+            new_layer = pdb.gimp_layer_copy(foreground_layer, True)
+            image.add_layer(new_layer, 0)
+            mask = pdb.gimp_layer_create_mask(new_layer, ADD_WHITE_MASK)
+            new_layer.add_mask(mask)
+            if radius > 0:
+                # An empty selection would fill (hide) the whole mask.
+                pdb.gimp_image_select_ellipse(image, CHANNEL_OP_REPLACE,
+                                              center_x - radius, center_y - radius,
+                                              2 * radius, 2 * radius)
+                pdb.gimp_edit_fill(mask, FOREGROUND_FILL)
+            added.append(new_layer)
+            profiler.frame_done()
+    finally:
+        pdb.gimp_selection_none(image)
+        pdb.gimp_context_pop()
+    return added
+
+
+def sonar_disappearance(proc_name, image, foreground_layer, background_layer, num_frames, easing_index,
+                        softness, output, filename, frame_duration, loop_count, delta_frames, gif_palette,
+                        workers, chunk_frames, readahead_mb, preview, undo_mode, motion_px,
+                        keep_background=False):
+    # Body of both sonar plug-ins, once their layers are found.  The foreground
+    # disappears inside a growing circle; by default the background is hidden
+    # and shown alone in a final frame, with `keep_background` it stays visible
+    # under every frame instead.
+    total = num_frames if keep_background else num_frames + 1
+
+    if preview != draft.PREVIEW_OFF:
+        # Every frame small and unfiltered first, in an image of its own.
+        if not check_numpy_source(foreground_layer):
+            return
+        from gimpscript import effects, pixels
+        factor = draft.draft_factor(image.width, image.height)
+        foreground = draft.shrink(pixels.read_canvas(foreground_layer, image.width, image.height), factor)
+        background = draft.shrink(pixels.read_canvas(background_layer, image.width, image.height), factor)
+        frames = effects.sonar_frames(foreground, background, num_frames, easing_index, softness / factor,
+                                      keep_background)
+        draft.show_draft(proc_name, image, factor, frames, total)
+        if preview == draft.PREVIEW_DRAFT:
+            return
+
+    timing = None
+    if motion_px > 0:
+        # With a motion target, only the frames that move far enough are made.
+        timing = motion.thin(motion.sonar(image.width, image.height, num_frames, easing_index,
+                                          not keep_background), motion_px)
+    phases = [("sonar", num_frames)] if keep_background else [("sonar", num_frames), ("background", 1)]
+
+    if output != export.OUTPUT_LAYERS:
+        # Frames go straight to the file; the image is left untouched.
+        if export.check_output(output, filename) and check_numpy_source(foreground_layer):
+            from gimpscript import effects, framecache, pixels
+            with profiler.Run(proc_name, motion.frame_count(timing, total), "sonar"):
+                if timing is not None:
+                    motion.report(timing, total, motion_px)
+                foreground = pixels.read_canvas(foreground_layer, image.width, image.height)
+                background = pixels.read_canvas(background_layer, image.width, image.height)
+                cache = framecache.open_cache()
+                render = functools.partial(framecache.render, effects.sonar_frames,
+                                           (foreground, background, num_frames, easing_index, softness),
+                                           total, workers, chunk_frames, keep_background=keep_background,
+                                           cache=cache, readahead_mb=readahead_mb)
+                export.write_animation(output, filename, image.width, image.height, render, total,
+                                       frame_duration, loop_count, delta_frames, phases, gif_palette, timing)
+        return
+
+    # Undo covers hiding the original layers too; the profile is written even
+    # if a frame fails.
+    with profiler.Run(proc_name, motion.frame_count(timing, total), "sonar"), \
+            undo.Transaction(image, undo_mode):
+        if timing is not None:
+            motion.report(timing, total, motion_px)
+        # Hide the original foreground, and the background unless it is kept,
+        # so that only the generated frames appear.
+        foreground_layer.visible = False
+        if not keep_background:
+            background_layer.visible = False
+
+        # Copies of the foreground with an expanding circular mask.  The radius
+        # follows the chosen easing curve from the image centre outwards.
+        selected = motion.selected(timing)
+        if selected is not None:
+            selected = [i for i in selected if i < num_frames]
+        frames = add_sonar_frames(image, foreground_layer, num_frames, easing_index, softness, selected)
+
+        if not keep_background:
+            # Finally, a frame showing the background layer completely.
+            profiler.phase("background")
+            final_frame = pdb.gimp_layer_copy(background_layer, True)
+            image.add_layer(final_frame, 0)
+            frames.append(final_frame)
+            profiler.frame_done()
+        if timing is not None:
+            motion.name_durations(frames, timing, frame_duration)
+
+    gimp.displays_flush()
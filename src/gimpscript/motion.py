@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+# Motion-aware frame sampling.
+#
+# The frame counts of the effects do not depend on the image size, so on a
+# small image consecutive frames can move by less than a pixel.  The motion
+# of every frame, the farthest any pixel moves since the frame before, is
+# known from the effect's parameters alone: the corners of the layer under
+# consecutive frame plan matrices (angle step times radius, scale step), the
+# change of the door offsets and of the sonar radius.  thin() keeps a frame
+# once the motion since the last kept one reaches the target, and the kept
+# frame lasts as long as the frames it stands for, so the animation takes
+# the same time.  The first and last frame of every phase are always kept.
+#
+# Plain Python only, so the PDB code paths can use it without numpy.
+import math
+
+from gimpfu import *
+
+from gimpscript import doors, easing, frameplan, profiler
+
+# Parameter appended to every effect.
+MOTION_PARAMS = [
+    (PF_FLOAT, "motion_px", "Skip frames moving less than (pixels, 0 = keep all)", 0.0)
+]
+
+# Motion of a frame that starts a phase: it is always kept.
+CUT = float("inf")
+
+
+def plan_motion(plan, layer_rect):
+    # Motion of every frame of a frameplan plan applied to the layer at
+    # `layer_rect`.  Matrices are affine, so the farthest moving point of the
+    # layer is one of its corners.
+    x, y, width, height = layer_rect
+    corners = ((x, y), (x + width, y), (x, y + height), (x + width, y + height))
+    motion = [CUT] if plan else []
+    for previous, frame in zip(plan, plan[1:]):
+        motion.append(max(_distance(_apply(previous.matrix, corner),
+                                    _apply(frame.matrix, corner))
+                          for corner in corners))
+    return motion
+
+
+def _apply(matrix, point):
+    tx, ty, tw = [row[0] * point[0] + row[1] * point[1] + row[2] for row in matrix]
+    return tx / tw, ty / tw
+
+
+def _distance(a, b):
+    return math.hypot(a[0] - b[0], a[1] - b[1])
+
+
+def rotation(layer_rect, num_frames):
+    # "Only Rotate".
+    center = (layer_rect[2] / 2.0, layer_rect[3] / 2.0)
+    return plan_motion(frameplan.rotation_plan(layer_rect, frameplan.rotation_angles(num_frames),
+                                               center), layer_rect)
+
+
+def rotation_scale(layer_rect, image_height, num_frames):
+    # "Rotate x Scale".
+    return plan_motion(frameplan.rotated_scaled_plan(layer_rect, image_height, num_frames),
+                       layer_rect)
+
+
+def cross(layer_rect, width, height, num_rot_frames, num_open_frames, locked=False):
+    # The cross effects: rotation about the layer's centre, the doors opening,
+    # and for "Crossopen" the final composite.
+    mid_x, mid_y = width // 2, height // 2
+    motion = plan_motion(frameplan.rotation_plan(layer_rect,
+                                                 frameplan.cross_rotation_angles(num_rot_frames),
+                                                 frameplan.layer_center(layer_rect)), layer_rect)
+    steps = doors.door_steps(num_open_frames, mid_x, mid_y)
+    if steps:
+        motion.append(CUT)
+    for previous, step in zip(steps, steps[1:]):
+        motion.append(_distance(previous[1:], step[1:]))
+    if frameplan.cross_frame_count(num_rot_frames, num_open_frames, locked) > len(motion):
+        motion.append(CUT)
+    return motion
+
+
+def sonar(width, height, num_frames, easing_index=0, background_frame=False):
+    # The sonar effects: the edge of the circle moves by the change of radius.
+    max_radius = math.sqrt((width // 2) ** 2 + (height // 2) ** 2)
+    radii = easing.radius_schedule(num_frames, max_radius, easing_index)
+    motion = [CUT] + [abs(b - a) for a, b in zip(radii, radii[1:])]
+    if background_frame:
+        motion.append(CUT)
+    return motion
+
+
+def thin(motion, target):
+    # (frame, span) of the frames to keep for at least `target` pixels of
+    # motion per frame, `span` being the number of frames each one stands for;
+    # None when `target` is not positive.
+    if target <= 0:
+        return None
+    num_frames = len(motion)
+    kept = []
+    moved = 0.0
+    for i in range(num_frames):
+        moved += motion[i]
+        last = i == num_frames - 1 or motion[i + 1] == CUT
+        if moved >= target or last:
+            kept.append(i)
+            moved = 0.0
+    return [(frame, end - frame) for frame, end in zip(kept, kept[1:] + [num_frames])]
+
+
+def selected(timing):
+    # The frame numbers `timing` keeps, or None for all of them.
+    if timing is None:
+        return None
+    return [frame for frame, span in timing]
+
+
+def frame_count(timing, num_frames):
+    return num_frames if timing is None else len(timing)
+
+
+def name_durations(layers, timing, frame_duration):
+    # Puts the time of every kept frame in its layer name, "(120ms)", which
+    # GIMP's GIF export and animation playback read.
+    for layer, (frame, span) in zip(layers, timing):
+        layer.name = "%s (%dms)" % (layer.name, span * frame_duration)
+
+
+def report(timing, num_frames, target):
+    # Tells how many frames were skipped and notes it in the profile.
+    kept = len(timing)
+    profiler.note("motion", {"target_px": target, "frames": num_frames, "kept": kept})
+    pdb.gimp_message("Kept %d of %d frames (%d skipped) for about %.1f pixels of motion per frame."
+                     % (kept, num_frames, num_frames - kept, target))
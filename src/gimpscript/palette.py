@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+# One palette for every frame of a GIF.
+#
+# Quantizing each frame on its own gives every frame different colours, so
+# areas that do not move shimmer, and runs a median cut per frame.  Here a
+# single palette is built from a sample of the frames (evenly spaced, first
+# and last included, so the door and sonar end states count as much as the
+# rotation).  Their colours are counted in a histogram of 32 levels per
+# channel (5 bits), which a weighted median cut splits and a few k-means
+# passes refine.  Pixels are then mapped through a lookup table over the same
+# cells, built once per palette, which costs three shifts and one gather per
+# pixel.  Ordered dithering adds a Bayer pattern tied to canvas
+# coordinates before the lookup, so pixels that do not change between frames
+# keep their index and the changed-rectangle optimization still applies.
+import numpy as np
+
+# Frames rendered to build the palette, and pixels sampled from each.
+SAMPLE_FRAMES = 16
+SAMPLE_PIXELS = 1 << 18
+
+# Lloyd passes refining the median cut.
+KMEANS_ITERATIONS = 4
+
+# Bits per channel of the colour histogram and of the lookup table.
+TABLE_BITS = 5
+
+# Colours compared with the palette at once, in nearest().
+_CHUNK = 8192
+
+_BAYER_2 = np.array([[0, 2], [3, 1]])
+
+
+def _bayer(size):
+    matrix = _BAYER_2
+    while matrix.shape[0] < size:
+        matrix = np.vstack([np.hstack([4 * matrix, 4 * matrix + 2]),
+                            np.hstack([4 * matrix + 3, 4 * matrix + 1])])
+    return matrix
+
+
+# Thresholds of the 8x8 ordered dither, centred on 0, in (-0.5, 0.5).
+BAYER_8 = (_bayer(8) + 0.5) / 64.0 - 0.5
+
+
+def sample_indices(num_frames, count=SAMPLE_FRAMES):
+    # Up to `count` frame numbers spread evenly from the first to the last.
+    if num_frames <= count:
+        return list(range(num_frames))
+    return sorted(set(int(round(i * (num_frames - 1) / float(count - 1)))
+                      for i in range(count)))
+
+
+def _cells(rgb):
+    # Histogram cell of every colour of `rgb` (uint8, last axis RGB).
+    cells = rgb >> (8 - TABLE_BITS)
+    return ((cells[..., 0].astype(np.intp) << (2 * TABLE_BITS))
+            | (cells[..., 1].astype(np.intp) << TABLE_BITS)
+            | cells[..., 2])
+
+
+def histogram(frames, per_frame=SAMPLE_PIXELS, alpha_threshold=128):
+    # The visible pixels of `frames` (RGBA arrays, one held at a time), at
+    # most `per_frame` of each, counted in cells of TABLE_BITS bits per
+    # channel.  Returns the mean colour and the pixel count of every cell
+    # that has any.
+    size = 1 << (3 * TABLE_BITS)
+    counts = np.zeros(size)
+    sums = np.zeros((size, 3))
+    for pixels in frames:
+        pixels = pixels.reshape(-1, pixels.shape[-1])
+        if pixels.shape[1] == 4:
+            pixels = pixels[pixels[:, 3] >= alpha_threshold]
+        pixels = pixels[::max(len(pixels) // per_frame, 1), :3]
+        cells = _cells(pixels)
+        counts += np.bincount(cells, minlength=size)
+        for channel in range(3):
+            sums[:, channel] += np.bincount(cells, weights=pixels[:, channel], minlength=size)
+    used = counts > 0
+    return sums[used] / counts[used][:, None], counts[used]
+
+
+def median_cut(colors, weights, count):
+    # Splits the colour box with the widest channel range at its weighted
+    # median until there are `count` boxes (or no box has two different
+    # colours); returns the weighted mean colour of every box.
+    boxes = [np.arange(len(colors))]
+    ranges = [_widest(colors[boxes[0]])]
+    while len(boxes) < count:
+        best = max(range(len(boxes)), key=lambda i: ranges[i][0])
+        spread, channel = ranges[best]
+        if spread == 0:
+            break
+        box = boxes[best]
+        box = box[np.argsort(colors[box, channel], kind="mergesort")]
+        cumulative = np.cumsum(weights[box])
+        middle = int(np.searchsorted(cumulative, cumulative[-1] / 2.0))
+        middle = min(max(middle, 1), len(box) - 1)
+        boxes[best:best + 1] = [box[:middle], box[middle:]]
+        ranges[best:best + 1] = [_widest(colors[box[:middle]]), _widest(colors[box[middle:]])]
+    return np.array([np.average(colors[box], axis=0, weights=weights[box]) for box in boxes])
+
+
+def _widest(colors):
+    # (range, channel) of the channel that varies most among `colors`.
+    if len(colors) < 2:
+        return 0, 0
+    spans = colors.max(axis=0) - colors.min(axis=0)
+    channel = int(np.argmax(spans))
+    return float(spans[channel]), channel
+
+
+def nearest(colors, palette):
+    # Index in `palette` of the closest colour to each of `colors`:
+    # |c - p|^2 = |c|^2 - 2 c.p + |p|^2, where |c|^2 does not change the
+    # order.
+    colors = np.asarray(colors, dtype=np.float64)
+    palette = np.asarray(palette, dtype=np.float64)
+    lengths = (palette ** 2).sum(axis=1)
+    indices = np.empty(len(colors), dtype=np.intp)
+    for start in range(0, len(colors), _CHUNK):
+        block = colors[start:start + _CHUNK]
+        indices[start:start + _CHUNK] = np.argmin(lengths - 2 * block.dot(palette.T), axis=1)
+    return indices
+
+
+def kmeans(colors, weights, centres, iterations=KMEANS_ITERATIONS):
+    # Weighted Lloyd passes: every colour goes to its closest centre, which
+    # then moves to the mean of its colours.  A centre left without colours
+    # stays put.
+    centres = np.array(centres, dtype=np.float64)
+    for _ in range(iterations):
+        labels = nearest(colors, centres)
+        counts = np.bincount(labels, weights=weights, minlength=len(centres))
+        used = counts > 0
+        for channel in range(3):
+            sums = np.bincount(labels, weights=weights * colors[:, channel],
+                               minlength=len(centres))
+            centres[used, channel] = sums[used] / counts[used]
+    return centres
+
+
+def build(frames, colors=255, iterations=KMEANS_ITERATIONS):
+    # A Palette of at most `colors` colours for the RGBA `frames`.
+    cell_colors, weights = histogram(frames)
+    if not len(cell_colors):
+        return Palette(np.zeros((1, 3), dtype=np.uint8))
+    centres = median_cut(cell_colors, weights, colors)
+    if iterations:
+        centres = kmeans(cell_colors, weights, centres, iterations)
+    return Palette(np.clip(np.round(centres), 0, 255).astype(np.uint8))
+
+
+class Palette(object):
+
+    def __init__(self, colors):
+        self.colors = np.asarray(colors, dtype=np.uint8)
+        self._table = None
+        # Dither amplitude: the typical distance from a palette colour to the
+        # closest other one.
+        self.spread = 0.0
+        if len(self.colors) > 1:
+            values = self.colors.astype(np.float64)
+            distances = ((values[:, None, :] - values[None, :, :]) ** 2).sum(axis=2)
+            np.fill_diagonal(distances, np.inf)
+            self.spread = float(np.median(np.sqrt(distances.min(axis=1))))
+
+    def table(self):
+        # Palette index for every colour at TABLE_BITS bits per channel, taken
+        # at the centre of its cell; built on first use.
+        if self._table is None:
+            shift = 8 - TABLE_BITS
+            levels = (np.arange(1 << TABLE_BITS) << shift) + (1 << shift >> 1)
+            r, g, b = np.meshgrid(levels, levels, levels, indexing="ij")
+            cells = np.stack([r.ravel(), g.ravel(), b.ravel()], axis=1)
+            self._table = nearest(cells, self.colors).astype(np.uint8)
+        return self._table
+
+    def index(self, pixels, dither=False, origin=(0, 0)):
+        # Palette indices of the RGB(A) `pixels`.  With `dither`, `origin` is
+        # the canvas position of pixels[0, 0], which anchors the pattern.
+        rgb = pixels[:, :, :3]
+        if dither:
+            height, width = rgb.shape[:2]
+            x, y = origin
+            rows = (np.arange(height) + y) % 8
+            columns = (np.arange(width) + x) % 8
+            offsets = BAYER_8[rows[:, None], columns[None, :]] * self.spread
+            rgb = np.clip(rgb + offsets[:, :, None] + 0.5, 0, 255).astype(np.uint8)
+        return self.table()[_cells(rgb)]
+
+    def rgb_bytes(self, size=256):
+        # The colours as a GIF colour table of `size` entries.
+        table = np.zeros((size, 3), dtype=np.uint8)
+        table[:len(self.colors)] = self.colors
+        return table.tobytes()
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+# Rendering the frames of an effect on a pool of worker processes.
+#
+# Every generator in gimpscript.effects depends only on its source pixels and
+# the frame numbers it is asked for, so ranges of frames can be rendered side
+# by side.  The source arrays are copied into shared memory once, before the
+# workers start (multiprocessing.shared_memory where Python has it, a shared
+# ctypes array in GIMP's Python 2); the workers map them instead of receiving
+# a copy with every task, and only finished frames are sent back, in order.
+import collections
+import multiprocessing
+import os
+
+import numpy as np
+
+from gimpscript import framestore
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+# Source arrays of the current job, as mapped by a worker process.
+_arrays = []
+_blocks = []
+
+
+class _SharedArg(object):
+    # Stands in for an array argument that the workers read from shared memory.
+
+    def __init__(self, index):
+        self.index = index
+
+
+def _share(array):
+    # Copies `array` into shared memory; returns the handle the workers attach
+    # to and the block to release afterwards (None for ctypes arrays).
+    array = np.ascontiguousarray(array)
+    size = max(array.nbytes, 1)
+    if shared_memory is not None:
+        block = shared_memory.SharedMemory(create=True, size=size)
+        name = block.name
+    else:
+        block = None
+        name = multiprocessing.RawArray("B", size)
+    _view(name, block, array.shape, array.dtype.str)[...] = array
+    return (name, array.shape, array.dtype.str), block
+
+
+def _view(name, block, shape, dtype):
+    buffer = block.buf if block is not None else name
+    count = int(np.prod(shape))
+    return np.frombuffer(buffer, dtype=dtype, count=count).reshape(shape)
+
+
+def _attach(handles):
+    # Pool initializer: maps the shared source arrays in the worker.
+    del _arrays[:]
+    for name, shape, dtype in handles:
+        block = None
+        if shared_memory is not None:
+            block = shared_memory.SharedMemory(name=name)
+            _blocks.append(block)
+        _arrays.append(_view(name, block, shape, dtype))
+
+
+def _render_range(task):
+    function, args, kwargs, frames = task
+    args = [_arrays[a.index] if isinstance(a, _SharedArg) else a for a in args]
+    kwargs = dict(kwargs, frames=frames)
+    return [(np.ascontiguousarray(pixels), tuple(offsets))
+            for pixels, offsets in function(*args, **kwargs)]
+
+
+def _store_chunk(store, first):
+    # Pool callback: moves a finished chunk into the frame store and empties
+    # the list, which the pool's result object also holds on to.
+    def callback(frames):
+        for i, (pixels, offsets) in enumerate(frames):
+            store.put(first + i, pixels, offsets)
+        del frames[:]
+    return callback
+
+
+def _finished(task, store):
+    result, first, count = task
+    frames = result.get()
+    if store is None:
+        for frame in frames:
+            yield frame
+    else:
+        for i in range(first, first + count):
+            yield store.pop(i)
+
+
+def worker_count(workers):
+    # 0 means one worker per core.
+    if workers <= 0:
+        return multiprocessing.cpu_count()
+    return workers
+
+
+def available():
+    # Without fork, GIMP's Python 2 would start every worker by re-running the
+    # plug-in script; render() then stays serial.
+    return hasattr(os, "fork") or shared_memory is not None
+
+
+def render(function, args, num_frames, workers=0, chunk_frames=4, frames=None,
+           readahead_mb=0, **kwargs):
+    # Yields the (pixels, offsets) frames of function(*args, **kwargs), an
+    # effects generator, rendering `chunk_frames` frames per task on
+    # `workers` processes.  Array arguments are shared, not copied.  Given
+    # `frames`, a list of frame numbers, only those are rendered, in order.
+    # With `readahead_mb`, frames the workers finish ahead of their turn take
+    # at most that much memory; the rest wait on disk (see
+    # gimpscript.framestore).  It does not apply to a single process, which
+    # yields every frame as soon as it is rendered.
+    if frames is None:
+        frames = range(num_frames)
+    else:
+        kwargs = dict(kwargs, frames=frames)
+    chunk_frames = max(chunk_frames, 1)
+    num_chunks = (len(frames) + chunk_frames - 1) // chunk_frames
+    workers = min(worker_count(workers), num_chunks)
+    if workers <= 1 or not available():
+        for frame in function(*args, **kwargs):
+            yield frame
+        return
+
+    handles = []
+    blocks = []
+    shared_args = []
+    try:
+        for arg in args:
+            if isinstance(arg, np.ndarray):
+                handle, block = _share(arg)
+                shared_args.append(_SharedArg(len(handles)))
+                handles.append(handle)
+                blocks.append(block)
+            else:
+                shared_args.append(arg)
+        kwargs.pop("frames", None)
+        tasks = [(function, shared_args, kwargs,
+                  list(frames[start:start + chunk_frames]))
+                 for start in range(0, len(frames), chunk_frames)]
+        store = None
+        if readahead_mb > 0:
+            store = framestore.FrameStore(readahead_mb * 1000000)
+        pool = multiprocessing.Pool(workers, _attach, (handles,))
+        try:
+            # At most two tasks per worker are in flight, so finished frames
+            # never pile up faster than the caller consumes them.  A frame
+            # store keeps them within its budget, so workers may run further
+            # ahead.
+            window = (4 if store is not None else 2) * workers
+            pending = collections.deque()
+            first = 0
+            for task in tasks:
+                callback = None
+                if store is not None:
+                    callback = _store_chunk(store, first)
+                pending.append((pool.apply_async(_render_range, (task,), callback=callback),
+                                first, len(task[3])))
+                first += len(task[3])
+                if len(pending) >= window:
+                    for frame in _finished(pending.popleft(), store):
+                        yield frame
+            while pending:
+                for frame in _finished(pending.popleft(), store):
+                    yield frame
+        finally:
+            pool.terminate()
+            pool.join()
+            if store is not None:
+                store.close()
+    finally:
+        for block in blocks:
+            if block is not None:
+                block.close()
+                block.unlink()
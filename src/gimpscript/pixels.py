@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# Moving pixels between GIMP drawables and NumPy arrays.
+#
+# Everything goes through gimp.PixelRgn rectangles, never pixel by pixel.  A
+# read is a single rectangle: GIMP returns the pixels as one string and the
+# array is a view of it, with no further copy.  Writes go in bands of whole
+# tile rows (gimp.tile_height() rows, the full width), each a few megabytes:
+# the copy that PixelRgn needs stays that size instead of the size of the
+# layer, and since no band ends inside a tile, no tile is fetched back from
+# GIMP to keep the pixels a band did not cover.
+from gimpfu import *
+import numpy as np
+
+from gimpscript import canvas, resample
+
+# Layer type for each number of channels.
+_LAYER_TYPES = {1: GRAY_IMAGE, 2: GRAYA_IMAGE, 3: RGB_IMAGE, 4: RGBA_IMAGE}
+
+# About as many bytes are written per PixelRgn call.
+_BAND_BYTES = 4 * 1024 * 1024
+
+
+def read_drawable(drawable):
+    # Returns the drawable's pixels as a (height, width, bpp) uint8 array,
+    # read-only since it shares GIMP's buffer.
+    width = drawable.width
+    height = drawable.height
+    region = drawable.get_pixel_rgn(0, 0, width, height, False, False)
+    data = np.frombuffer(region[0:width, 0:height], dtype=np.uint8)
+    return data.reshape(height, width, drawable.bpp)
+
+
+def read_canvas(drawable, width, height):
+    # Returns the drawable as an RGBA array covering the (width, height) image
+    # canvas, with the drawable placed at its offsets.
+    pixels = resample.as_rgba(read_drawable(drawable))
+    return canvas.place(canvas.blank(width, height), pixels, drawable.offsets)
+
+
+def band_rows(width, bpp):
+    # Rows per write: a multiple of the tile height, at least one tile row.
+    tile_height = gimp.tile_height()
+    rows = _BAND_BYTES // max(width * bpp, 1)
+    return max(rows // tile_height, 1) * tile_height
+
+
+def _write_rows(drawable, pixels):
+    width = drawable.width
+    height = drawable.height
+    pixels = np.asarray(pixels, dtype=np.uint8)
+    if pixels.shape[:2] != (height, width) or pixels.size != width * height * drawable.bpp:
+        raise ValueError("%s pixels do not fit a %dx%d drawable of %d bytes per pixel"
+                         % (pixels.shape, width, height, drawable.bpp))
+    region = drawable.get_pixel_rgn(0, 0, width, height, True, False)
+    rows = band_rows(width, drawable.bpp)
+    for y in range(0, height, rows):
+        end = min(y + rows, height)
+        region[0:width, y:end] = pixels[y:end].tobytes()
+    drawable.flush()
+
+
+def write_drawable(drawable, pixels):
+    # Replaces all pixels of an existing drawable (a layer or a layer mask)
+    # with a (height, width[, bpp]) array.
+    _write_rows(drawable, pixels)
+    drawable.update(0, 0, drawable.width, drawable.height)
+
+
+def add_layer_from_array(image, pixels, name, offsets=(0, 0), position=0,
+                         opacity=100.0, mode=NORMAL_MODE):
+    # Creates a layer holding `pixels`, places it at `offsets` and inserts it
+    # into `image` at `position` of the layer stack.
+    height, width, channels = pixels.shape
+    layer = gimp.Layer(image, name, width, height, _LAYER_TYPES[channels],
+                       opacity, mode)
+    _write_rows(layer, pixels)
+    layer.set_offsets(offsets[0], offsets[1])
+    pdb.gimp_image_insert_layer(image, layer, None, position)
+    layer.update(0, 0, width, height)
+    return layer
+
+
+def read_mask(layer):
+    # The layer mask of `layer` as a (height, width) array, or None.
+    if layer.mask is None:
+        return None
+    return read_drawable(layer.mask)[:, :, 0]
+
+
+def add_mask_from_array(layer, values):
+    # Gives `layer` a mask holding the (height, width) `values`, 255 showing
+    # the layer and 0 hiding it.
+    mask = pdb.gimp_layer_create_mask(layer, ADD_WHITE_MASK)
+    _write_rows(mask, values)
+    layer.add_mask(mask)
+    return mask
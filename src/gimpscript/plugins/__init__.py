@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+# The procedures registered by gimpscript_effects.py, one module per effect.
+# A module is only imported when its procedure runs, so that GIMP's plug-in
+# query at startup does not load any of them.
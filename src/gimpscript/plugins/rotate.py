@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+# python_fu_create_rotated_layers, registered by gimpscript_effects.py.
+from gimpfu import *
+import functools
+
+from gimpscript import draft, export, frameplan, layers, motion, profiler, undo
+
+# Choices of the "engine" parameter.
+ENGINE_PDB = 0
+ENGINE_NUMPY = 1
+
+def python_fu_create_rotated_layers(image, drawable, num_frames, engine=ENGINE_PDB, interpolation=INTERPOLATION_CUBIC,
+                                    output=export.OUTPUT_LAYERS, filename="", frame_duration=40, loop_count=0,
+                                    delta_frames=True, gif_palette=export.PALETTE_GLOBAL, workers=1, chunk_frames=4,
+                                    readahead_mb=1024, preview=draft.PREVIEW_OFF, undo_mode=undo.UNDO_FULL,
+                                    motion_px=0.0):
+    # Ensure that at least two frames are provided.
+    if num_frames < 2:
+        pdb.gimp_message("Please choose at least 2 frames to create a complete rotation.")
+        return
+
+    if preview != draft.PREVIEW_OFF:
+        # Every frame small and unfiltered first, in an image of its own.
+        if not layers.check_numpy_source(drawable):
+            return
+        from gimpscript import effects, pixels
+        factor = draft.draft_factor(image.width, image.height)
+        frames = effects.rotated_frames(draft.shrink(pixels.read_drawable(drawable), factor),
+                                        draft.shrink_offsets(drawable.offsets, factor), num_frames,
+                                        INTERPOLATION_NONE)
+        draft.show_draft("python_fu_create_rotated_layers", image, factor, frames, num_frames)
+        if preview == draft.PREVIEW_DRAFT:
+            return
+
+    timing = None
+    if motion_px > 0:
+        # With a motion target, only the frames that move far enough are made.
+        timing = motion.thin(motion.rotation(drawable.offsets + (drawable.width, drawable.height), num_frames),
+                             motion_px)
+
+    if output != export.OUTPUT_LAYERS:
+        # Frames go straight to the file; they are never added as layers.
+        if export.check_output(output, filename) and layers.check_numpy_source(drawable):
+            from gimpscript import effects, framecache, pixels
+            with profiler.Run("python_fu_create_rotated_layers", motion.frame_count(timing, num_frames),
+                              "rotation"):
+                if timing is not None:
+                    motion.report(timing, num_frames, motion_px)
+                cache = framecache.open_cache()
+                render = functools.partial(framecache.render, effects.rotated_frames,
+                                           (pixels.read_drawable(drawable), drawable.offsets, num_frames,
+                                            interpolation), num_frames, workers, chunk_frames, cache=cache,
+                                           readahead_mb=readahead_mb)
+                export.write_animation(output, filename, image.width, image.height, render, num_frames,
+                                       frame_duration, loop_count, delta_frames, [("rotation", num_frames)],
+                                       gif_palette, timing)
+        return
+
+    # Every frame becomes a layer that GIMP holds: say so up front if they
+    # will not fit in its tile cache.
+    angles = frameplan.rotation_angles(num_frames)
+    plan = frameplan.rotation_plan(drawable.offsets + (drawable.width, drawable.height), angles,
+                                   (drawable.width / 2.0, drawable.height / 2.0))
+    if timing is not None:
+        plan = [plan[i] for i in motion.selected(timing)]
+    layers.check_layer_memory(plan, drawable.bpp)
+
+    if engine == ENGINE_NUMPY:
+        create_rotated_layers_numpy(image, drawable, num_frames, interpolation, workers, chunk_frames, readahead_mb,
+                                    undo_mode, timing, frame_duration, motion_px)
+        return
+
+    # One undo step, a snapshot of the layer stack or no history at all, as
+    # chosen; the undo state, the user's context and the profiler are
+    # restored even if a frame fails.
+    with profiler.Run("python_fu_create_rotated_layers", motion.frame_count(timing, num_frames), "rotation"), \
+            undo.Transaction(image, undo_mode), layers.Context():
+        if timing is not None:
+            motion.report(timing, num_frames, motion_px)
+        # Use the requested interpolation without changing the user's context.
+        pdb.gimp_context_set_interpolation(interpolation)
+        
+        # Every frame was planned above: one rotation matrix per angle, and frames
+        # repeating an earlier angle (the final 360 degree frame) reuse it.  The
+        # pivot is the center of the layer.
+        rendered = []
+        by_index = {}
+        
+        # Loop through the planned frames.
+        for frame in plan:
+            if frame.source != frame.index and frame.source in by_index:
+                rendered.append(layers.copy_rendered_layer(image, by_index[frame.source]))
+                profiler.frame_done()
+                continue
+
+            # Duplicate the original layer.
+            new_layer = pdb.gimp_layer_copy(drawable, True)
+            # Add the duplicated layer at the top of the layer stack.
+            pdb.gimp_image_add_layer(image, new_layer, 0)
+            
+            # Rotate the new layer in one transform; multiples of 90 degrees are
+            # exact pixel moves instead of an interpolating transform.
+            new_layer = layers.transform_layer(new_layer, frame)
+            rendered.append(new_layer)
+            by_index[frame.index] = new_layer
+            profiler.frame_done()
+        if timing is not None:
+            motion.name_durations(rendered, timing, frame_duration)
+    gimp.displays_flush()
+
+def create_rotated_layers_numpy(image, drawable, num_frames, interpolation, workers=1, chunk_frames=4,
+                                readahead_mb=1024, undo_mode=undo.UNDO_FULL, timing=None, frame_duration=40,
+                                motion_px=0.0):
+    # Same frames as the PDB loop above, but the source pixels are read once and
+    # every rotation is resampled in NumPy, on `workers` processes if asked;
+    # GIMP only receives finished pixels.  `timing` keeps only some frames (see
+    # gimpscript.motion).
+    if not layers.check_numpy_source(drawable):
+        return
+    from gimpscript import effects, framecache, pixels
+
+    with profiler.Run("python_fu_create_rotated_layers", motion.frame_count(timing, num_frames), "rotation"), \
+            undo.Transaction(image, undo_mode):
+        if timing is not None:
+            motion.report(timing, num_frames, motion_px)
+        cache = framecache.open_cache()
+        frames = framecache.render(effects.rotated_frames,
+                                   (pixels.read_drawable(drawable), drawable.offsets, num_frames, interpolation),
+                                   num_frames, workers, chunk_frames, cache=cache, readahead_mb=readahead_mb,
+                                   frames=motion.selected(timing))
+        numbers = motion.selected(timing) or range(num_frames)
+        added = []
+        for position, (frame, offsets) in enumerate(frames):
+            added.append(pixels.add_layer_from_array(image, frame, "%s frame %d" % (drawable.name, numbers[position]),
+                                                     offsets, 0, drawable.opacity, drawable.mode))
+            profiler.frame_done()
+        if timing is not None:
+            motion.name_durations(added, timing, frame_duration)
+
+    gimp.displays_flush()
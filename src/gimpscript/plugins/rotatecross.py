@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+# python_fu_cross_gif, registered by gimpscript_effects.py.
+from gimpfu import *
+
+from gimpscript import draft, export, layers
+
+def python_fu_cross_gif(img, drawable, num_rot_frames, num_open_frames, output=export.OUTPUT_LAYERS, filename="",
+                        frame_duration=40, loop_count=0, delta_frames=True, gif_palette=export.PALETTE_GLOBAL,
+                        workers=1, chunk_frames=4, readahead_mb=1024, preview=draft.PREVIEW_OFF, motion_px=0.0):
+    layers.cross_effect("python_fu_cross_gif", img, drawable, num_rot_frames, num_open_frames, output, filename,
+                        frame_duration, loop_count, delta_frames, gif_palette, workers, chunk_frames,
+                        readahead_mb, preview, motion_px)
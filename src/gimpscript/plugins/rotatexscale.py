@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+# python_fu_create_rotated_scaled_translated_layers, registered by gimpscript_effects.py.
+from gimpfu import *
+import functools
+
+from gimpscript import draft, export, frameplan, layers, motion, profiler, undo
+
+def python_fu_create_rotated_scaled_translated_layers(image, drawable, num_frames, output=export.OUTPUT_LAYERS,
+                                                      filename="", frame_duration=40, loop_count=0, delta_frames=True,
+                                                      gif_palette=export.PALETTE_GLOBAL, workers=1, chunk_frames=4,
+                                                      readahead_mb=1024, preview=draft.PREVIEW_OFF,
+                                                      undo_mode=undo.UNDO_FULL, motion_px=0.0):
+    # Check for a minimum frame count.
+    if num_frames < 2:
+        pdb.gimp_message("Please choose at least 2 frames to create a complete transformation.")
+        return
+
+    if preview != draft.PREVIEW_OFF:
+        # Every frame small and unfiltered first, in an image of its own.
+        if not layers.check_numpy_source(drawable):
+            return
+        from gimpscript import effects, pixels
+        factor = draft.draft_factor(image.width, image.height)
+        frames = effects.rotated_scaled_frames(draft.shrink(pixels.read_drawable(drawable), factor),
+                                               draft.shrink_offsets(drawable.offsets, factor),
+                                               draft.shrink_length(image.height, factor), num_frames,
+                                               INTERPOLATION_NONE)
+        draft.show_draft("python_fu_create_rotated_scaled_translated_layers", image, factor, frames, num_frames)
+        if preview == draft.PREVIEW_DRAFT:
+            return
+
+    timing = None
+    if motion_px > 0:
+        # With a motion target, only the frames that move far enough are made.
+        timing = motion.thin(motion.rotation_scale(drawable.offsets + (drawable.width, drawable.height), image.height,
+                                                   num_frames), motion_px)
+
+    if output != export.OUTPUT_LAYERS:
+        # Frames go straight to the file; they are never added as layers.
+        if export.check_output(output, filename) and layers.check_numpy_source(drawable):
+            from gimpscript import effects, framecache, pixels
+            with profiler.Run("python_fu_create_rotated_scaled_translated_layers",
+                              motion.frame_count(timing, num_frames), "rotate and scale"):
+                if timing is not None:
+                    motion.report(timing, num_frames, motion_px)
+                cache = framecache.open_cache()
+                render = functools.partial(framecache.render, effects.rotated_scaled_frames,
+                                           (pixels.read_drawable(drawable), drawable.offsets, image.height,
+                                            num_frames, INTERPOLATION_CUBIC), num_frames, workers, chunk_frames,
+                                           cache=cache, readahead_mb=readahead_mb)
+                export.write_animation(output, filename, image.width, image.height, render, num_frames,
+                                       frame_duration, loop_count, delta_frames, [("rotate and scale", num_frames)],
+                                       gif_palette, timing)
+        return
+
+    with profiler.Run("python_fu_create_rotated_scaled_translated_layers", motion.frame_count(timing, num_frames),
+                      "rotate and scale"), undo.Transaction(image, undo_mode), layers.Context():
+        if timing is not None:
+            motion.report(timing, num_frames, motion_px)
+        pdb.gimp_context_set_interpolation(INTERPOLATION_CUBIC)
+        
+        # Plan every frame as one matrix: rotate by an equal increment (the final
+        # frame rotates 360°) about the layer's center, scale linearly from 100% for
+        # frame 0 to 20% for the final frame, and move the bottom left corner to the
+        # bottom left of the image.
+        plan = frameplan.rotated_scaled_plan(drawable.offsets + (drawable.width, drawable.height),
+                                             image.height, num_frames)
+        if timing is not None:
+            plan = [plan[i] for i in motion.selected(timing)]
+        
+        # Frames shrunk to half size or less start from a copy of the layer that
+        # is already scaled down by a power of two; the copies go even if a
+        # frame fails.
+        pyramid = layers.LayerPyramid(drawable)
+        added = []
+        try:
+            # Loop through all the frames.
+            for frame in plan:
+                # Duplicate the original layer, or its smallest copy that is still
+                # large enough for the frame.
+                new_layer, frame = pyramid.frame_layer(image, frame)
+                
+                # Rotate, scale and reposition with a single resampling pass.
+                added.append(layers.transform_layer(new_layer, frame))
+                profiler.frame_done()
+        finally:
+            pyramid.delete()
+        if timing is not None:
+            motion.name_durations(added, timing, frame_duration)
+    gimp.displays_flush()
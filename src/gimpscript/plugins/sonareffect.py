@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# python_fu_sonar_disappearance, registered by gimpscript_effects.py.
+from gimpfu import *
+
+from gimpscript import draft, export, layers, undo
+
+def python_fu_sonar_disappearance(image, drawable, num_frames, easing_index=0, softness=0.0,
+                                  output=export.OUTPUT_LAYERS, filename="", frame_duration=40, loop_count=0,
+                                  delta_frames=True, gif_palette=export.PALETTE_GLOBAL, workers=1, chunk_frames=4,
+                                  readahead_mb=1024, preview=draft.PREVIEW_OFF, undo_mode=undo.UNDO_FULL,
+                                  motion_px=0.0):
+    # Ensure exactly 2 layers exist.
+    if len(image.layers) != 2:
+        pdb.gimp_message("This script requires exactly 2 layers: one named 'foreground' and one background layer.")
+        return
+    
+    # Identify the 'foreground' layer and the background layer.
+    foreground_layer = None
+    background_layer = None
+    for layer in image.layers:
+        if layer.name.lower() == "foreground":
+            foreground_layer = layer
+        else:
+            background_layer = layer
+
+    if foreground_layer is None:
+        pdb.gimp_message("No layer named 'foreground' found. Please rename the layer to 'foreground' and try again.")
+        return
+
+    # Ensure num_frames is an integer.  The background is shown alone in a
+    # final frame.
+    layers.sonar_disappearance("python_fu_sonar_disappearance", image, foreground_layer, background_layer, int(num_frames),
+                               easing_index, softness, output, filename, frame_duration, loop_count,
+                               delta_frames, gif_palette, workers, chunk_frames, readahead_mb, preview,
+                               undo_mode, motion_px)
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# python_fu_sonar_disappearance2, registered by gimpscript_effects.py.
+from gimpfu import *
+
+from gimpscript import draft, export, layers, undo
+
+def python_fu_sonar_disappearance2(image, drawable, num_frames, easing_index=0, softness=0.0,
+                                   output=export.OUTPUT_LAYERS, filename="", frame_duration=40, loop_count=0,
+                                   delta_frames=True, gif_palette=export.PALETTE_GLOBAL, workers=1, chunk_frames=4,
+                                   readahead_mb=1024, preview=draft.PREVIEW_OFF, undo_mode=undo.UNDO_FULL,
+                                   motion_px=0.0):
+    # Assurez-vous qu'il y a exactement 2 calques.
+    if len(image.layers) != 2:
+        pdb.gimp_message("Ce script requiert exactement 2 calques : un nommé 'foreground' et un calque de fond.")
+        return
+    
+    # Identifier le calque 'foreground' et le calque de fond.
+    foreground_layer = None
+    background_layer = None
+    for layer in image.layers:
+        if layer.name.lower() == "foreground":
+            foreground_layer = layer
+        else:
+            background_layer = layer
+
+    if foreground_layer is None:
+        pdb.gimp_message("Aucun calque nommé 'foreground' n'a été trouvé. Veuillez renommer le calque en 'foreground' puis réessayez.")
+        return
+
+    # S'assurer que num_frames est un entier.  Le calque de fond reste visible sous
+    # chaque frame, pour se dévoiler en continu à travers les zones masquées.
+    layers.sonar_disappearance("python_fu_sonar_disappearance2", image, foreground_layer, background_layer, int(num_frames),
+                               easing_index, softness, output, filename, frame_duration, loop_count,
+                               delta_frames, gif_palette, workers, chunk_frames, readahead_mb, preview,
+                               undo_mode, motion_px, keep_background=True)
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+# python_fu_undo_animation_frames, registered by gimpscript_effects.py.
+from gimpfu import *
+
+from gimpscript import undo
+
+def python_fu_undo_animation_frames(image, drawable):
+    # Puts back the layer stack recorded by the last run in "Single snapshot"
+    # undo mode: the frames it added are removed.
+    state = undo.saved_snapshot(image)
+    if state is None:
+        pdb.gimp_message("No animation frames to undo: no effect ran on this image in snapshot undo mode.")
+        return
+
+    # Kept out of the history too, so the removed frames are freed at once;
+    # disabling the history clears it, as the run did.
+    pdb.gimp_image_undo_disable(image)
+    try:
+        undo.restore(image, state)
+        image.parasite_detach(undo.SNAPSHOT_PARASITE)
+    finally:
+        pdb.gimp_image_undo_enable(image)
+    gimp.displays_flush()
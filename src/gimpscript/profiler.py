@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+# Progress reporting and opt-in profiling shared by the plug-ins.
+#
+# A plug-in run calls start() once, phase() when it moves on to another part
+# of the effect (rotation, doors, final composite, ...), frame_done() after
+# every frame and finish() at the end; `with Run(...)` does the first and the
+# last, finishing even if a frame raises.  The progress bar then shows the
+# phase, the frames per second so far and the time left.
+#
+# Profiling is off unless the GIMPSCRIPT_PROFILE environment variable names a
+# path prefix.  Then `pdb` is wrapped in the gimpscript modules and in the
+# plug-in that called start(), every procedure call is counted and timed, and
+# finish() writes <prefix>.json (calls and time per procedure, time per phase
+# and per frame) and <prefix>.folded, collapsed stacks for flamegraph.pl or
+# speedscope.
+import collections
+import json
+import os
+import sys
+import time
+
+from gimpfu import *
+
+PROFILE_VARIABLE = "GIMPSCRIPT_PROFILE"
+
+# The progress text is replaced at most this often (seconds), as every
+# change is a PDB call.
+_TEXT_INTERVAL = 0.5
+
+_session = None
+
+
+class _TimedPdb(object):
+    # Stands in for `pdb`: each procedure is looked up on the real one and
+    # timed when called.
+
+    def __init__(self, pdb, session):
+        self._pdb = pdb
+        self._session = session
+
+    def __getattr__(self, name):
+        procedure = getattr(self._pdb, name)
+        session = self._session
+
+        def timed(*args, **kwargs):
+            started = time.time()
+            try:
+                return procedure(*args, **kwargs)
+            finally:
+                session.record_call(name, time.time() - started)
+
+        return timed
+
+
+class _Session(object):
+
+    def __init__(self, name, num_frames, report_prefix, namespaces):
+        self.name = name
+        self.num_frames = max(num_frames, 1)
+        self.report_prefix = report_prefix
+        self.started = time.time()
+        self.frames_done = 0
+        self.phase_name = None
+        self.phase_started = self.frame_started = self.text_shown = self.started
+        self.phases = collections.OrderedDict()
+        self.frames = []
+        self.calls = collections.Counter()
+        self.call_seconds = collections.Counter()
+        # (phase, procedure) -> seconds, for the collapsed stacks.
+        self.stacks = collections.Counter()
+        self.frame_pdb_seconds = 0.0
+        self.notes = {}
+        # This module's own `pdb` is among those replaced.
+        self._pdb = real_pdb = pdb
+        self._namespaces = []
+        if report_prefix:
+            timed = _TimedPdb(real_pdb, self)
+            for namespace in namespaces:
+                if namespace.get("pdb") is real_pdb:
+                    namespace["pdb"] = timed
+                    self._namespaces.append(namespace)
+
+    def record_call(self, name, seconds):
+        self.calls[name] += 1
+        self.call_seconds[name] += seconds
+        self.stacks[(self.phase_name, name)] += seconds
+        self.phases[self.phase_name]["pdb_seconds"] += seconds
+        self.frame_pdb_seconds += seconds
+
+    def phase(self, name):
+        now = time.time()
+        self._close_phase(now)
+        self.phase_name = name
+        self.phases.setdefault(name, {"seconds": 0.0, "pdb_seconds": 0.0, "frames": 0})
+        self.phase_started = self.frame_started = now
+        self._show_text(now)
+
+    def _close_phase(self, now):
+        if self.phase_name is not None:
+            self.phases[self.phase_name]["seconds"] += now - self.phase_started
+            self.phase_started = now
+
+    def frame_done(self):
+        now = time.time()
+        self.frames_done += 1
+        self.phases[self.phase_name]["frames"] += 1
+        if self.report_prefix:
+            self.frames.append({"frame": self.frames_done - 1, "phase": self.phase_name,
+                                "seconds": round(now - self.frame_started, 6),
+                                "pdb_seconds": round(self.frame_pdb_seconds, 6)})
+            self.frame_pdb_seconds = 0.0
+        self.frame_started = now
+        gimp.progress_update(min(float(self.frames_done) / self.num_frames, 1.0))
+        if now - self.text_shown >= _TEXT_INTERVAL:
+            self._show_text(now)
+
+    def status(self, now):
+        text = "%s: frame %d of %d" % (self.phase_name.capitalize(), self.frames_done,
+                                       self.num_frames)
+        elapsed = now - self.started
+        if self.frames_done and elapsed > 0:
+            rate = self.frames_done / elapsed
+            left = max(self.num_frames - self.frames_done, 0) / rate
+            text += ", %.1f frames/s, %s left" % (rate, format_duration(left))
+        return text
+
+    def _show_text(self, now):
+        self.text_shown = now
+        self._pdb.gimp_progress_set_text(self.status(now))
+
+    def finish(self):
+        now = time.time()
+        self._close_phase(now)
+        gimp.progress_update(1.0)
+        for namespace in self._namespaces:
+            namespace["pdb"] = self._pdb
+        if self.report_prefix:
+            self.write_report(now - self.started)
+
+    def report(self, seconds):
+        phases = collections.OrderedDict()
+        for name, phase in self.phases.items():
+            phases[name] = {
+                "frames": phase["frames"],
+                "seconds": round(phase["seconds"], 6),
+                "pdb_seconds": round(phase["pdb_seconds"], 6),
+                "frames_per_second": round(phase["frames"] / max(phase["seconds"], 1e-9), 2)
+            }
+        procedures = {}
+        for name, calls in self.calls.items():
+            procedures[name] = {
+                "calls": calls,
+                "seconds": round(self.call_seconds[name], 6),
+                "mean_ms": round(1000.0 * self.call_seconds[name] / calls, 4)
+            }
+        return {
+            "plugin": self.name,
+            "frames": self.frames_done,
+            "seconds": round(seconds, 6),
+            "pdb_seconds": round(sum(self.call_seconds.values()), 6),
+            "frames_per_second": round(self.frames_done / max(seconds, 1e-9), 2),
+            "phases": phases,
+            "procedures": procedures,
+            "notes": self.notes,
+            "frame_timings": self.frames
+        }
+
+    def collapsed_stacks(self):
+        # One "plugin;phase;procedure microseconds" line per procedure and
+        # phase; the phase's own line is the time spent outside the PDB.
+        lines = []
+        for name, phase in self.phases.items():
+            own = phase["seconds"] - phase["pdb_seconds"]
+            lines.append("%s;%s %d" % (_frame_name(self.name), _frame_name(name),
+                                       max(int(own * 1e6), 0)))
+        for (phase, procedure), seconds in sorted(self.stacks.items()):
+            lines.append("%s;%s;%s %d" % (_frame_name(self.name), _frame_name(phase),
+                                          procedure, int(seconds * 1e6)))
+        return lines
+
+    def write_report(self, seconds):
+        with open(self.report_prefix + ".json", "w") as handle:
+            json.dump(self.report(seconds), handle, indent=1)
+        with open(self.report_prefix + ".folded", "w") as handle:
+            handle.write("\n".join(self.collapsed_stacks()) + "\n")
+
+
+def _frame_name(name):
+    # Collapsed stacks separate frames with ";" and end with " count".
+    return name.replace(";", ",").replace(" ", "_")
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    if minutes >= 60:
+        return "%d:%02d:%02d" % (minutes // 60, minutes % 60, seconds)
+    return "%d:%02d" % (minutes, seconds)
+
+
+def start(name, num_frames, phase_name="frames"):
+    # Starts timing a plug-in run of `num_frames` frames, named `name` (its
+    # procedure name) in the profile.  A session still open is finished first.
+    return _start(name, num_frames, phase_name, sys._getframe(1).f_globals)
+
+
+def _start(name, num_frames, phase_name, caller_globals):
+    global _session
+    if _session is not None:
+        finish()
+    namespaces = [caller_globals]
+    for module_name, module in list(sys.modules.items()):
+        if module is not None and module_name.startswith("gimpscript"):
+            namespaces.append(vars(module))
+    gimp.progress_init("")
+    _session = _Session(name, num_frames, os.environ.get(PROFILE_VARIABLE), namespaces)
+    _session.phase(phase_name)
+    return _session
+
+
+def phase(name):
+    if _session is not None:
+        _session.phase(name)
+
+
+def frame_done():
+    if _session is not None:
+        _session.frame_done()
+
+
+def note(name, value):
+    # Adds `value` to the profile report under "notes".
+    if _session is not None:
+        _session.notes[name] = value
+
+
+def finish():
+    global _session
+    if _session is not None:
+        session, _session = _session, None
+        session.finish()
+
+
+class Run(object):
+    # start() on entry and finish() on exit, also when the run raises: `pdb`
+    # is restored in every module and the profile of the frames made so far
+    # is written.
+
+    def __init__(self, name, num_frames, phase_name="frames"):
+        self._args = (name, num_frames, phase_name, sys._getframe(1).f_globals)
+
+    def __enter__(self):
+        return _start(*self._args)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        finish()
+        return False
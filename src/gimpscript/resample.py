@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+# NumPy affine resampling engine.
+#
+# The source pixels are read once and every frame is produced by inverse
+# mapping the output grid through a 3x3 affine matrix.  Matrices map source
+# layer coordinates (pixel edges at integers, as in GIMP) to image coordinates.
+# Interpolation happens on premultiplied alpha, like GIMP's transform tools,
+# and pixels outside the source are transparent.
+import math
+
+import numpy as np
+
+from gimpscript import frameplan
+
+# Same values as GIMP's INTERPOLATION_NONE / LINEAR / CUBIC enums.
+INTERPOLATION_NONE = 0
+INTERPOLATION_LINEAR = 1
+INTERPOLATION_CUBIC = 2
+
+# Padding around the source so that every interpolation tap can be clipped
+# into the array and still read transparent pixels outside the layer.
+_PAD = 2
+
+# Rows of output processed at once, to bound the size of temporary arrays.
+_STRIP_ROWS = 256
+
+
+def translation_matrix(tx, ty):
+    return np.array([[1.0, 0.0, tx],
+                     [0.0, 1.0, ty],
+                     [0.0, 0.0, 1.0]])
+
+
+def scale_matrix(scale_x, scale_y):
+    return np.array([[scale_x, 0.0, 0.0],
+                     [0.0, scale_y, 0.0],
+                     [0.0, 0.0, 1.0]])
+
+
+def rotation_matrix(angle_radians, center_x, center_y):
+    # Same orientation as gimp_item_transform_rotate (clockwise on screen,
+    # since the y axis points down).
+    return np.array(frameplan.rotation(math.degrees(angle_radians),
+                                       center_x, center_y))
+
+
+def transformed_bounds(matrix, width, height):
+    # Bounding box of the transformed layer rectangle, rounded outwards the way
+    # GIMP does when the transform result is not clipped.
+    return frameplan.transformed_rect(matrix, (0, 0, width, height))
+
+
+def with_alpha(pixels):
+    # Transformed frames always need an alpha channel for the uncovered area.
+    channels = pixels.shape[2]
+    if channels in (2, 4):
+        return pixels
+    alpha = np.empty(pixels.shape[:2] + (1,), dtype=np.uint8)
+    alpha.fill(255)
+    return np.concatenate((pixels, alpha), axis=2)
+
+
+def as_rgba(pixels):
+    # Grey and RGB pixels as RGBA, for frames composed on an RGB canvas.
+    pixels = with_alpha(pixels)
+    if pixels.shape[2] == 2:
+        pixels = pixels[:, :, [0, 0, 0, 1]]
+    return pixels
+
+
+def _axis_permutation(matrix):
+    # Returns (transpose, flip_rows, flip_columns) when the matrix only moves
+    # whole pixels (a quarter turn or mirror with an integral translation),
+    # otherwise None.
+    m = np.round(matrix, 9)
+    if m[2, 0] != 0 or m[2, 1] != 0 or m[2, 2] != 1:
+        return None
+    if m[0, 2] != round(m[0, 2]) or m[1, 2] != round(m[1, 2]):
+        return None
+    a, b, c, d = m[0, 0], m[0, 1], m[1, 0], m[1, 1]
+    if a == 0 and d == 0 and abs(b) == 1 and abs(c) == 1:
+        return True, c < 0, b < 0
+    if b == 0 and c == 0 and abs(a) == 1 and abs(d) == 1:
+        return False, d < 0, a < 0
+    return None
+
+
+def _cubic_weights(t):
+    # Catmull-Rom weights for the taps at -1, 0, 1 and 2.
+    t2 = t * t
+    t3 = t2 * t
+    return (0.5 * (-t3 + 2.0 * t2 - t),
+            0.5 * (3.0 * t3 - 5.0 * t2 + 2.0),
+            0.5 * (-3.0 * t3 + 4.0 * t2 + t),
+            0.5 * (t3 - t2))
+
+
+class Resampler(object):
+    # Holds the premultiplied, padded source so that many frames can be
+    # rendered from a single read of the drawable.
+
+    def __init__(self, pixels):
+        pixels = with_alpha(np.asarray(pixels, dtype=np.uint8))
+        self.height, self.width, self.channels = pixels.shape
+        padding = ((_PAD, _PAD), (_PAD, _PAD), (0, 0))
+        self.pixels = np.pad(pixels, padding, mode="constant")
+        source = pixels.astype(np.float32)
+        alpha = source[:, :, -1:] / 255.0
+        source[:, :, :-1] *= alpha
+        self.source = np.pad(source, padding, mode="constant")
+
+    def bounds(self, matrix):
+        return transformed_bounds(matrix, self.width, self.height)
+
+    def render(self, matrix, interpolation=INTERPOLATION_LINEAR, bounds=None):
+        # Returns (pixels, (x, y)) with the frame and its image offsets.
+        if bounds is None:
+            bounds = self.bounds(matrix)
+        x0, y0, out_width, out_height = bounds
+        permutation = _axis_permutation(matrix)
+        if permutation:
+            # Keyframes (0, 90, 180 and 270 degrees) are exact pixel moves.
+            return self._render_exact(permutation, matrix, bounds)
+        inverse = np.linalg.inv(matrix)
+        out = np.empty((out_height, out_width, self.channels), dtype=np.uint8)
+        columns = np.arange(out_width, dtype=np.float64) + x0 + 0.5
+        for row in range(0, out_height, _STRIP_ROWS):
+            rows = np.arange(row, min(row + _STRIP_ROWS, out_height),
+                             dtype=np.float64) + y0 + 0.5
+            px, py = np.meshgrid(columns, rows)
+            # Source coordinates of the output pixel centres, shifted so that
+            # integers fall on source pixel centres.
+            u = inverse[0, 0] * px + inverse[0, 1] * py + inverse[0, 2] - 0.5
+            v = inverse[1, 0] * px + inverse[1, 1] * py + inverse[1, 2] - 0.5
+            out[row:row + len(rows)] = self._sample(u, v, interpolation)
+        return out, (x0, y0)
+
+    def _render_exact(self, permutation, matrix, bounds):
+        transpose, flip_rows, flip_columns = permutation
+        pixels = self.pixels[_PAD:-_PAD, _PAD:-_PAD]
+        if transpose:
+            pixels = pixels.transpose(1, 0, 2)
+        if flip_rows:
+            pixels = pixels[::-1]
+        if flip_columns:
+            pixels = pixels[:, ::-1]
+        pixels = np.ascontiguousarray(pixels)
+        x, y = self.bounds(matrix)[:2]
+        if (x, y) + pixels.shape[1::-1] == tuple(bounds):
+            return pixels, (x, y)
+        # Clipped result: cut the moved pixels to the requested bounds.
+        from gimpscript import canvas
+
+        clipped = canvas.place(canvas.blank(bounds[2], bounds[3], self.channels),
+                               pixels, (x - bounds[0], y - bounds[1]))
+        return clipped, (bounds[0], bounds[1])
+
+    def _tap(self, ix, iy, source=None):
+        if source is None:
+            source = self.source
+        ix = np.clip(ix + _PAD, 0, source.shape[1] - 1)
+        iy = np.clip(iy + _PAD, 0, source.shape[0] - 1)
+        return source[iy, ix]
+
+    def _sample(self, u, v, interpolation):
+        if interpolation == INTERPOLATION_NONE:
+            ix = np.floor(u + 0.5).astype(np.intp)
+            iy = np.floor(v + 0.5).astype(np.intp)
+            # Exact copy: no premultiply round trip needed for nearest.
+            return self._tap(ix, iy, self.pixels)
+        elif interpolation == INTERPOLATION_LINEAR:
+            fx = np.floor(u)
+            fy = np.floor(v)
+            tx = (u - fx)[:, :, None].astype(np.float32)
+            ty = (v - fy)[:, :, None].astype(np.float32)
+            ix = fx.astype(np.intp)
+            iy = fy.astype(np.intp)
+            top = self._tap(ix, iy) * (1 - tx) + self._tap(ix + 1, iy) * tx
+            bottom = (self._tap(ix, iy + 1) * (1 - tx)
+                      + self._tap(ix + 1, iy + 1) * tx)
+            result = top * (1 - ty) + bottom * ty
+        else:
+            fx = np.floor(u)
+            fy = np.floor(v)
+            wx = _cubic_weights((u - fx)[:, :, None].astype(np.float32))
+            wy = _cubic_weights((v - fy)[:, :, None].astype(np.float32))
+            ix = fx.astype(np.intp)
+            iy = fy.astype(np.intp)
+            result = 0
+            for j in range(4):
+                row = 0
+                for i in range(4):
+                    row = row + self._tap(ix + i - 1, iy + j - 1) * wx[i]
+                result = result + row * wy[j]
+        return _unpremultiply(result)
+
+
+def _unpremultiply(result):
+    result = np.clip(result, 0.0, 255.0)
+    alpha = result[:, :, -1:]
+    color = result[:, :, :-1]
+    scale = np.where(alpha > 0, 255.0 / np.maximum(alpha, 1e-6), 0.0)
+    color = np.clip(color * scale, 0.0, 255.0)
+    return np.rint(np.concatenate((color, alpha), axis=2)).astype(np.uint8)
+
+
+def halved(pixels):
+    # `pixels` (with alpha) at half the size, each pixel the premultiplied
+    # mean of a 2x2 block.  An odd last row or column is averaged with
+    # transparent pixels, so the halving is exact on every level.
+    height, width, channels = pixels.shape
+    source = np.zeros((height + height % 2, width + width % 2, channels),
+                      dtype=np.float32)
+    source[:height, :width] = pixels
+    source[:, :, :-1] *= source[:, :, -1:] / 255.0
+    blocks = source.reshape(source.shape[0] // 2, 2, source.shape[1] // 2, 2,
+                            channels)
+    return _unpremultiply(blocks.mean(axis=(1, 3)))
+
+
+class Pyramid(object):
+    # The source and copies of it at 1/2, 1/4, 1/8, ... of its size, each made
+    # from the level above it the first time a frame needs it.  A frame is
+    # resampled from the smallest level that still has a pixel for every
+    # frame pixel, instead of skipping over most of the full-size source,
+    # which aliases.  Without interpolation every frame uses the source.
+
+    def __init__(self, pixels):
+        self.levels = [Resampler(pixels)]
+        self.depth = frameplan.pyramid_depth(self.levels[0].width,
+                                             self.levels[0].height)
+
+    def level(self, index):
+        while len(self.levels) <= index:
+            pixels = self.levels[-1].pixels[_PAD:-_PAD, _PAD:-_PAD]
+            self.levels.append(Resampler(halved(pixels)))
+        return self.levels[index]
+
+    def bounds(self, matrix):
+        return self.levels[0].bounds(matrix)
+
+    def render(self, matrix, interpolation=INTERPOLATION_LINEAR, bounds=None):
+        if bounds is None:
+            bounds = self.bounds(matrix)
+        index = 0
+        if interpolation != INTERPOLATION_NONE:
+            index = frameplan.pyramid_level(matrix, self.depth)
+        if index:
+            factor = 2 ** index
+            matrix = np.array(frameplan.from_level(matrix, (0, 0), factor, factor))
+        return self.level(index).render(matrix, interpolation, bounds)
+
+
+def render_plan(pixels, offsets, plan, interpolation=INTERPOLATION_LINEAR):
+    # Yields (frame, (x, y)) for every frame of a frameplan plan, each
+    # resampled once from `pixels`, the source layer placed at `offsets`, or
+    # from the pyramid level that suits its scale.
+    resampler = Pyramid(pixels)
+    place = translation_matrix(offsets[0], offsets[1])
+    # Frames that are reused later are kept until their last use.
+    last_use = dict((frame.source, i) for i, frame in enumerate(plan))
+    kept = {}
+    for i, frame in enumerate(plan):
+        if frame.source in kept:
+            result = kept[frame.source]
+        else:
+            matrix = np.dot(np.array(frame.matrix), place)
+            result = resampler.render(matrix, interpolation, frame.bounds)
+        if last_use[frame.source] > i:
+            kept[frame.source] = result
+        else:
+            kept.pop(frame.source, None)
+        yield result
+
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# Sonar masks from a precomputed distance field.
+#
+# Every frame of the sonar effect hides the foreground inside a circle around
+# the image centre, so its mask is just "distance from centre > radius".  The
+# distances are computed once and each frame's mask is a vectorized threshold.
+import math
+
+import numpy as np
+
+from gimpscript import easing
+
+
+def center_and_max_radius(width, height):
+    # Same centre and reach as the original ellipse-selection code.
+    center_x = width // 2
+    center_y = height // 2
+    return (center_x, center_y), math.sqrt(center_x ** 2 + center_y ** 2)
+
+
+def distance_field(width, height, center, origin=(0, 0)):
+    # Distance from `center` to every pixel centre of a (width, height) area
+    # whose top-left corner is at `origin` in the image.
+    xs = np.arange(width, dtype=np.float32) + (origin[0] + 0.5 - center[0])
+    ys = np.arange(height, dtype=np.float32) + (origin[1] + 0.5 - center[1])
+    return np.sqrt(xs[None, :] ** 2 + ys[:, None] ** 2)
+
+
+def mask(distance, radius, softness=0.0):
+    # 255 where the foreground stays visible, 0 inside the circle.  A positive
+    # softness blends the edge over that many pixels (anti-aliasing).
+    if radius <= 0:
+        return np.full(distance.shape, 255, dtype=np.uint8)
+    if softness <= 0:
+        return np.where(distance > radius, 255, 0).astype(np.uint8)
+    coverage = np.clip((distance - radius) / softness + 0.5, 0.0, 1.0)
+    return np.rint(coverage * 255.0).astype(np.uint8)
+
+
+def sonar_masks(distance, max_radius, num_frames, easing_index=0,
+                softness=0.0, frames=None):
+    # Yields the mask of every frame, or of the frames numbered in `frames`.
+    radii = easing.radius_schedule(num_frames, max_radius, easing_index)
+    if frames is not None:
+        radii = [radii[i] for i in frames]
+    for radius in radii:
+        yield mask(distance, radius, softness)
+
+
+def apply_mask(pixels, frame_mask):
+    # The RGBA pixels with the mask multiplied into their alpha.
+    masked = pixels.copy()
+    alpha = masked[:, :, 3].astype(np.uint16) * frame_mask
+    masked[:, :, 3] = ((alpha + 127) // 255).astype(np.uint8)
+    return masked
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+# Undo handling shared by the plug-ins that add frames to the image itself.
+#
+#   with undo.Transaction(image, undo_mode):
+#       ... add the frames ...
+#
+# "Full history" records every layer in one undo group, as GIMP normally
+# does; the history then holds on to the pixels of hundreds of frames.
+# "Single snapshot" disables the history while the frames are added, which
+# clears it: GIMP's undo steps must match the image, and the run changes the
+# layer stack for good.  Instead the layer stack (layers, their visibility
+# and the active layer) is recorded; it is put back if the run fails, and the
+# "Undo Animation Frames" procedure (plugins/undosnapshot.py) puts it back
+# later.  "None" disables the history the same way and records nothing.  The
+# undo state is always restored, whatever happens in the block.
+#
+# The profile notes how many bytes each frame pushes: the pixels of every
+# added layer and its mask, width x height x bytes per pixel.  In full mode
+# the undo group keeps those layers, so that is what the history holds for
+# the run (the buffers a transform replaces come on top); the other modes
+# keep no history.
+import json
+
+from gimpfu import *
+
+from gimpscript import profiler
+
+# Choices of the "undo_mode" parameter.
+UNDO_FULL = 0
+UNDO_SNAPSHOT = 1
+UNDO_NONE = 2
+
+UNDO_MODE_NAMES = ["full", "snapshot", "none"]
+
+# Parameter appended to the plug-ins that change the image.
+UNDO_PARAMS = [
+    (PF_OPTION, "undo_mode", "Undo", UNDO_FULL,
+     ["Full history", "Single snapshot (Undo Animation Frames)", "None"])
+]
+
+# Image parasite keeping the snapshot of the last run, for "Undo Animation
+# Frames".
+SNAPSHOT_PARASITE = "gimpscript-undo-snapshot"
+
+
+def snapshot(image):
+    # The layer stack of `image`: every layer with its visibility, top first,
+    # and the active layer.
+    active = image.active_layer
+    return {"layers": [[layer.ID, bool(layer.visible)] for layer in image.layers],
+            "active": active.ID if active is not None else None}
+
+
+def restore(image, state):
+    # Puts the layer stack recorded by snapshot() back: layers added since
+    # are removed and the others get their visibility back.
+    visible = dict((layer_id, shown) for layer_id, shown in state["layers"])
+    for layer in list(image.layers):
+        if layer.ID not in visible:
+            pdb.gimp_image_remove_layer(image, layer)
+        elif bool(layer.visible) != visible[layer.ID]:
+            layer.visible = visible[layer.ID]
+    for layer in image.layers:
+        if layer.ID == state["active"]:
+            pdb.gimp_image_set_active_layer(image, layer)
+            break
+
+
+def saved_snapshot(image):
+    parasite = image.parasite_find(SNAPSHOT_PARASITE)
+    if parasite is None:
+        return None
+    return json.loads(parasite.data)
+
+
+class Transaction(object):
+
+    def __init__(self, image, mode=UNDO_FULL):
+        self.image = image
+        self.mode = mode
+        self.state = None
+
+    def __enter__(self):
+        self.state = snapshot(self.image)
+        if self.mode == UNDO_FULL:
+            pdb.gimp_image_undo_group_start(self.image)
+        else:
+            pdb.gimp_image_undo_disable(self.image)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if self.mode == UNDO_SNAPSHOT and exc_type is not None:
+                restore(self.image, self.state)
+            elif self.mode == UNDO_SNAPSHOT:
+                self.image.attach_new_parasite(SNAPSHOT_PARASITE, 0, json.dumps(self.state))
+        finally:
+            if self.mode == UNDO_FULL:
+                pdb.gimp_image_undo_group_end(self.image)
+            else:
+                pdb.gimp_image_undo_enable(self.image)
+            profiler.note("undo", self.memory())
+        return False
+
+    def memory(self):
+        # Bytes of the layers added during the run, in total and per frame,
+        # and how much of that the history holds.
+        before = set(layer_id for layer_id, shown in self.state["layers"])
+        added = [layer for layer in self.image.layers if layer.ID not in before]
+        layer_bytes = 0
+        for layer in added:
+            layer_bytes += layer.width * layer.height * layer.bpp
+            if layer.mask is not None:
+                layer_bytes += layer.mask.width * layer.mask.height * layer.mask.bpp
+        return {"mode": UNDO_MODE_NAMES[self.mode],
+                "frames": len(added),
+                "layer_bytes": layer_bytes,
+                "layer_bytes_per_frame": layer_bytes // len(added) if added else 0,
+                "history_bytes": layer_bytes if self.mode == UNDO_FULL else 0}
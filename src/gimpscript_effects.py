@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Plug-in entry point: registers every animation effect of the gimpscript
+# package under a name of its own.
+#
+# GIMP runs this file at startup to query the procedures, so it only loads
+# the parameter lists.  Each procedure imports its module from
+# gimpscript.plugins when it runs; NumPy, the encoders and the effects code
+# load from there, as they are needed.
+from gimpfu import *
+
+from gimpscript import draft, easing, export, layers, motion, undo
+
+
+def _lazy(module_name, function_name):
+    # The procedure `function_name` of gimpscript.plugins.`module_name`,
+    # imported on its first call.
+    def run(*args):
+        # Looked up here, not in this module's globals, which Python 2 clears
+        # when the file is run with runpy (as bench/run_plugins.py does).
+        import importlib
+        module = importlib.import_module("gimpscript.plugins." + module_name)
+        return getattr(module, function_name)(*args)
+    run.__name__ = function_name
+    return run
+
+
+_COMMON_PARAMS = export.OUTPUT_PARAMS + layers.PARALLEL_PARAMS + draft.PREVIEW_PARAMS
+_CROSS_PARAMS = _COMMON_PARAMS + motion.MOTION_PARAMS
+_FRAME_PARAMS = _COMMON_PARAMS + undo.UNDO_PARAMS + motion.MOTION_PARAMS
+
+register(
+    "python_fu_create_rotated_layers",
+    "Create Rotated Frames",
+    "Duplicates the selected layer to create frames that rotate in equal increments, "
+    "ending with a final frame that is identical to the original.",
+    "Joho", "Joho", "2025",
+    "<Image>/Filters/Animation/Only Rotate",
+    "*",
+    [
+        (PF_INT, "num_frames", "Number of Frames", 300),
+        (PF_OPTION, "engine", "Engine", 0, ["GIMP (PDB)", "NumPy"]),
+        (PF_OPTION, "interpolation", "Interpolation", INTERPOLATION_CUBIC, ["None", "Linear", "Cubic"])
+    ] + _FRAME_PARAMS,
+    [],
+    _lazy("rotate", "python_fu_create_rotated_layers"))
+
+register(
+    "python_fu_create_rotated_scaled_translated_layers",
+    "Create Rotated, Scaled, and Translated Frames",
+    "Duplicates the selected layer over a number of frames. Each duplicate is rotated by an equal increment (ending at 360°), "
+    "scaled down linearly from 100% to 20%, and repositioned so that its bottom left aligns with the image's bottom left.",
+    "Joho", "Joho", "2025",
+    "<Image>/Filters/Animation/Rotate x Scale",
+    "*",
+    [
+        (PF_INT, "num_frames", "Number of Frames", 300)
+    ] + _FRAME_PARAMS,
+    [],
+    _lazy("rotatexscale", "python_fu_create_rotated_scaled_translated_layers"))
+
+register(
+    "python_fu_cross_gif",
+    "Generate an animated image with rotating and opening door frames",
+    "Creates an animated image where the current image first rotates continuously and then opens into four pieces in a cross layout. The animation frames are added as layers to a new image.",
+    "Your Name",
+    "Your Name",
+    "2025",
+    "<Image>/Filters/Animation/Cross GIF (Layers Only)",
+    "*",
+    [
+        (PF_INT, "num_rot_frames", "Number of rotation frames", 72),
+        (PF_INT, "num_open_frames", "Number of door opening frames", 20)
+    ] + _CROSS_PARAMS,
+    [],
+    _lazy("rotatecross", "python_fu_cross_gif"))
+
+register(
+    "python_fu_cross_open_gif",
+    "Generate an animated image with 360 rotation, door opening, locked cross, and mini overlay",
+    "Creates an animated image where the current image rotates 360°, then opens up like French doors into a cross layout. In the final open state the image is shifted (locked to the left) and a 20% scaled copy of the rotated image is overlaid at the bottom left.",
+    "Joho","Joho","2025",
+    "<Image>/Filters/Animation/Crossopen",
+    "*",
+    [
+        (PF_INT, "num_rot_frames", "Number of rotation frames", 200),
+        (PF_INT, "num_open_frames", "Number of door opening frames", 60)
+    ] + _CROSS_PARAMS,
+    [],
+    _lazy("rotatethenopen", "python_fu_cross_open_gif"))
+
+register(
+    "python_fu_sonar_disappearance",
+    "Create a sonar-like disappearance effect with background reveal",
+    "Generates frames from the 'foreground' layer with an expanding circular mask, then adds a final frame revealing the background layer.",
+    "Virginie", "GPL", "2025",
+    "<Image>/Filters/Animation/Sonar Disappearance with Background Reveal",
+    "*",
+    [
+        (PF_INT, "num_frames", "Number of Frames", 20),
+        (PF_OPTION, "easing", "Radius easing", 0, easing.EASING_NAMES),
+        (PF_FLOAT, "softness", "Edge softness (pixels)", 0.0)
+    ] + _FRAME_PARAMS,
+    [],
+    _lazy("sonareffect", "python_fu_sonar_disappearance"))
+
+register(
+    "python_fu_sonar_disappearance2",
+    "Créer un effet d'effacement sonar avec révélation permanente du fond",
+    "Génère des frames à partir du calque 'foreground' avec un masque circulaire expansif qui laisse transparaître le calque de fond en permanence.",
+    "Virginie", "GPL", "2025",
+    "<Image>/Filters/Animation/Sonar Disappearance with Background Reveal2",
+    "*",
+    [
+        (PF_INT, "num_frames", "Nombre de frames", 20),
+        (PF_OPTION, "easing", "Easing du rayon", 0, easing.EASING_NAMES),
+        (PF_FLOAT, "softness", "Douceur du bord (pixels)", 0.0)
+    ] + _FRAME_PARAMS,
+    [],
+    _lazy("sonareffect2", "python_fu_sonar_disappearance2"))
+
+register(
+    "python_fu_undo_animation_frames",
+    "Undo the frames added by the last animation effect",
+    "Removes the layers added by the last animation effect run in 'Single snapshot' undo mode and restores "
+    "the visibility of the other layers and the active layer.",
+    "Your Name",
+    "Your Name",
+    "2025",
+    "<Image>/Filters/Animation/Undo Animation Frames",
+    "*",
+    [],
+    [],
+    _lazy("undosnapshot", "python_fu_undo_animation_frames"))
+
+main()